@@ -0,0 +1 @@
+"""Houses benchmarks for hot paths of the Discord IT Trivia bot."""
@@ -0,0 +1,101 @@
+"""Benchmark the time the logging thread spends per log line, before and after the log queue.
+
+Compares the previous configuration, where structlog rendered JSON and the standard library
+wrote it synchronously, against bot.core.log.setup_logging(), where the logging thread only
+enqueues records and a writer thread renders and writes them in batches. Also compares building
+embed payloads on the logging thread against deferring them with Lazy and sampling 1% of them.
+
+Run from the root of the repository with ``python -m benchmarks.bench_logging``.
+"""
+
+import logging
+import tempfile
+import time
+import structlog
+from structlog.contextvars import bind_contextvars, clear_contextvars, merge_contextvars
+from structlog.stdlib import filter_by_level
+from bot.core.log import Lazy, QueueLogHandler, orjson, setup_logging
+from bot.core.util import embed_dicts
+from bot.embeds.trivia import trivia_ok_question
+from bot.models.question import Question
+from benchmarks.synthetic import real_pool
+
+
+def setup_legacy_logging(filepath: str) -> None:
+    """Configure logging the way bot.main used to, writing to a file instead of stdout."""
+    root = logging.getLogger()
+    root.handlers = [logging.FileHandler(filepath)]
+    root.setLevel(logging.INFO)
+    structlog.configure(
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        processors=[
+            filter_by_level,
+            merge_contextvars,
+            structlog.stdlib.add_log_level,
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.processors.JSONRenderer(),
+        ],
+    )
+
+
+def log_interactions(lines: int, lazy: bool = False) -> float:
+    """Log lines like those of sent questions, returning the seconds spent logging."""
+    exam = real_pool()[0]
+    question = Question.from_dict(exam.get("questions")[0])
+    embed = trivia_ok_question(exam.get("meta_name"), question, range(4))[0]
+    logger = structlog.getLogger(name=__name__)
+    bind_contextvars(
+        guild_id=1, guild_name="Guild", channel_id=2, channel_name="channel"
+    )
+    start = time.perf_counter()
+    for _ in range(lines):
+        if lazy:
+            logger.info("Sent embeds", embeds=Lazy(embed_dicts, [embed]))
+        else:
+            logger.info("Sent embeds", embeds=[embed.to_dict()])
+    elapsed = time.perf_counter() - start
+    clear_contextvars()
+    return elapsed
+
+
+def main() -> None:
+    """Time both logging configurations."""
+    lines = 20_000
+    with tempfile.TemporaryDirectory() as directory:
+        setup_legacy_logging(f"{directory}/legacy.log")
+        legacy = log_interactions(lines)
+        structlog.reset_defaults()
+        handler: QueueLogHandler = setup_logging(
+            filepath=f"{directory}/queue.log", queue_size=lines
+        )
+        queued = log_interactions(lines)
+        start = time.perf_counter()
+        handler.flush()
+        drained = time.perf_counter() - start + queued
+        handler.close()
+        structlog.reset_defaults()
+        handler = setup_logging(
+            filepath=f"{directory}/sampled.log",
+            queue_size=lines,
+            sample_rates={"Sent embeds": 0.01},
+        )
+        sampled = log_interactions(lines, lazy=True)
+        handler.close()
+    print(f"JSON encoder: {'orjson' if orjson is not None else 'json'}")
+    print(
+        f"Synchronous logging:     {legacy / lines * 1e6:8.2f} us per line on the loop"
+    )
+    print(
+        f"Queue logging:           {queued / lines * 1e6:8.2f} us per line on the loop"
+    )
+    print(
+        f"Queue logging, drained:  {drained / lines * 1e6:8.2f} us per line end-to-end"
+    )
+    print(
+        f"Queue logging, sampled:  {sampled / lines * 1e6:8.2f} us per line on the loop"
+    )
+    print(f"Batches written: {handler.batches}, records dropped: {handler.dropped}")
+
+
+if __name__ == "__main__":
+    main()
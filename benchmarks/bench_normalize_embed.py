@@ -0,0 +1,139 @@
+"""Benchmark normalizing command_failed() embeds that carry very large tracebacks.
+
+Compares the greedy, single-pass normalize_embed() against the previous quadratic implementation,
+which is kept here for reference. The previous implementation only split an oversize field once
+and kept a single line of the remainder, so the share of the traceback each one keeps is also
+reported.
+
+Run from the root of the repository with ``python -m benchmarks.bench_normalize_embed``.
+"""
+
+import linecache
+import sys
+import timeit
+import traceback
+from typing import List
+from disnake import Embed
+from bot.core.util import embed_fits, normalize_embed
+from bot.embeds import command_failed
+
+
+def legacy_normalize_embed(embed: Embed) -> List[Embed]:
+    """Normalize an embed the way bot.core.util.normalize_embed() used to."""
+    embeds = []
+    for index, field in enumerate(embed.fields):
+        if len(field.value) > 1024:
+            lines = field.value.splitlines()
+            if len(lines) > 1:
+                removed_lines = []
+                for line_index in reversed(range(len(lines))):
+                    modified_field_value = "\n".join(lines[:line_index])
+                    if len(modified_field_value) <= 1024:
+                        removed_lines.insert(0, lines[line_index])
+                        embed.set_field_at(
+                            index=index,
+                            name=field.name,
+                            value=modified_field_value,
+                            inline=field.inline,
+                        )
+                        embed.insert_field_at(
+                            index=index + 1,
+                            name=field.name,
+                            value="\n".join(removed_lines),
+                            inline=field.inline,
+                        )
+                        break
+            else:
+                embed.set_field_at(
+                    index=index,
+                    name=field.name,
+                    value=f"{field.value[:1021]}...",
+                    inline=field.inline,
+                )
+                embed.insert_field_at(
+                    index=index + 1,
+                    name=field.name,
+                    value=f"...{field.value[1021:]}",
+                    inline=field.inline,
+                )
+    embeds.append(embed)
+    for e in embeds:
+        if len(e) > 6000:
+            new_embed = Embed(title=e.title, description=e.description, colour=e.color)
+            for index, field in reversed(list(enumerate(e.fields))):
+                new_embed.insert_field_at(
+                    index=0, name=field.name, value=field.value, inline=field.inline
+                )
+                e.remove_field(index)
+                if len(e) <= 6000:
+                    embeds.append(new_embed)
+                    break
+    return embeds
+
+
+def formatted_traceback(depth: int) -> str:
+    """Return the formatted traceback of an exception raised from a deep call stack.
+
+    Every frame belongs to a distinct function, so that the traceback isn't collapsed into a
+    "Previous line repeated" line as plain recursion would be.
+    """
+    filename = f"<bench_normalize_embed_{depth}>"
+    source = "".join(
+        f"def call_{i}():\n    return call_{i + 1}()  # frame {i} of a deep call stack\n"
+        for i in range(depth)
+    )
+    source += f"def call_{depth}():\n    raise ValueError({'x' * 2000!r})\n"
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+    namespace: dict = {}
+    exec(compile(source, filename, "exec"), namespace)
+    try:
+        namespace["call_0"]()
+    except ValueError as exc:
+        return "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+
+
+def kept(tb: str, embeds: List[Embed]) -> str:
+    """Return the share of a traceback kept in the traceback fields of normalized embeds."""
+    total = sum(
+        len(field.value)
+        for e in embeds
+        for field in e.fields
+        if field.name == "Traceback"
+    )
+    return f"{min(total / len(tb), 1):.1%}"
+
+
+def failed_embed(tb: str) -> Embed:
+    """Build the embed sent for a failed command with the given traceback."""
+    return command_failed(
+        command="ccna", error_checksum="0" * 40, error_id="0" * 36, traceback=tb
+    )
+
+
+def main() -> None:
+    """Time both normalizers on tracebacks of increasing size."""
+    sys.setrecursionlimit(20_000)
+    print(f"{'Traceback':>12} {'Greedy':>12} {'Kept':>8} {'Legacy':>12} {'Kept':>8}")
+    for depth in (10, 100, 1_000, 10_000):
+        tb = formatted_traceback(depth)
+        runs = max(1, 1_000 // depth)
+        greedy = timeit.timeit(lambda: normalize_embed(failed_embed(tb)), number=runs)
+        embeds = normalize_embed(failed_embed(tb))
+        assert all(embed_fits(e) for e in embeds)
+        greedy_kept = kept(tb, embeds)
+        if depth <= 1_000:
+            legacy = timeit.timeit(
+                lambda: legacy_normalize_embed(failed_embed(tb)), number=runs
+            )
+            legacy_ms = f"{legacy / runs * 1e3:9.2f} ms"
+            legacy_kept = kept(tb, legacy_normalize_embed(failed_embed(tb)))
+        else:  # Seconds per run
+            legacy_ms, legacy_kept = "skipped", "-"
+        print(
+            f"{len(tb):>12,} {greedy / runs * 1e3:9.2f} ms {greedy_kept:>8} "
+            f"{legacy_ms:>12} {legacy_kept:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
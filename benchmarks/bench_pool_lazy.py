@@ -0,0 +1,56 @@
+"""Benchmark cold start time and memory of eager versus lazy question pools.
+
+Run from the root of the repository with ``python -m benchmarks.bench_pool_lazy``.
+"""
+
+import argparse
+import gc
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+import yaml
+from bot.core.pool import LazyQuestionPool, QuestionPool
+from bot.core.util import compile_question_pool
+from benchmarks.synthetic import synthetic_pool
+
+
+def measure(label: str, load: Callable[[], QuestionPool]) -> None:
+    """Print how long a question pool takes to load and how much memory it retains."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    pool = load()
+    seconds = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {seconds * 1e3:10.1f} ms {retained / 2 ** 20:10.2f} MiB")
+    del pool
+
+
+def main() -> None:
+    """Load a synthetic question pool eagerly and lazily."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=5_000)
+    parser.add_argument("--exams", type=int, default=50)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = Path(directory) / "question_pool.yaml"
+        with open(filepath, "w") as pool_file:
+            yaml.dump(
+                synthetic_pool(args.questions, args.exams),
+                pool_file,
+                Dumper=getattr(yaml, "CSafeDumper", yaml.SafeDumper),
+            )
+        print(f"Synthetic pool: {args.questions} questions in {args.exams} exams")
+        measure("Eager (YAML)", lambda: QuestionPool.from_file(filepath))
+        compile_question_pool(filepath)
+        measure("Eager (compiled artifact)", lambda: QuestionPool.from_file(filepath))
+        measure("Lazy (headers only)", lambda: LazyQuestionPool.from_file(filepath))
+        lazy_pool = LazyQuestionPool.from_file(filepath)
+        measure("Lazy first use of one exam", lambda: lazy_pool.exam("synthetic0"))
+
+
+if __name__ == "__main__":
+    main()
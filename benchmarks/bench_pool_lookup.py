@@ -0,0 +1,38 @@
+"""Benchmark the per-invocation cost of looking up an exam in the question pool.
+
+Compares re-parsing the question pool YAML file on every command (the original behavior of
+exam_from_pool) against a lookup in the resident, indexed question pool.
+
+Run from the root of the repository with ``python -m benchmarks.bench_pool_lookup``.
+"""
+
+import timeit
+from typing import Optional
+from bot.core.pool import QuestionPool
+from bot.core.util import question_pool
+
+QUESTION_POOL_FILEPATH = "bot/models/question_pool.yaml"
+
+
+def reparse_lookup(exam_name: str) -> Optional[dict]:
+    """Look up an exam by re-parsing the question pool and scanning it linearly."""
+    for exam in question_pool(QUESTION_POOL_FILEPATH):
+        if exam.get("command_name") == exam_name:
+            return exam
+    return None
+
+
+def main() -> None:
+    """Time both lookup strategies for the last exam in the question pool."""
+    pool = QuestionPool.from_file(QUESTION_POOL_FILEPATH)
+    exam_name = pool.exams[-1].get("command_name")
+    reparse_runs = 20
+    resident_runs = 1_000_000
+    reparse = timeit.timeit(lambda: reparse_lookup(exam_name), number=reparse_runs)
+    resident = timeit.timeit(lambda: pool.exam(exam_name), number=resident_runs)
+    print(f"Re-parse per invocation: {reparse / reparse_runs * 1e3:10.3f} ms")
+    print(f"Resident pool lookup:    {resident / resident_runs * 1e9:10.3f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Benchmark loading the question pool at startup from YAML versus its compiled artifact.
+
+Run from the root of the repository with ``python -m benchmarks.bench_pool_startup``. Use
+``--questions`` to change the size of the synthetic question pool; parsing 100,000 questions
+from YAML with the pure-Python SafeLoader takes several minutes.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+import yaml
+from bot.core.util import (
+    compile_question_pool,
+    question_pool,
+    question_pool_artifact_filepath,
+)
+from benchmarks.synthetic import synthetic_pool
+
+
+def main() -> None:
+    """Time loading a synthetic question pool from YAML and from its compiled artifact."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=100_000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = Path(directory) / "question_pool.yaml"
+        with open(filepath, "w") as pool_file:
+            yaml.safe_dump(synthetic_pool(args.questions), pool_file)
+        artifact_filepath = question_pool_artifact_filepath(filepath)
+        print(
+            f"Synthetic pool: {args.questions} questions, {filepath.stat().st_size} bytes"
+        )
+
+        start = time.perf_counter()
+        from_yaml = question_pool(filepath)  # No artifact yet, so YAML is parsed
+        yaml_seconds = time.perf_counter() - start
+
+        compile_question_pool(filepath)
+        start = time.perf_counter()
+        from_artifact = question_pool(filepath)
+        artifact_seconds = time.perf_counter() - start
+
+        assert from_yaml == from_artifact
+        print(f"Artifact: {artifact_filepath.stat().st_size} bytes")
+        print(f"Load from YAML:     {yaml_seconds * 1e3:12.1f} ms")
+        print(f"Load from artifact: {artifact_seconds * 1e3:12.1f} ms")
+        print(f"Speedup:            {yaml_seconds / artifact_seconds:12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark building a question embed from scratch versus from its pre-rendered template.
+
+Also compares shuffling a copy of a question's choices against drawing a choice order from a
+precomputed permutation table.
+
+Run from the root of the repository with ``python -m benchmarks.bench_question_embed``.
+"""
+
+import random
+import timeit
+from bot.core.permutations import random_permutation
+from bot.core.util import sanitize_embed
+from bot.embeds.trivia import trivia_ok_multiple_choice_question, trivia_ok_question
+from bot.models.question import Question
+from benchmarks.synthetic import real_pool
+
+
+def main() -> None:
+    """Time building and sanitizing question embeds both ways."""
+    exam = real_pool()[0]
+    questions = [Question.from_dict(q) for q in exam.get("questions")]
+    runs = 20_000
+    # Draw questions and choice orders up front so that only embed construction is timed.
+    draws = []
+    for _ in range(runs):
+        question = random.choice(questions)
+        draws.append((question, random_permutation(len(question.choices))))
+    build_draws = iter(draws)
+    template_draws = iter(draws)
+
+    def build() -> None:
+        question, order = next(build_draws)
+        sanitize_embed(
+            trivia_ok_multiple_choice_question(
+                exam.get("meta_name"),
+                question.prompt,
+                [question.choices[index].text for index in order],
+            )
+        )
+
+    def template() -> None:
+        question, order = next(template_draws)
+        embed, fits = trivia_ok_question(exam.get("meta_name"), question, order)
+        if not fits:
+            sanitize_embed(embed)
+
+    def shuffle_copy() -> None:
+        choices = list(exam.get("questions")[0].get("choices"))
+        random.shuffle(choices)
+
+    def permutation_table() -> None:
+        random_permutation(len(questions[0].choices))
+
+    for question, order in draws:  # Warm the template cache
+        trivia_ok_question(exam.get("meta_name"), question, order)
+    built = timeit.timeit(build, number=runs)
+    templated = timeit.timeit(template, number=runs)
+    shuffled = timeit.timeit(shuffle_copy, number=runs)
+    permuted = timeit.timeit(permutation_table, number=runs)
+    print(f"Build and sanitize embed:  {built / runs * 1e6:8.2f} us")
+    print(f"Pre-rendered embed:        {templated / runs * 1e6:8.2f} us")
+    print(f"Shuffle copy of choices:   {shuffled / runs * 1e6:8.2f} us")
+    print(f"Permutation table draw:    {permuted / runs * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Benchmark rate limiting hits and the memory kept by token buckets at millions of keys.
+
+Run from the root of the repository with ``python -m benchmarks.bench_ratelimit``.
+"""
+
+import random
+import time
+import tracemalloc
+from bot.core.ratelimit import RateLimiter
+
+
+def main() -> None:
+    """Time hits across three scopes, and measure bucket memory before and after sweeping."""
+    keys = 1_000_000
+    limiter = RateLimiter(period=10, max_keys=keys, user=5, channel=20, guild=60)
+    users = [random.getrandbits(63) for _ in range(keys)]
+    tracemalloc.start()
+    start = time.perf_counter()
+    for index, user in enumerate(users):
+        limiter.hit(now=index / keys, user=user, channel=user >> 4, guild=user >> 8)
+    elapsed = time.perf_counter() - start
+    filled = tracemalloc.get_traced_memory()[0]
+    swept = limiter.sweep(now=11)
+    emptied = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"Hit across three scopes: {elapsed / keys * 1e6:8.2f} us")
+    print(f"Keys kept:               {len(limiter) + swept:>11,}")
+    print(f"Bucket memory:           {filled / 2**20:8.1f} MiB")
+    print(f"Bucket memory per key:   {filled / (len(limiter) + swept):8.1f} bytes")
+    print(f"After sweeping {swept:,} keys: {emptied / 2**20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
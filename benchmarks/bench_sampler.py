@@ -0,0 +1,52 @@
+"""Benchmark drawing questions from shuffle bags, and the memory they keep at 100k channels.
+
+Run from the root of the repository with ``python -m benchmarks.bench_sampler``.
+"""
+
+import random
+import time
+import tracemalloc
+from bot.core.sampler import ShuffleBags
+
+
+def main() -> None:
+    """Time draws across 100,000 channels, and measure bag memory, saving and loading."""
+    channels = 100_000
+    questions = 100
+    draws = 1_000_000
+    bags = ShuffleBags(max_bytes=2**40)
+    ids = [random.getrandbits(63) for _ in range(channels)]
+    tracemalloc.start()
+    for channel in ids:
+        bags.draw(channel, "ccna", questions)
+    kept = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    order = [random.choice(ids) for _ in range(draws)]
+    start = time.perf_counter()
+    for channel in order:
+        bags.draw(channel, "ccna", questions)
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    for channel in order:
+        random.randrange(questions)
+    uniform = time.perf_counter() - start
+    start = time.perf_counter()
+    data = bags.dumps()
+    dumped = time.perf_counter() - start
+    start = time.perf_counter()
+    ShuffleBags(max_bytes=2**40).loads(data)
+    loaded = time.perf_counter() - start
+    print(f"Draw from a shuffle bag:     {elapsed / draws * 1e6:8.2f} us")
+    print(f"Draw uniformly at random:    {uniform / draws * 1e6:8.2f} us")
+    print(f"Bags kept:                   {len(bags):>11,}")
+    print(f"Bag memory:                  {kept / 2**20:8.1f} MiB")
+    print(f"Bag memory per bag:          {kept / channels:8.1f} bytes")
+    print(f"Bag memory accounted:        {bags.bytes / channels:8.1f} bytes per bag")
+    print(
+        f"Serialize bags:              {dumped * 1e3:8.1f} ms ({len(data) / 2**20:.1f} MiB)"
+    )
+    print(f"Load bags:                   {loaded * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Compare the memory and gateway event cost of the bot's client profiles.
+
+For each client profile, runs the real bot in a subprocess connected to a
+benchmarks.fake_discord.FakeDiscord server with the given number of guilds, and measures its
+resident set size once every guild is cached. Everyday guild traffic (messages, typing
+indicators and reactions) is then dispatched to the bot, filtered by the intents it identified
+with as Discord filters it, and the bot's CPU time and wall time to get through it are measured
+until it responds to an interaction sent after the traffic. By default, the bot is in 1,000
+guilds, each of which sees 20 traffic events.
+
+Run from the root of the repository with ``python -m benchmarks.client_profile``.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from typing import List
+from benchmarks.fake_discord import FakeDiscord
+from benchmarks.load_test import QUESTION_POOL_FILEPATH
+
+PROFILES = ("default", "lean")
+
+
+def rss_mib(pid: int) -> float:
+    """Return the resident set size of a process, in MiB."""
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def cpu_seconds(pid: int) -> float:
+    """Return the user and system CPU time consumed by a process so far, in seconds."""
+    with open(f"/proc/{pid}/stat") as stat:
+        # Fields are counted after the command name, which may contain spaces
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def wait_for_responses(discord: FakeDiscord, timeout: float) -> None:
+    """Send a command in a guild of each shard, and wait until every one is responded to.
+
+    Events are handled in order on each shard, so this waits until the bot has processed
+    every event dispatched before.
+    """
+    guilds = {discord.shard_of(guild): guild for guild in discord.guilds}
+    command = next(iter(discord.commands))
+    futures = [
+        await discord.dispatch_interaction(
+            discord.command_interaction(command, guild, 10_000)
+        )
+        for guild in guilds.values()
+    ]
+    await asyncio.wait_for(asyncio.gather(*futures), timeout)
+
+
+async def measure(profile: str, args: argparse.Namespace) -> dict:
+    """Measure the bot running with a client profile."""
+    discord = FakeDiscord(shard_count=args.shards, guild_count=args.guilds)
+    base_url = await discord.start()
+    env = dict(
+        os.environ,
+        DISCORD_TOKEN="fake",
+        QUESTION_POOL_FILEPATH=QUESTION_POOL_FILEPATH,
+        METRICS_PORT="0",
+        LOG_FILEPATH=args.log_filepath,
+        CLIENT_PROFILE=profile,
+        RATE_LIMIT_USER="0",
+        RATE_LIMIT_CHANNEL="0",
+        RATE_LIMIT_GUILD="0",
+    )
+    env.pop("TEST_GUILD", None)
+    bot = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_bot", base_url], env=env
+    )
+    try:
+        await asyncio.wait_for(discord.ready.wait(), args.startup_timeout)
+        while not discord.commands:  # Commands are synced once every shard is connected
+            await asyncio.sleep(0.1)
+        await wait_for_responses(discord, args.timeout)
+        ready_rss = rss_mib(bot.pid)
+        traffic = [
+            (guild, *discord.traffic_event(guild, random.randrange(10_000, 20_000)))
+            for _ in range(args.events_per_guild)
+            for guild in discord.guilds
+        ]
+        cpu_before = cpu_seconds(bot.pid)
+        start = time.perf_counter()
+        delivered = 0
+        for guild, event, data in traffic:
+            delivered += await discord.dispatch_event(guild, event, data)
+        await wait_for_responses(discord, args.timeout)
+        elapsed = time.perf_counter() - start
+        cpu = cpu_seconds(bot.pid) - cpu_before
+        traffic_rss = rss_mib(bot.pid)
+    finally:
+        bot.send_signal(signal.SIGINT)
+        try:
+            bot.wait(10)
+        except subprocess.TimeoutExpired:
+            bot.kill()
+        await discord.stop()
+    return {
+        "rss_mib_ready": round(ready_rss, 1),
+        "rss_mib_after_traffic": round(traffic_rss, 1),
+        "events_offered": len(traffic),
+        "events_delivered": delivered,
+        "cpu_ms": round(cpu * 1e3, 1),
+        "events_per_s": round(len(traffic) / elapsed, 1),
+    }
+
+
+async def run(profiles: List[str], args: argparse.Namespace) -> dict:
+    """Measure each client profile in turn, and return their report."""
+    report = {"guilds": args.guilds, "shards": args.shards, "profiles": {}}
+    for profile in profiles:
+        report["profiles"][profile] = await measure(profile, args)
+    return report
+
+
+def main() -> None:
+    """Compare client profiles and print the report as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES))
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--guilds", type=int, default=1000)
+    parser.add_argument("--events-per-guild", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--log-filepath", default=os.devnull)
+    parser.add_argument("-o", "--output", help="JSON file to write the report to")
+    args = parser.parse_args()
+    report = asyncio.run(run(args.profiles, args))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Compare two result files of the benchmark suite and flag regressions.
+
+Run from the root of the repository with
+``python -m benchmarks.compare benchmarks/results/<base>.json benchmarks/results/<head>.json``.
+Exits with status 1 if any benchmark's minimum time grew by more than the threshold, so that
+regressions between commits can be caught automatically. Minimum times are compared rather
+than medians, since they're the least affected by noise from the rest of the machine.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+def load_results(filepath: Path) -> Tuple[str, Dict[str, Dict[str, float]]]:
+    """Return the commit and results of a result file."""
+    with open(filepath) as results_file:
+        contents = json.load(results_file)
+    return contents.get("commit", str(filepath)), contents["results"]
+
+
+def compare(
+    base: Dict[str, Dict[str, float]],
+    head: Dict[str, Dict[str, float]],
+    threshold: float,
+) -> Tuple[List[str], List[str]]:
+    """Return the lines of a comparison table, and the names of regressed benchmarks."""
+    lines = [f"{'Benchmark':<42} {'Base':>12} {'Head':>12} {'Change':>9}"]
+    regressions = []
+    for name in sorted(base.keys() | head.keys()):
+        if name not in base or name not in head:
+            lines.append(
+                f"{name:<42} {'only in ' + ('base' if name in base else 'head'):>35}"
+            )
+            continue
+        before, after = base[name]["min_ns"], head[name]["min_ns"]
+        change = after / before - 1
+        flag = ""
+        if change > threshold:
+            flag = "  regressed"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  improved"
+        lines.append(
+            f"{name:<42} {before / 1e3:9.2f} us {after / 1e3:9.2f} us {change:+8.1%}{flag}"
+        )
+    return lines, regressions
+
+
+def main() -> None:
+    """Print a comparison of two result files, exiting with status 1 on regressions."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base", type=Path)
+    parser.add_argument("head", type=Path)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative growth of the minimum time reported as a regression",
+    )
+    args = parser.parse_args()
+    base_commit, base = load_results(args.base)
+    head_commit, head = load_results(args.head)
+    print(f"Base: {base_commit}, head: {head_commit}")
+    lines, regressions = compare(base, head, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(
+            f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Run the bot against a fake Discord REST API instead of Discord's.
+
+Run with ``python -m benchmarks.fake_bot <base URL>``, where the base URL is that of a
+benchmarks.fake_discord.FakeDiscord server; benchmarks.load_test does so for each load test.
+The gateway URL is taken from the fake REST API, as it is from Discord's. With ``--cluster``,
+the bot is run as a cluster of worker processes, as bot.cluster does.
+"""
+
+import runpy
+import sys
+from disnake.http import Route
+from bot.core import cluster
+
+
+def main() -> None:
+    """Point disnake at the fake REST API, then run the bot as bot.main or bot.cluster do."""
+    Route.BASE = sys.argv[1]
+    # Workers are spawned with this module's arguments, and run the bot as bot.main does
+    if "--cluster" in sys.argv[2:] and cluster.current_worker is None:
+        from bot.cluster import main as run_cluster
+
+        run_cluster(module=__spec__.name)
+    else:
+        runpy.run_module("bot.main", run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()
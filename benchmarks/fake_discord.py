@@ -0,0 +1,551 @@
+"""Houses a local stand-in for Discord's REST API and gateway, for load testing the bot.
+
+FakeDiscord serves the handful of REST routes the bot uses, and a gateway that identifies any
+number of shards and dispatches INTERACTION_CREATE events on demand, as well as other guild
+traffic to the shards whose intents subscribe to it. Interaction responses are recorded and
+resolve the future returned when their interaction was dispatched, so that a load generator
+can measure the latency of each response; that of a deferred interaction is its first followup.
+Latency can be added to REST responses, and a share of interaction responses can be rejected
+with 429 Too Many Requests.
+"""
+
+import asyncio
+import itertools
+import json
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from aiohttp import WSMsgType, web
+
+API_PREFIX = "/api/v10"
+DISCORD_EPOCH_MS = 1420070400000
+ADMINISTRATOR = str(1 << 3)
+HELLO, HEARTBEAT, IDENTIFY, RESUME, INVALID_SESSION = 10, 1, 2, 6, 9
+DISPATCH, HEARTBEAT_ACK = 0, 11
+DEFERRED_CHANNEL_MESSAGE = 5
+# Intents a shard must have identified with to receive each kind of guild traffic
+GUILD_MESSAGES, GUILD_MESSAGE_REACTIONS, GUILD_MESSAGE_TYPING = 1 << 9, 1 << 10, 1 << 11
+TRAFFIC_INTENTS = {
+    "MESSAGE_CREATE": GUILD_MESSAGES,
+    "MESSAGE_REACTION_ADD": GUILD_MESSAGE_REACTIONS,
+    "TYPING_START": GUILD_MESSAGE_TYPING,
+}
+
+
+class Response(NamedTuple):
+    """Interaction response recorded by the fake server."""
+
+    received_at: float
+    payload: dict
+
+
+def iso_now() -> str:
+    """Return the current time as Discord formats timestamps."""
+    return datetime.now(timezone.utc).isoformat()
+
+
+def json_response(
+    data: Any, status: int = 200, headers: Optional[Dict[str, str]] = None
+) -> web.Response:
+    """Return a JSON response whose content type is exactly what disnake expects.
+
+    aiohttp's json_response() adds a charset to the content type, and disnake only parses
+    responses whose content type is "application/json".
+    """
+    return web.Response(
+        body=json.dumps(data).encode(),
+        status=status,
+        headers={**(headers or {}), "Content-Type": "application/json"},
+    )
+
+
+class Shard:
+    """Gateway connection of one shard."""
+
+    def __init__(
+        self, shard_id: int, ws: web.WebSocketResponse, intents: int = 0
+    ) -> None:
+        """Instantiate a new shard on a gateway connection identified with some intents."""
+        self.shard_id: int = shard_id
+        self.ws: web.WebSocketResponse = ws
+        self.intents: int = intents
+        self.sequence: int = 0
+
+    async def dispatch(self, event: str, data: dict) -> None:
+        """Send a dispatch event to the shard."""
+        self.sequence += 1
+        await self.ws.send_str(
+            json.dumps({"op": DISPATCH, "t": event, "s": self.sequence, "d": data})
+        )
+
+
+class FakeDiscord:
+    """Local stand-in for Discord's REST API and gateway.
+
+    Guilds are spread across shards the way Discord spreads them, by their ID, and each has a
+    single text channel. Interactions must be dispatched on the shard of their guild.
+    """
+
+    def __init__(
+        self,
+        shard_count: int = 1,
+        guild_count: int = 1,
+        latency: float = 0.0,
+        rate_limit_ratio: float = 0.0,
+        retry_after: float = 0.05,
+    ) -> None:
+        """Instantiate a new fake Discord with the given shards and guilds."""
+        self.shard_count: int = shard_count
+        self.latency: float = latency
+        self.rate_limit_ratio: float = rate_limit_ratio
+        self.retry_after: float = retry_after
+        self._sequence = itertools.count()
+        self.application_id: int = self.snowflake()
+        self.bot_user: dict = self.user_payload(self.application_id, "Trivia", bot=True)
+        start_ms = int(time.time() * 1000) - DISCORD_EPOCH_MS - guild_count
+        # Guild IDs must have distinct timestamps to be spread across shards
+        self.guilds: List[int] = [
+            ((start_ms + index) << 22) | index for index in range(guild_count)
+        ]
+        self.channels: Dict[int, int] = {guild: guild + 1 for guild in self.guilds}
+        self.commands: Dict[str, dict] = {}
+        self.shards: Dict[int, Shard] = {}
+        self.responses: List[Response] = []
+        self.rate_limited: int = 0
+        self.unhandled: Dict[str, int] = {}
+        self.ready: asyncio.Event = asyncio.Event()
+        self.deferred: int = 0
+        # Futures of dispatched interactions awaiting their response, by interaction token
+        self._pending: Dict[str, "asyncio.Future[Response]"] = {}
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url: str = ""
+
+    def snowflake(self) -> int:
+        """Return a new snowflake ID for the current time."""
+        milliseconds = int(time.time() * 1000) - DISCORD_EPOCH_MS
+        return (milliseconds << 22) | (next(self._sequence) & 0xFFF)
+
+    def shard_of(self, guild_id: int) -> int:
+        """Return the ID of the shard a guild belongs to."""
+        return (guild_id >> 22) % self.shard_count
+
+    @staticmethod
+    def user_payload(user_id: int, name: str, bot: bool = False) -> dict:
+        """Return the payload of a user."""
+        return {
+            "id": str(user_id),
+            "username": name,
+            "discriminator": "0001",
+            "avatar": None,
+            "bot": bot,
+            "public_flags": 0,
+        }
+
+    def guild_payload(self, guild_id: int) -> dict:
+        """Return the GUILD_CREATE payload of a guild."""
+        return {
+            "id": str(guild_id),
+            "name": f"Guild {guild_id}",
+            "icon": None,
+            "owner_id": str(guild_id),
+            "afk_timeout": 300,
+            "verification_level": 0,
+            "default_message_notifications": 0,
+            "explicit_content_filter": 0,
+            "mfa_level": 0,
+            "nsfw_level": 0,
+            "premium_tier": 0,
+            "preferred_locale": "en-US",
+            "system_channel_flags": 0,
+            "features": [],
+            "emojis": [],
+            "stickers": [],
+            "roles": [
+                {
+                    "id": str(guild_id),
+                    "name": "@everyone",
+                    "permissions": ADMINISTRATOR,
+                    "position": 0,
+                    "color": 0,
+                    "hoist": False,
+                    "managed": False,
+                    "mentionable": False,
+                }
+            ],
+            "channels": [
+                {
+                    "id": str(self.channels[guild_id]),
+                    "type": 0,
+                    "name": "trivia",
+                    "position": 0,
+                    "permission_overwrites": [],
+                    "nsfw": False,
+                    "parent_id": None,
+                    "topic": None,
+                    "rate_limit_per_user": 0,
+                    "last_message_id": None,
+                }
+            ],
+            "threads": [],
+            "members": [],
+            "voice_states": [],
+            "presences": [],
+            "member_count": 1,
+            "large": False,
+            "unavailable": False,
+            "joined_at": iso_now(),
+        }
+
+    def member_payload(self, user_id: int) -> dict:
+        """Return the payload of a guild member invoking an interaction."""
+        return {
+            "user": self.user_payload(user_id, f"User {user_id}"),
+            "roles": [],
+            "joined_at": iso_now(),
+            "deaf": False,
+            "mute": False,
+            "nick": None,
+            "avatar": None,
+            "pending": False,
+            "permissions": ADMINISTRATOR,
+            "communication_disabled_until": None,
+        }
+
+    def message_payload(self, guild_id: int, response: dict) -> dict:
+        """Return the payload of the message an interaction response created."""
+        data = response.get("data", {})
+        return {
+            "id": str(self.snowflake()),
+            "channel_id": str(self.channels[guild_id]),
+            "guild_id": str(guild_id),
+            "author": self.bot_user,
+            "content": data.get("content") or "",
+            "timestamp": iso_now(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": data.get("embeds", []),
+            "components": data.get("components", []),
+            "pinned": False,
+            "type": 0,
+            "flags": data.get("flags", 0),
+        }
+
+    def interaction_payload(
+        self, interaction_type: int, guild_id: int, user_id: int, data: dict
+    ) -> dict:
+        """Return the payload of an interaction invoked by a user in a guild."""
+        return {
+            "id": str(self.snowflake()),
+            "application_id": str(self.application_id),
+            "type": interaction_type,
+            "data": data,
+            "guild_id": str(guild_id),
+            "channel_id": str(self.channels[guild_id]),
+            "member": self.member_payload(user_id),
+            "token": f"token-{random.getrandbits(64):016x}",
+            "version": 1,
+            "app_permissions": ADMINISTRATOR,
+            "locale": "en-US",
+            "guild_locale": "en-US",
+        }
+
+    def command_interaction(self, name: str, guild_id: int, user_id: int) -> dict:
+        """Return the payload of a slash command interaction."""
+        command = self.commands[name]
+        return self.interaction_payload(
+            2, guild_id, user_id, {"id": command["id"], "name": name, "type": 1}
+        )
+
+    def button_interaction(
+        self, message: dict, custom_id: str, guild_id: int, user_id: int
+    ) -> dict:
+        """Return the payload of a click on one of a message's buttons."""
+        payload = self.interaction_payload(
+            3, guild_id, user_id, {"custom_id": custom_id, "component_type": 2}
+        )
+        payload["message"] = message
+        return payload
+
+    def traffic_event(self, guild_id: int, user_id: int) -> Tuple[str, dict]:
+        """Return a random event of the everyday traffic of a guild, other than interactions.
+
+        Messages make up most of it, followed by typing indicators and reactions.
+        """
+        channel_id = str(self.channels[guild_id])
+        roll = random.random()
+        if roll < 0.6:
+            message = self.message_payload(guild_id, {"data": {"content": "x" * 80}})
+            message["author"] = self.user_payload(user_id, f"User {user_id}")
+            message["member"] = {
+                k: v for k, v in self.member_payload(user_id).items() if k != "user"
+            }
+            return "MESSAGE_CREATE", message
+        event = {
+            "channel_id": channel_id,
+            "guild_id": str(guild_id),
+            "user_id": str(user_id),
+            "member": self.member_payload(user_id),
+        }
+        if roll < 0.85:
+            return "TYPING_START", dict(event, timestamp=int(time.time()))
+        return "MESSAGE_REACTION_ADD", dict(
+            event,
+            message_id=str(self.snowflake()),
+            emoji={"id": None, "name": "👍"},
+        )
+
+    async def dispatch_event(self, guild_id: int, event: str, data: dict) -> bool:
+        """Dispatch a guild event on its guild's shard, if the shard subscribed to it.
+
+        Returns:
+            Whether the event was dispatched.
+        """
+        shard = self.shards[self.shard_of(guild_id)]
+        intent = TRAFFIC_INTENTS.get(event, 0)
+        if shard.intents & intent != intent:
+            return False
+        await shard.dispatch(event, data)
+        return True
+
+    async def dispatch_interaction(self, payload: dict) -> "asyncio.Future[Response]":
+        """Dispatch an interaction on its guild's shard.
+
+        Returns:
+            A future resolved with the interaction's response.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending[payload["token"]] = future
+        shard = self.shards[self.shard_of(int(payload["guild_id"]))]
+        await shard.dispatch("INTERACTION_CREATE", payload)
+        return future
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving, and return the base URL of the REST API."""
+        app = web.Application(middlewares=[self.inject_faults])
+        app.router.add_get("/gateway", self.gateway)
+        routes = [
+            ("GET", "/gateway", self.get_gateway),
+            ("GET", "/gateway/bot", self.get_gateway),
+            ("GET", "/users/@me", self.get_current_user),
+            ("GET", "/oauth2/applications/@me", self.get_application),
+            ("GET", "/applications/{application_id}/commands", self.get_commands),
+            ("PUT", "/applications/{application_id}/commands", self.put_commands),
+            (
+                "GET",
+                "/applications/{application_id}/guilds/{guild_id}/commands",
+                self.get_guild_commands,
+            ),
+            (
+                "PUT",
+                "/applications/{application_id}/guilds/{guild_id}/commands",
+                self.get_guild_commands,
+            ),
+            ("POST", "/interactions/{interaction_id}/{token}/callback", self.callback),
+            ("POST", "/webhooks/{application_id}/{token}", self.followup),
+            (
+                "PATCH",
+                "/webhooks/{application_id}/{token}/messages/{message_id}",
+                self.edit_message,
+            ),
+        ]
+        for method, path, handler in routes:
+            app.router.add_route(method, API_PREFIX + path, handler)
+        app.router.add_route("*", API_PREFIX + "/{path:.*}", self.unhandled_route)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.base_url = f"http://{host}:{port}{API_PREFIX}"
+        self._gateway_url = f"ws://{host}:{port}/gateway"
+        return self.base_url
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        for shard in list(self.shards.values()):
+            await shard.ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    @web.middleware
+    async def inject_faults(
+        self, request: web.Request, handler: Any
+    ) -> web.StreamResponse:
+        """Delay REST responses, and reject a share of interaction responses with 429."""
+        if request.path == "/gateway":
+            return await handler(request)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        interaction_route = (
+            "/interactions/" in request.path or "/webhooks/" in request.path
+        )
+        if interaction_route and random.random() < self.rate_limit_ratio:
+            self.rate_limited += 1
+            return json_response(
+                {
+                    "message": "You are being rate limited.",
+                    "retry_after": self.retry_after,
+                    "global": False,
+                },
+                status=429,
+                headers={
+                    "X-RateLimit-Limit": "5",
+                    "X-RateLimit-Remaining": "0",
+                    "X-RateLimit-Reset-After": str(self.retry_after),
+                    "X-RateLimit-Bucket": "fake",
+                    "Retry-After": str(self.retry_after),
+                    "Via": "1.1 google",
+                },
+            )
+        return await handler(request)
+
+    async def get_gateway(self, request: web.Request) -> web.Response:
+        """Return the gateway URL and recommended shard count."""
+        return json_response(
+            {
+                "url": self._gateway_url,
+                "shards": self.shard_count,
+                "session_start_limit": {
+                    "total": 1000,
+                    "remaining": 1000,
+                    "reset_after": 0,
+                    "max_concurrency": 16,
+                },
+            }
+        )
+
+    async def get_current_user(self, request: web.Request) -> web.Response:
+        """Return the bot's user."""
+        return json_response(self.bot_user)
+
+    async def get_application(self, request: web.Request) -> web.Response:
+        """Return the bot's application."""
+        return json_response(
+            {
+                "id": str(self.application_id),
+                "name": self.bot_user["username"],
+                "icon": None,
+                "description": "",
+                "rpc_origins": [],
+                "bot_public": True,
+                "bot_require_code_grant": False,
+                "owner": self.user_payload(1, "Owner"),
+                "summary": "",
+                "verify_key": "",
+                "team": None,
+                "flags": 0,
+            }
+        )
+
+    async def get_commands(self, request: web.Request) -> web.Response:
+        """Return the global application commands."""
+        return json_response(list(self.commands.values()))
+
+    async def put_commands(self, request: web.Request) -> web.Response:
+        """Overwrite the global application commands, assigning them IDs."""
+        commands = await request.json()
+        self.commands = {
+            command["name"]: {
+                **command,
+                "id": str(self.snowflake()),
+                "application_id": str(self.application_id),
+                "version": str(self.snowflake()),
+                "type": command.get("type", 1),
+            }
+            for command in commands
+        }
+        return json_response(list(self.commands.values()))
+
+    async def get_guild_commands(self, request: web.Request) -> web.Response:
+        """Return no guild application commands."""
+        return json_response([])
+
+    async def callback(self, request: web.Request) -> web.Response:
+        """Record an interaction's initial response.
+
+        Deferred interactions are only resolved by their first followup.
+        """
+        payload = await request.json()
+        if payload.get("type") == DEFERRED_CHANNEL_MESSAGE:
+            self.deferred += 1
+        else:
+            self.respond(request.match_info["token"], payload)
+        return web.Response(status=204)
+
+    async def followup(self, request: web.Request) -> web.Response:
+        """Record a followup message, and return the message it created."""
+        payload = await request.json()
+        self.respond(request.match_info["token"], {"type": 4, "data": payload})
+        return json_response(self.message_payload(self.guilds[0], {"data": payload}))
+
+    def respond(self, token: str, payload: dict) -> None:
+        """Record a response, resolving its interaction's future if it's the first."""
+        response = Response(time.perf_counter(), payload)
+        self.responses.append(response)
+        future = self._pending.pop(token, None)
+        if future is not None and not future.done():
+            future.set_result(response)
+
+    async def edit_message(self, request: web.Request) -> web.Response:
+        """Return an edited interaction response message."""
+        payload = await request.json()
+        return json_response(self.message_payload(self.guilds[0], {"data": payload}))
+
+    async def unhandled_route(self, request: web.Request) -> web.Response:
+        """Count requests to routes the fake server doesn't serve."""
+        key = f"{request.method} {request.match_info['path']}"
+        self.unhandled[key] = self.unhandled.get(key, 0) + 1
+        return json_response({"message": "Unknown route", "code": 0}, status=404)
+
+    async def gateway(self, request: web.Request) -> web.WebSocketResponse:
+        """Serve one shard's gateway connection."""
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({"op": HELLO, "d": {"heartbeat_interval": 41250}})
+        shard: Optional[Shard] = None
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                break
+            payload = json.loads(message.data)
+            op = payload.get("op")
+            if op == HEARTBEAT:
+                await ws.send_json({"op": HEARTBEAT_ACK})
+            elif op == IDENTIFY:
+                shard_id, _ = payload["d"].get("shard", [0, 1])
+                shard = self.shards[shard_id] = Shard(
+                    shard_id, ws, payload["d"].get("intents", 0)
+                )
+                await self.identify(shard)
+            elif op == RESUME:
+                await ws.send_json({"op": INVALID_SESSION, "d": False})
+        if shard is not None and self.shards.get(shard.shard_id) is shard:
+            del self.shards[shard.shard_id]
+        return ws
+
+    async def identify(self, shard: Shard) -> None:
+        """Send READY and the GUILD_CREATE of each of a shard's guilds."""
+        guilds = [
+            guild for guild in self.guilds if self.shard_of(guild) == shard.shard_id
+        ]
+        await shard.dispatch(
+            "READY",
+            {
+                "v": 10,
+                "user": self.bot_user,
+                "guilds": [{"id": str(guild), "unavailable": True} for guild in guilds],
+                "session_id": f"session-{shard.shard_id}",
+                "resume_gateway_url": self._gateway_url,
+                "shard": [shard.shard_id, self.shard_count],
+                "application": {"id": str(self.application_id), "flags": 0},
+                "private_channels": [],
+            },
+        )
+        for guild in guilds:
+            await shard.dispatch("GUILD_CREATE", self.guild_payload(guild))
+        if len(self.shards) == self.shard_count:
+            self.ready.set()
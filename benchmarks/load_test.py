@@ -0,0 +1,249 @@
+"""Load test the bot end to end against a local fake Discord.
+
+Runs the real bot in a subprocess, optionally as a cluster of worker processes, connected to a
+benchmarks.fake_discord.FakeDiscord server with the given number of shards. Concurrent
+simulated users then invoke trivia commands and click one of the answer choices of each
+question they're asked, for a fixed duration. Reports interactions per second, p50 and p99
+response latency, and the bot's event loop lag, which is read from the bot's own metrics.
+
+Run from the root of the repository with ``python -m benchmarks.load_test``. The bot's rate
+limits are disabled unless ``--rate-limits`` is passed, since the simulated users would
+otherwise mostly measure how fast the bot turns them away.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+import aiohttp
+from benchmarks.fake_discord import FakeDiscord
+
+QUESTION_POOL_FILEPATH = "bot/models/question_pool.yaml"
+
+
+def free_port() -> int:
+    """Return a TCP port that's free on the loopback interface."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Return a percentile of a list of values, or NaN if it's empty."""
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+async def scrape_histogram(urls: List[str], name: str) -> Dict[float, float]:
+    """Return the cumulative bucket counts of an unlabelled histogram, summed across processes."""
+    buckets: Dict[float, float] = {}
+    prefix = f'{name}_bucket{{le="'
+    async with aiohttp.ClientSession() as session:
+        for url in urls:
+            async with session.get(url) as response:
+                text = await response.text()
+            for line in text.splitlines():
+                if line.startswith(prefix):
+                    bound, count = line.split('le="', 1)[1].split('"} ')
+                    buckets[float(bound)] = buckets.get(float(bound), 0) + float(count)
+    return buckets
+
+
+def histogram_percentile(
+    before: Dict[float, float], after: Dict[float, float], fraction: float
+) -> float:
+    """Return the bucket bound below which a fraction of the values observed in between fall."""
+    counts = [(bound, after[bound] - before.get(bound, 0)) for bound in sorted(after)]
+    if not counts or counts[-1][1] == 0:
+        return float("nan")
+    for bound, count in counts:
+        if count >= fraction * counts[-1][1]:
+            return bound
+    return float("inf")
+
+
+class LoadTest:
+    """Simulated users driving the bot through a fake Discord."""
+
+    def __init__(self, discord: FakeDiscord, rate: float, timeout: float) -> None:
+        """Instantiate a new load test, capped at rate interactions per second if non-zero."""
+        self.discord: FakeDiscord = discord
+        self.interval: float = 1 / rate if rate else 0.0
+        self.timeout: float = timeout
+        self.latencies: Dict[str, List[float]] = {"command": [], "answer": []}
+        self.timeouts: int = 0
+        self._next_send: float = 0.0
+
+    async def pace(self) -> None:
+        """Wait for the next interaction to be allowed by the rate cap."""
+        if not self.interval:
+            return
+        now = time.perf_counter()
+        self._next_send = max(self._next_send + self.interval, now)
+        await asyncio.sleep(self._next_send - now)
+
+    async def interact(self, kind: str, payload: dict) -> Optional[dict]:
+        """Dispatch an interaction and wait for its response, recording its latency."""
+        await self.pace()
+        start = time.perf_counter()
+        future = await self.discord.dispatch_interaction(payload)
+        try:
+            response = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return None
+        self.latencies[kind].append(response.received_at - start)
+        return response.payload
+
+    async def user(self, user_id: int, deadline: float) -> None:
+        """Ask for questions and answer them until the deadline."""
+        commands = list(self.discord.commands)
+        while time.perf_counter() < deadline:
+            guild_id = random.choice(self.discord.guilds)
+            command = self.discord.command_interaction(
+                random.choice(commands), guild_id, user_id
+            )
+            response = await self.interact("command", command)
+            buttons = [
+                component["custom_id"]
+                for row in (response or {}).get("data", {}).get("components", [])
+                for component in row.get("components", [])
+            ]
+            if not buttons:
+                continue
+            message = self.discord.message_payload(guild_id, response)
+            click = self.discord.button_interaction(
+                message, random.choice(buttons), guild_id, user_id
+            )
+            await self.interact("answer", click)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Run one load test and return its report."""
+    discord = FakeDiscord(
+        shard_count=args.shards,
+        guild_count=max(args.guilds, args.shards),
+        latency=args.latency,
+        rate_limit_ratio=args.rate_limit_ratio,
+    )
+    base_url = await discord.start()
+    metrics_port = free_port()
+    env = dict(
+        os.environ,
+        DISCORD_TOKEN="fake",
+        QUESTION_POOL_FILEPATH=QUESTION_POOL_FILEPATH,
+        METRICS_PORT=str(metrics_port),
+        LOG_FILEPATH=args.log_filepath,
+    )
+    env.pop("TEST_GUILD", None)
+    if not args.rate_limits:
+        env.update(RATE_LIMIT_USER="0", RATE_LIMIT_CHANNEL="0", RATE_LIMIT_GUILD="0")
+    command = [sys.executable, "-m", "benchmarks.fake_bot", base_url]
+    processes = 1
+    if args.workers:
+        command.append("--cluster")
+        env.update(CLUSTER_WORKERS=str(args.workers), SHARD_COUNT=str(args.shards))
+        processes = min(args.workers, args.shards)
+    bot = subprocess.Popen(command, env=env)
+    # Each worker of a cluster serves metrics on its own port, counting up from the cluster's
+    metrics_urls = [
+        f"http://127.0.0.1:{metrics_port + index}/metrics" for index in range(processes)
+    ]
+    lag_histogram = "trivia_event_loop_lag_seconds"
+    try:
+        await asyncio.wait_for(discord.ready.wait(), args.startup_timeout)
+        while not discord.commands:  # Commands are synced once every shard is connected
+            await asyncio.sleep(0.1)
+        await asyncio.sleep(1)  # Let on_ready start the bot's tasks
+        lag_before = await scrape_histogram(metrics_urls, lag_histogram)
+        load_test = LoadTest(discord, rate=args.rate, timeout=args.timeout)
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(
+            *(load_test.user(10_000 + user, deadline) for user in range(args.users))
+        )
+        elapsed = time.perf_counter() - start
+        lag_after = await scrape_histogram(metrics_urls, lag_histogram)
+    finally:
+        bot.send_signal(signal.SIGINT)
+        try:
+            bot.wait(10)
+        except subprocess.TimeoutExpired:
+            bot.kill()
+        await discord.stop()
+    latencies = load_test.latencies["command"] + load_test.latencies["answer"]
+    return {
+        "shards": args.shards,
+        "processes": processes,
+        "users": args.users,
+        "guilds": len(discord.guilds),
+        "duration_s": round(elapsed, 3),
+        "interactions": len(latencies),
+        "interactions_per_s": round(len(latencies) / elapsed, 1),
+        "timeouts": load_test.timeouts,
+        "rate_limited_responses": discord.rate_limited,
+        "deferred_responses": discord.deferred,
+        "latency_ms": {
+            kind: {
+                "p50": round(percentile(values, 0.5) * 1e3, 3),
+                "p99": round(percentile(values, 0.99) * 1e3, 3),
+            }
+            for kind, values in load_test.latencies.items()
+        },
+        "loop_lag_ms": {
+            "p50_at_most": histogram_percentile(lag_before, lag_after, 0.5) * 1e3,
+            "p99_at_most": histogram_percentile(lag_before, lag_after, 0.99) * 1e3,
+        },
+        "unhandled_routes": discord.unhandled,
+    }
+
+
+def main() -> None:
+    """Run a load test and print its report as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Run the bot as a cluster of this many processes",
+    )
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--guilds", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument(
+        "--rate", type=float, default=0.0, help="Cap on interactions per second"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds added to REST responses"
+    )
+    parser.add_argument(
+        "--rate-limit-ratio",
+        type=float,
+        default=0.0,
+        help="Share of interaction responses rejected with 429",
+    )
+    parser.add_argument("--rate-limits", action="store_true")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--log-filepath", default=os.devnull)
+    parser.add_argument("-o", "--output", help="JSON file to write the report to")
+    args = parser.parse_args()
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
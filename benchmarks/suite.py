@@ -0,0 +1,420 @@
+"""Run the microbenchmark suite of the bot's hot paths and store its results as JSON.
+
+Question pool benchmarks run against synthetic question pools at 1x, 10x and 100x the size of
+the real question pool; embed benchmarks run against realistic question embeds as well as
+adversarial embeds that stress normalization. Each benchmark reports the minimum and median
+time per call over several repeats.
+
+Run from the root of the repository with ``python -m benchmarks.suite`` or ``make bench``.
+Results are written to benchmarks/results/<commit>.json by default, and two result files can be
+compared with ``python -m benchmarks.compare``.
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Sequence
+import structlog
+import yaml
+from disnake import Embed
+from bot.core.log import render, setup_logging
+from bot.core.mapped_pool import MappedQuestionPool
+from bot.core.pool import QuestionPool, swap_pool
+from bot.core.sampler import ShuffleBags
+from bot.core.tags import TagIndex, popcount, select
+from bot.core.util import (
+    exam_from_pool,
+    normalize_embed,
+    question_pool,
+    question_pool_artifact_filepath,
+    sanitize_embed,
+    write_question_pool_artifact,
+)
+from bot.embeds import command_failed
+from bot.embeds.trivia import trivia_ok_multiple_choice_question, trivia_ok_question
+from bot.models.question import Question
+from bot.views import answer_choices
+from benchmarks.synthetic import real_pool, synthetic_pool
+
+SCALES = (1, 10, 100)
+RESULTS_DIRECTORY = Path("benchmarks/results")
+# Holds synthetic question pool files, and is removed when the interpreter exits
+POOL_DIRECTORY = tempfile.TemporaryDirectory(prefix="trivia-bench-")
+
+
+class Benchmark(NamedTuple):
+    """Benchmark whose setup returns the function to time for a question pool scale."""
+
+    name: str
+    setup: Callable[[int], Callable[[], Any]]
+    scales: Sequence[int]
+
+
+BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(name: str, scales: Sequence[int] = (1,)) -> Callable:
+    """Register a benchmark's setup function, run at each of the given scales."""
+
+    def register(setup: Callable[[int], Callable[[], Any]]) -> Callable:
+        BENCHMARKS.append(Benchmark(name, setup, scales))
+        return setup
+
+    return register
+
+
+@lru_cache(maxsize=None)
+def pool_exams(scale: int) -> List[dict]:
+    """Return a synthetic question pool at a multiple of the real question pool's size."""
+    exams = real_pool()
+    total_questions = sum(len(exam.get("questions")) for exam in exams)
+    return synthetic_pool(total_questions * scale, total_exams=len(exams) * scale)
+
+
+@lru_cache(maxsize=None)
+def pool_filepath(scale: int) -> Path:
+    """Write a synthetic question pool and its compiled artifact to a temporary file."""
+    filepath = Path(POOL_DIRECTORY.name) / f"question_pool_{scale}x.yaml"
+    contents = yaml.dump(
+        pool_exams(scale), Dumper=getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+    ).encode()
+    filepath.write_bytes(contents)
+    write_question_pool_artifact(
+        question_pool_artifact_filepath(filepath),
+        hashlib.sha256(contents).digest(),
+        pool_exams(scale),
+    )
+    return filepath
+
+
+@lru_cache(maxsize=None)
+def resident_pool(scale: int) -> QuestionPool:
+    """Return a question pool built from a synthetic question pool."""
+    return QuestionPool(pool_exams(scale))
+
+
+def question_embed() -> Embed:
+    """Return a question embed as the bot used to build it for every command."""
+    exam = real_pool()[0]
+    question = exam.get("questions")[0]
+    return trivia_ok_multiple_choice_question(
+        exam.get("meta_name"),
+        question.get("prompt"),
+        [choice.get("text") for choice in question.get("choices")],
+    )
+
+
+def adversarial_embeds() -> Dict[str, Embed]:
+    """Return embeds that each stress a different part of embed normalization."""
+    traceback = "".join(
+        f'  File "bot/module_{i}.py", line {i}, in function_{i}\n    call_{i}()\n'
+        for i in range(2_000)
+    )
+    long_line = Embed(title="Long line")
+    long_line.add_field(name="Value", value="x" * 50_000)
+    many_fields = Embed(title="Many fields")
+    for i in range(100):
+        many_fields.add_field(name=f"Field {i}", value="y" * 1_000)
+    oversize = Embed(title="t" * 300, description="d" * 5_000)
+    oversize.add_field(name="n" * 300, value="v\n" * 1_000)
+    return {
+        "traceback": command_failed(
+            command="ccna",
+            error_checksum="0" * 40,
+            error_id="0" * 36,
+            traceback=traceback,
+        ),
+        "long_line": long_line,
+        "many_fields": many_fields,
+        "oversize": oversize,
+    }
+
+
+@benchmark("question_pool_artifact", scales=SCALES)
+def bench_question_pool_artifact(scale: int) -> Callable[[], Any]:
+    """Load a question pool from its compiled artifact."""
+    filepath = pool_filepath(scale)
+    return lambda: question_pool(filepath)
+
+
+@benchmark("question_pool_yaml", scales=(1, 10))
+def bench_question_pool_yaml(scale: int) -> Callable[[], Any]:
+    """Parse a question pool's YAML file, as when its artifact is stale."""
+    contents = pool_filepath(scale).read_bytes()
+    return lambda: yaml.load(contents, yaml.SafeLoader)
+
+
+@benchmark("question_pool_index", scales=SCALES)
+def bench_question_pool_index(scale: int) -> Callable[[], Any]:
+    """Build a resident question pool from parsed exams, as on every (re)load."""
+    exams = pool_exams(scale)
+    return lambda: QuestionPool(exams)
+
+
+@benchmark("exam_from_pool", scales=SCALES)
+def bench_exam_from_pool(scale: int) -> Callable[[], Any]:
+    """Look up the last exam of the resident question pool."""
+    pool = resident_pool(scale)
+    command_name = pool.exams[-1].get("command_name")
+
+    def lookup() -> Any:
+        swap_pool(pool)
+        return exam_from_pool(command_name)
+
+    return lookup
+
+
+@benchmark("pool_question", scales=SCALES)
+def bench_pool_question(scale: int) -> Callable[[], Any]:
+    """Resolve an answer choice's question from its custom ID fields."""
+    pool = resident_pool(scale)
+    exam = pool.exams[-1]
+    index = len(exam.get("questions")) - 1
+    key = exam.get("questions")[index].key
+    return lambda: pool.question(exam.get("command_name"), index, key)
+
+
+@lru_cache(maxsize=None)
+def tagged_exam(scale: int) -> QuestionPool:
+    """Return a resident question pool of one exam as large as the real question pool, scaled."""
+    exams = real_pool()
+    total_questions = sum(len(exam.get("questions")) for exam in exams)
+    return QuestionPool(synthetic_pool(total_questions * scale, total_exams=1))
+
+
+@benchmark("tag_index_build", scales=SCALES)
+def bench_tag_index_build(scale: int) -> Callable[[], Any]:
+    """Index the question tags of a single exam, as on every (re)load."""
+    questions = tagged_exam(scale).exams[0].get("questions")
+    return lambda: TagIndex.from_questions(question.tags for question in questions)
+
+
+@benchmark("tag_filtered_pick", scales=SCALES)
+def bench_tag_filtered_pick(scale: int) -> Callable[[], Any]:
+    """Pick a random question of a single exam tagged with either of two tags."""
+    pool = tagged_exam(scale)
+    index = pool.tag_index(pool.exams[0].get("command_name"))
+    tags = ["OSPF", "Subnetting"]
+
+    def pick() -> int:
+        matching = index.questions(tags, match_all=False)
+        return select(matching, random.randrange(popcount(matching)))
+
+    return pick
+
+
+@lru_cache(maxsize=None)
+def mapped_pool(scale: int) -> MappedQuestionPool:
+    """Return a mapped question pool of a synthetic question pool, compiling its file."""
+    return MappedQuestionPool.from_file(pool_filepath(scale))
+
+
+@benchmark("mapped_pool_open", scales=SCALES)
+def bench_mapped_pool_open(scale: int) -> Callable[[], Any]:
+    """Map an already compiled question pool file, as every worker of a cluster does."""
+    filepath = pool_filepath(scale)
+    mapped_pool(scale)
+    return lambda: MappedQuestionPool.from_file(filepath)
+
+
+@benchmark("mapped_pool_question", scales=SCALES)
+def bench_mapped_pool_question(scale: int) -> Callable[[], Any]:
+    """Resolve and decode an answer choice's question from a mapped question pool."""
+    pool = mapped_pool(scale)
+    exam = pool.exams[-1]
+    index = len(exam.get("questions")) - 1
+    key = exam.get("questions").key(index)
+    return lambda: pool.question(exam.get("command_name"), index, key)
+
+
+@benchmark("shuffle_bag_draw")
+def bench_shuffle_bag_draw(scale: int) -> Callable[[], Any]:
+    """Draw a question from the shuffle bag of one of 100,000 active channels."""
+    bags = ShuffleBags(max_bytes=2**40)
+    channels = itertools.cycle(range(100_000))
+    for channel in range(100_000):
+        bags.draw(channel, "ccna", 100)
+    return lambda: bags.draw(next(channels), "ccna", 100)
+
+
+@benchmark("trivia_ok_multiple_choice_question")
+def bench_trivia_ok_multiple_choice_question(scale: int) -> Callable[[], Any]:
+    """Build a question embed from scratch."""
+    exam = real_pool()[0]
+    question = exam.get("questions")[0]
+    choices = [choice.get("text") for choice in question.get("choices")]
+    return lambda: trivia_ok_multiple_choice_question(
+        exam.get("meta_name"), question.get("prompt"), choices
+    )
+
+
+@benchmark("trivia_ok_question")
+def bench_trivia_ok_question(scale: int) -> Callable[[], Any]:
+    """Build a question embed from its pre-rendered template."""
+    exam = real_pool()[0]
+    question = Question.from_dict(exam.get("questions")[0])
+    order = list(reversed(range(len(question.choices))))
+    # Warm the template cache
+    trivia_ok_question(exam.get("meta_name"), question, order)
+    return lambda: trivia_ok_question(exam.get("meta_name"), question, order)
+
+
+@benchmark("answer_choices")
+def bench_answer_choices(scale: int) -> Callable[[], Any]:
+    """Build the answer choice buttons of a question."""
+    question = Question.from_dict(real_pool()[0].get("questions")[0])
+    order = list(range(len(question.choices)))
+    return lambda: answer_choices("ccna", 0, question, order)
+
+
+@benchmark("sanitize_embed[question]")
+def bench_sanitize_question_embed(scale: int) -> Callable[[], Any]:
+    """Sanitize a realistic question embed."""
+    embed = question_embed()
+    return lambda: sanitize_embed(embed)
+
+
+def register_normalize_benchmarks() -> None:
+    """Register a normalize_embed benchmark for each adversarial embed."""
+    for name in adversarial_embeds():
+
+        def setup(scale: int, name: str = name) -> Callable[[], Any]:
+            embed = adversarial_embeds()[name]
+            return lambda: normalize_embed(embed)
+
+        benchmark(f"normalize_embed[{name}]")(setup)
+
+
+register_normalize_benchmarks()
+
+
+@benchmark("log_render")
+def bench_log_render(scale: int) -> Callable[[], Any]:
+    """Render a log event like those of sent questions, as the writer thread does."""
+    event_dict = {
+        "event": "Sent embeds",
+        "guild_id": 1,
+        "guild_name": "Guild",
+        "channel_id": 2,
+        "channel_name": "channel",
+        "embeds": [question_embed().to_dict()],
+    }
+    return lambda: render(("info", 0.0, dict(event_dict)))
+
+
+@benchmark("log_event")
+def bench_log_event(scale: int) -> Callable[[], Any]:
+    """Log an event through the logging pipeline, blocking whenever its queue is full.
+
+    This measures the sustained cost of logging on the event loop, including the time the
+    writer thread holds the GIL.
+    """
+    setup_logging(filepath=os.devnull, queue_size=1_000, overflow="block")
+    logger = structlog.getLogger(name=__name__)
+    return lambda: logger.info("Answer selected", command_name="ccna", choice_id=1)
+
+
+def git_commit() -> str:
+    """Return the short hash of the checked out commit, or "unknown" outside a repository."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def measure(func: Callable[[], Any], repeat: int, min_time: float) -> Dict[str, float]:
+    """Time a function, calling it enough times per repeat to take at least min_time."""
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 10
+    per_call = [elapsed / number for elapsed in timer.repeat(repeat, number)]
+    return {
+        "min_ns": min(per_call) * 1e9,
+        "median_ns": statistics.median(per_call) * 1e9,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run(
+    selected: str = "",
+    scales: Sequence[int] = SCALES,
+    repeat: int = 5,
+    min_time: float = 0.1,
+) -> Dict[str, Dict[str, float]]:
+    """Run the benchmarks whose names contain selected, and return their results by name."""
+    results = {}
+    for bench in BENCHMARKS:
+        for scale in bench.scales:
+            if scale not in scales:
+                continue
+            name = f"{bench.name}@{scale}x" if len(bench.scales) > 1 else bench.name
+            if selected not in name:
+                continue
+            result = measure(bench.setup(scale), repeat, min_time)
+            results[name] = result
+            print(
+                f"{name:<42} {result['min_ns'] / 1e3:12.2f} us "
+                f"{result['median_ns'] / 1e3:12.2f} us",
+                file=sys.stderr,
+            )
+    structlog.reset_defaults()
+    return results
+
+
+def main() -> None:
+    """Run the benchmark suite and write its results to a JSON file."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-k", "--select", default="", help="Only run matching benchmarks"
+    )
+    parser.add_argument(
+        "--scales", type=int, nargs="+", default=list(SCALES), help="Pool scales to run"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.1)
+    parser.add_argument(
+        "-o", "--output", type=Path, help="JSON file to write results to"
+    )
+    args = parser.parse_args()
+    commit = git_commit()
+    output = args.output or RESULTS_DIRECTORY / f"{commit}.json"
+    print(f"{'Benchmark':<42} {'Min':>15} {'Median':>15}", file=sys.stderr)
+    results = run(args.select, args.scales, args.repeat, args.min_time)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as output_file:
+        json.dump(
+            {
+                "commit": commit,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            },
+            output_file,
+            indent=2,
+        )
+        output_file.write("\n")
+    print(f"Results written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
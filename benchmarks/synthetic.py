@@ -0,0 +1,40 @@
+"""Builds synthetic question pools scaled up from the real question pool."""
+
+import copy
+from itertools import cycle
+from typing import List
+from yaml import SafeLoader, load
+
+QUESTION_POOL_FILEPATH = "bot/models/question_pool.yaml"
+
+
+def real_pool() -> List[dict]:
+    """Return the contents of the real question pool."""
+    with open(QUESTION_POOL_FILEPATH) as pool_file:
+        return load(pool_file, SafeLoader)
+
+
+def synthetic_pool(total_questions: int, total_exams: int = 3) -> List[dict]:
+    """Return a question pool with the given number of questions spread across exams.
+
+    Questions are copied round-robin from the real question pool, with a numeric suffix added to
+    each prompt so that every question is distinct.
+    """
+    questions = [q for exam in real_pool() for q in exam.get("questions")]
+    exams = [
+        {
+            "meta_name": f"Synthetic Exam {index}",
+            "meta_description": f"Synthetic question pool number {index}.",
+            "command_name": f"synthetic{index}",
+            "command_description": f"Get a question from synthetic exam {index}.",
+            "questions": [],
+        }
+        for index in range(total_exams)
+    ]
+    for number, question, exam in zip(
+        range(total_questions), cycle(questions), cycle(exams)
+    ):
+        question = copy.deepcopy(question)
+        question["prompt"] = f"{question['prompt']} ({number})"
+        exam["questions"].append(question)
+    return exams
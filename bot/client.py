@@ -2,31 +2,71 @@
 
 import structlog
 from disnake.ext import commands
-from disnake import AllowedMentions, Intents
+from disnake import AllowedMentions, Intents, MemberCacheFlags
+from bot.core import cluster
 from bot.core.config import settings
+from bot.core.metrics import registry
 
 logger = structlog.getLogger(name=__name__)
 
 
-logger.info("Instantiating bot")
-intents = Intents.default()
+CLIENT_PROFILES = ("default", "lean")
 
-sync_commands_debug = True if settings.TEST_GUILD else False
 
+def client_options(profile: str) -> dict:
+    """Return the intents and cache options of a client profile.
+
+    The default profile subscribes to the default intents and caches recent messages. The lean
+    profile only subscribes to guild events, since the bot only serves interactions and reads
+    guild and channel names from the guild cache, and caches no messages or members; the
+    members of interactions are built from their payloads.
+    """
+    if profile not in CLIENT_PROFILES:
+        raise ValueError(f"Unknown client profile: {profile}")
+    if profile == "lean":
+        return {
+            "intents": Intents(guilds=True),
+            "max_messages": None,
+            "member_cache_flags": MemberCacheFlags.none(),
+            "chunk_guilds_at_startup": False,
+        }
+    return {"intents": Intents.default(), "max_messages": 10000}
+
+
+logger.info("Instantiating bot", client_profile=settings.CLIENT_PROFILE)
+options = client_options(settings.CLIENT_PROFILE)
+
+sync_commands_debug = True if settings.TEST_GUILD else False
 if sync_commands_debug and settings.TEST_GUILD is not None:
-    discord_bot = commands.AutoShardedBot(
-        allowed_mentions=AllowedMentions(everyone=False),
-        max_messages=10000,
-        help_command=None,
-        test_guilds=[settings.TEST_GUILD],
-        sync_commands_debug=sync_commands_debug,
-    )
-else:
-    discord_bot = commands.AutoShardedBot(
-        allowed_mentions=AllowedMentions(everyone=False),
-        intents=intents,
-        max_messages=10000,
-        help_command=None,
+    options.update(
+        test_guilds=[settings.TEST_GUILD], sync_commands_debug=sync_commands_debug
     )
 
+discord_bot = commands.AutoShardedBot(
+    allowed_mentions=AllowedMentions(everyone=False),
+    help_command=None,
+    sync_commands=settings.SYNC_COMMANDS,
+    shard_ids=settings.SHARD_IDS,
+    shard_count=settings.SHARD_COUNT,
+    **options,
+)
+
+if cluster.current_worker is not None:
+    # Identify as the cluster's shared rate limit allows, rather than every five seconds
+    discord_bot.before_identify_hook = cluster.current_worker.before_identify
+
+registry.gauge(
+    "discord_shard_latency_seconds",
+    "Latency between a gateway heartbeat and its acknowledgement, by shard.",
+    ("shard_id",),
+    callback=lambda: {
+        (str(shard_id),): latency for shard_id, latency in discord_bot.latencies
+    },
+)
+registry.gauge(
+    "discord_guilds",
+    "Guilds the bot is a member of.",
+    callback=lambda: len(discord_bot.guilds),
+)
+
 logger.info("Bot instantiated")
@@ -0,0 +1,73 @@
+"""Run the bot as a cluster of worker processes, each connecting a range of shards to Discord.
+
+Run with ``python -m bot.cluster``. The shard count is taken from the SHARD_COUNT setting, or
+Discord's recommendation otherwise, and split across CLUSTER_WORKERS processes, or one per CPU
+core if it's 0. Each worker runs bot.main for its shards, serving metrics on METRICS_PORT plus
+its index. With QUESTION_POOL_MAPPED, workers share one memory-mapped copy of the question pool.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import sys
+from typing import Tuple
+import structlog
+from disnake.http import HTTPClient
+from bot.core.cluster import Cluster
+from bot.core.config import settings
+from bot.core.log import setup_logging
+from bot.core.mapped_pool import compile_mapped_pool
+
+logger = structlog.getLogger(name=__name__)
+
+
+async def fetch_gateway(token: str) -> Tuple[int, int]:
+    """Return Discord's recommended shard count, and how many shards may identify at once."""
+    http = HTTPClient()
+    try:
+        await http.static_login(token)
+        shard_count, _, session_start_limit = await http.get_bot_gateway()
+    finally:
+        await http.close()
+    return shard_count, session_start_limit["max_concurrency"]
+
+
+def main(module: str = "bot.main") -> None:
+    """Run a cluster of processes running a module, supervising them until interrupted."""
+    log_handler = setup_logging(
+        level=logging.DEBUG if settings.DEBUG else logging.INFO,
+        filepath=settings.LOG_FILEPATH,
+    )
+    if settings.QUESTION_POOL_MAPPED:
+        # Compile the file workers map up front, rather than having each of them compile it
+        try:
+            compile_mapped_pool(settings.QUESTION_POOL_FILEPATH)
+        except OSError as exc:
+            logger.warning("Failed to compile mapped question pool", error=str(exc))
+    shard_count, max_concurrency = asyncio.run(fetch_gateway(settings.DISCORD_TOKEN))
+    cluster = Cluster(
+        shard_count=settings.SHARD_COUNT or shard_count,
+        workers=settings.CLUSTER_WORKERS or os.cpu_count() or 1,
+        max_concurrency=max_concurrency,
+        metrics_port=settings.METRICS_PORT,
+        module=module,
+    )
+    logger.info(
+        "Starting cluster",
+        workers=len(cluster.workers),
+        shard_count=settings.SHARD_COUNT or shard_count,
+        max_concurrency=max_concurrency,
+    )
+    # Stop the workers on SIGTERM as on SIGINT
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        cluster.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        log_handler.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,252 @@
 """Contains coroutines for dynamically-created trivia commands."""
 
-from random import choice, shuffle
+from time import perf_counter
+from typing import List, Optional
 import structlog
 from structlog.contextvars import clear_contextvars, bind_contextvars
-from disnake import ApplicationCommandInteraction
-from bot.views import AnswerChoices
+from disnake import ApplicationCommandInteraction, Embed
+from disnake.ext import commands
+from bot.client import discord_bot
+from bot.views import LiveQuestions, answer_choices
 from bot.embeds.trivia import (
-    trivia_ok_multiple_choice_question,
+    trivia_ok_question,
+    trivia_wrong_exam_unavailable,
+    trivia_wrong_no_tagged_questions,
+    trivia_wrong_rate_limited,
 )
-from bot.core.util import send_embed, exam_from_pool
+from bot.core.permutations import random_permutation
+from bot.core.config import settings
+from bot.core.deadline import defer_if_late
+from bot.core.util import send_embed
+from bot.core.metrics import registry
+from bot.core.pool import QuestionPool, current_pool
+from bot.core.ratelimit import RateLimiter
+from bot.core.sampler import ShuffleBags
+from bot.core.tags import complete_tags, filter_name, parse_tags, popcount, select
+from bot.core.trace import span, start_trace
 
 logger = structlog.getLogger(name=__name__)
 
+live_questions = LiveQuestions(
+    discord_bot.http,
+    timeout=settings.QUESTION_TIMEOUT,
+    max_live=settings.QUESTION_MAX_LIVE,
+    max_disabling=settings.QUESTION_MAX_DISABLING,
+)
+
+shuffle_bags = ShuffleBags(max_bytes=settings.SHUFFLE_BAGS_MAX_BYTES)
+
+command_limiter = RateLimiter(
+    period=settings.RATE_LIMIT_PERIOD,
+    max_keys=settings.RATE_LIMIT_MAX_KEYS,
+    user=settings.RATE_LIMIT_USER,
+    channel=settings.RATE_LIMIT_CHANNEL,
+    guild=settings.RATE_LIMIT_GUILD,
+)
+
+commands_total = registry.counter(
+    "trivia_commands_total",
+    "Trivia commands invoked, by exam command and outcome.",
+    ("command_name", "outcome"),
+)
+command_duration = registry.histogram(
+    "trivia_command_duration_seconds",
+    "Time taken to respond to trivia commands that asked a question, by exam command.",
+    ("command_name",),
+)
+registry.gauge(
+    "trivia_live_questions",
+    "Questions whose answer choices are still enabled.",
+    callback=lambda: len(live_questions),
+)
+registry.counter(
+    "trivia_live_questions_removed_total",
+    "Questions whose answer choices were disabled, by reason.",
+    ("reason",),
+    callback=lambda: {
+        ("expired",): live_questions.expirations,
+        ("evicted",): live_questions.evictions,
+    },
+)
+registry.gauge(
+    "trivia_shuffle_bags",
+    "Shuffle bags questions are drawn from, one per channel and exam.",
+    callback=lambda: len(shuffle_bags),
+)
+registry.gauge(
+    "trivia_shuffle_bags_bytes",
+    "Memory taken by shuffle bags.",
+    callback=lambda: shuffle_bags.bytes,
+)
+registry.counter(
+    "trivia_shuffle_bags_evicted_total",
+    "Shuffle bags evicted to keep their memory within budget.",
+    callback=lambda: shuffle_bags.evictions,
+)
+
+
+async def autocomplete_tags(
+    inter: ApplicationCommandInteraction, text: str
+) -> List[str]:
+    """Suggest tags of the invoked exam's questions for the tags option of trivia commands."""
+    index = current_pool().tag_index(inter.data.name)
+    if index is None:
+        return []
+    return complete_tags(index, text)
+
+
+def draw_question(
+    pool: QuestionPool,
+    exam: dict,
+    channel_id: int,
+    tags: List[str],
+    match_all: bool = True,
+) -> Optional[int]:
+    """Draw the index of a question of an exam from a channel's shuffle bag.
 
-async def trivia(inter: ApplicationCommandInteraction) -> None:
+    Questions filtered by tags are drawn from a bag of their own, by rank among the questions
+    matching the tags. Returns None if no question matches the tags.
+    """
+    command_name = exam.get("command_name")
+    if not tags:
+        return shuffle_bags.draw(channel_id, command_name, len(exam.get("questions")))
+    matching = pool.tag_index(command_name).questions(tags, match_all)
+    count = popcount(matching)
+    if not count:
+        return None
+    bag = filter_name(command_name, tags, match_all)
+    return select(matching, shuffle_bags.draw(channel_id, bag, count))
+
+
+async def send_wrong(inter: ApplicationCommandInteraction, embed: Embed) -> None:
+    """Send an embed telling only the invoker why their command can't be answered.
+
+    The interaction is deferred ephemerally if the embed is expected to miss the deadline.
+    """
+    with span("defer"):
+        await defer_if_late(inter, ephemeral=True)
+    await send_embed(inter, embed, ephemeral=True)
+
+
+async def trivia(
+    inter: ApplicationCommandInteraction,
+    tags: str = commands.Param(
+        None,
+        description="Only ask questions with these tags, separated by commas.",
+        autocomplete=autocomplete_tags,
+    ),
+    match: str = commands.Param(
+        "all",
+        description="Ask questions with all of the tags, or with any of them.",
+        choices=["all", "any"],
+    ),
+) -> None:
     """Asks a trivia question based upon the invoker command.
 
     This coroutine is passed into a dynamically-created slash command. Each exam in the question
-    pool gets its own command.
+    pool gets its own command, whose questions can be filtered by their tags.
     """
+    start = perf_counter()
+    start_trace(inter.created_at)
+    command_name = inter.application_command.name
+    with span("rate_limit"):
+        retry_after = command_limiter.hit(
+            user=inter.author.id, channel=inter.channel_id, guild=inter.guild_id
+        )
+    if retry_after:
+        commands_total.inc(command_name, "rate_limited")
+        await inter.response.send_message(
+            embed=trivia_wrong_rate_limited(retry_after), ephemeral=True
+        )
+        return
     clear_contextvars()
     bind_contextvars(
         guild_id=inter.guild.id,
         guild_name=inter.guild.name,
         channel_id=inter.channel.id,
         channel_name=inter.channel.name,
-        command_name=inter.application_command.name,
+        command_name=command_name,
     )
-    exam = exam_from_pool(inter.application_command.name)
-    question = choice(exam.get("questions"))
-    prompt = question.get("prompt")
-    answer_choices = question.get("choices")
-    shuffle(answer_choices)
-    answer_choice_view = AnswerChoices(
-        choices=answer_choices,
-        correct_choice_id=question.get("correct_choice"),
-        explanation=question.get("explanation"),
+    with span("pool_lookup"):
+        pool = current_pool()
+        exam = pool.exam(command_name)
+    if exam is None:
+        # The exam was removed from the question pool by a reload after this command was invoked.
+        logger.warning("Exam unavailable")
+        commands_total.inc(command_name, "unavailable")
+        await send_wrong(inter, trivia_wrong_exam_unavailable(command_name))
+        clear_contextvars()
+        return
+    tag_names = parse_tags(tags or "")
+    match_all = match != "any"
+    with span("question_selection"):
+        question_index = draw_question(
+            pool, exam, inter.channel_id, tag_names, match_all
+        )
+        if question_index is not None:
+            question = exam.get("questions")[question_index]
+            order = random_permutation(len(question.choices))
+    if question_index is None:
+        logger.info("No tagged questions", tags=tag_names, match=match)
+        commands_total.inc(command_name, "no_tagged_questions")
+        await send_wrong(
+            inter, trivia_wrong_no_tagged_questions(command_name, tag_names, match_all)
+        )
+        clear_contextvars()
+        return
+    # Only deferred once the question is known, so that the replies above stay ephemeral
+    with span("defer"):
+        await defer_if_late(inter)
+    with span("embed_build"):
+        embed, fits = trivia_ok_question(exam.get("meta_name"), question, order)
+        buttons = answer_choices(
+            exam.get("command_name"), question_index, question, order
+        )
+    if await send_embed(inter, embed, components=buttons, sanitize=not fits):
+        live_questions.add(inter, buttons)
+        commands_total.inc(command_name, "asked")
+        command_duration.observe(perf_counter() - start, command_name)
+    else:
+        commands_total.inc(command_name, "failed")
+    clear_contextvars()
+
+
+def register_exam_command(exam: dict) -> None:
+    """Register a trivia slash command for an exam in the question pool."""
+    command = commands.InvokableSlashCommand(
+        trivia,
+        name=exam.get("command_name"),
+        description=exam.get("command_description"),
     )
-    await send_embed(
-        inter,
-        trivia_ok_multiple_choice_question(
-            exam.get("meta_name"), prompt, [c.get("text") for c in answer_choices]
-        ),
-        view=answer_choice_view,
+    discord_bot.add_slash_command(command)
+    logger.info(
+        "Registered slash command",
+        command_name=exam.get("command_name"),
+        command_description=exam.get("command_description"),
     )
-    clear_contextvars()
+
+
+def sync_exam_commands(previous: QuestionPool, pool: QuestionPool) -> None:
+    """Register and unregister trivia slash commands to match a reloaded question pool.
+
+    Exams whose command description changed are re-registered. If any command changed, the bot's
+    application commands are synchronized with Discord in the background.
+    """
+    changed = False
+    # Compare exam headers rather than looking exams up, which could parse a lazy pool's exams.
+    exams = {exam.get("command_name"): exam for exam in pool}
+    for exam in previous:
+        command_name = exam.get("command_name")
+        new_exam = exams.get(command_name)
+        if new_exam is None or (
+            new_exam.get("command_description") != exam.get("command_description")
+        ):
+            discord_bot.remove_slash_command(command_name)
+            logger.info("Unregistered slash command", command_name=command_name)
+            changed = True
+    for command_name, exam in exams.items():
+        if command_name not in discord_bot.all_slash_commands:
+            register_exam_command(exam)
+            changed = True
+    if changed:
+        discord_bot._schedule_delayed_command_sync()
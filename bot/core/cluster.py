@@ -0,0 +1,293 @@
+"""Houses the cluster of worker processes that run the bot's shards across CPU cores.
+
+A single process handles the gateway traffic and commands of every shard on one core. A
+Cluster instead spawns worker processes that each run the bot for a contiguous range of shard
+IDs, and restarts the ones that exit. Workers share the identify rate limit through an
+IdentifyGate, and report their guild counts through shared memory so that the cluster can log
+the total.
+"""
+
+import asyncio
+import os
+import runpy
+import time
+from multiprocessing import get_context
+from multiprocessing.connection import wait
+from multiprocessing.context import BaseContext
+from multiprocessing.process import BaseProcess
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+import structlog
+
+logger = structlog.getLogger(name=__name__)
+
+# Seconds Discord requires between identifies of shards in the same rate limit bucket
+IDENTIFY_INTERVAL = 5.0
+
+
+def shard_ranges(shard_count: int, workers: int) -> List[List[int]]:
+    """Split shard IDs into contiguous ranges of as equal sizes as possible, one per worker."""
+    workers = max(1, min(workers, shard_count))
+    size, remainder = divmod(shard_count, workers)
+    ranges, start = [], 0
+    for worker in range(workers):
+        stop = start + size + (1 if worker < remainder else 0)
+        ranges.append(list(range(start, stop)))
+        start = stop
+    return ranges
+
+
+class IdentifyGate:
+    """Rate limit on identifies, shared by every process of a cluster.
+
+    Discord allows max_concurrency shards to identify every five seconds, bucketed by their
+    shard ID modulo max_concurrency. Each bucket keeps the time at which it's next free, so
+    that an identify is scheduled by reserving the bucket's next slot; a worker that dies
+    after reserving a slot can't hold up the other workers' identifies.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 1,
+        interval: float = IDENTIFY_INTERVAL,
+        context: Optional[BaseContext] = None,
+    ) -> None:
+        """Instantiate a new gate, shared with the processes of a multiprocessing context."""
+        context = context or get_context("spawn")
+        self.max_concurrency: int = max(1, max_concurrency)
+        self.interval: float = interval
+        self._next_identify = context.Array("d", self.max_concurrency)
+
+    def reserve(self, shard_id: int, now: Optional[float] = None) -> float:
+        """Reserve the next identify slot of a shard's bucket.
+
+        Returns:
+            Seconds to wait before the shard may identify.
+        """
+        now = time.time() if now is None else now
+        bucket = shard_id % self.max_concurrency
+        with self._next_identify.get_lock():
+            start = max(now, self._next_identify[bucket])
+            self._next_identify[bucket] = start + self.interval
+        return start - now
+
+    async def wait(self, shard_id: Optional[int], *, initial: bool = False) -> None:
+        """Wait until a shard may identify; usable as a client's before_identify_hook."""
+        delay = self.reserve(shard_id or 0)
+        if delay > 0:
+            logger.info(
+                "Waiting to identify", shard_id=shard_id, delay_s=round(delay, 3)
+            )
+            await asyncio.sleep(delay)
+
+
+class Worker:
+    """Process of a cluster, running the bot for a range of shards."""
+
+    def __init__(
+        self,
+        index: int,
+        shard_ids: List[int],
+        shard_count: int,
+        gate: IdentifyGate,
+        guild_counts: Sequence[int],
+        environment: Dict[str, str],
+        module: str = "bot.main",
+    ) -> None:
+        """Instantiate a new worker, which runs a module with additional environment variables."""
+        self.index: int = index
+        self.shard_ids: List[int] = shard_ids
+        self.shard_count: int = shard_count
+        self.gate: IdentifyGate = gate
+        self.guild_counts: Sequence[int] = guild_counts
+        self.environment: Dict[str, str] = environment
+        self.module: str = module
+
+    async def before_identify(
+        self, shard_id: Optional[int], *, initial: bool = False
+    ) -> None:
+        """Wait for the cluster's identify gate before a shard identifies."""
+        await self.gate.wait(shard_id, initial=initial)
+
+    def report_guilds(self, guilds: int) -> None:
+        """Report the quantity of guilds the worker's shards are joined to."""
+        self.guild_counts[self.index] = guilds
+
+
+# Worker running in this process, if it's one of a cluster's workers
+current_worker: Optional[Worker] = None
+
+
+def report_guild_count(guilds: int) -> None:
+    """Report this process' guild count to its cluster, if it's one of its workers."""
+    if current_worker is not None:
+        current_worker.report_guilds(guilds)
+
+
+def worker_filepath(filepath: str) -> Path:
+    """Return a filepath of this process' own, if it's one of a cluster's workers."""
+    if current_worker is None:
+        return Path(filepath)
+    return Path(f"{filepath}.{current_worker.index}")
+
+
+def run_worker(worker: Worker) -> None:
+    """Run the bot for a worker's shards; the target of worker processes."""
+    global current_worker
+    current_worker = worker
+    os.environ.update(worker.environment)
+    runpy.run_module(worker.module, run_name="__main__")
+
+
+class Cluster:
+    """Supervisor of worker processes that together run every shard of the bot.
+
+    Workers that exit are restarted after a delay, which doubles each time a worker exits
+    within stable_uptime seconds of being started, up to max_restart_delay seconds.
+    """
+
+    def __init__(
+        self,
+        shard_count: int,
+        workers: int,
+        max_concurrency: int = 1,
+        metrics_port: int = 0,
+        module: str = "bot.main",
+        restart_delay: float = 5.0,
+        max_restart_delay: float = 300.0,
+        stable_uptime: float = 60.0,
+    ) -> None:
+        """Instantiate a new cluster of at most one worker per shard."""
+        self.context = get_context("spawn")
+        self.gate = IdentifyGate(max_concurrency, context=self.context)
+        ranges = shard_ranges(shard_count, workers)
+        self.guild_counts = self.context.Array("q", len(ranges), lock=False)
+        self.workers: List[Worker] = [
+            Worker(
+                index,
+                shard_ids,
+                shard_count,
+                self.gate,
+                self.guild_counts,
+                worker_environment(index, shard_ids, shard_count, metrics_port),
+                module,
+            )
+            for index, shard_ids in enumerate(ranges)
+        ]
+        self.restart_delay: float = restart_delay
+        self.max_restart_delay: float = max_restart_delay
+        self.stable_uptime: float = stable_uptime
+        self.restarts: int = 0
+        self._processes: Dict[int, BaseProcess] = {}
+        self._started_at: Dict[int, float] = {}
+        self._failures: Dict[int, int] = {}
+        self._restart_at: Dict[int, float] = {}
+        self._logged_guild_counts: List[int] = list(self.guild_counts)
+
+    def start(self, index: int) -> None:
+        """Start the process of a worker."""
+        worker = self.workers[index]
+        process = self.context.Process(
+            target=run_worker, args=(worker,), name=f"trivia-worker-{index}"
+        )
+        process.start()
+        self._processes[index] = process
+        self._started_at[index] = time.monotonic()
+        logger.info(
+            "Started cluster worker",
+            worker=index,
+            pid=process.pid,
+            shard_ids=worker.shard_ids,
+            shard_count=worker.shard_count,
+        )
+
+    def supervise(self, timeout: float = 1.0) -> None:
+        """Wait up to timeout seconds for workers to exit, and restart the ones due."""
+        now = time.monotonic()
+        if self._restart_at:
+            timeout = max(0.0, min(timeout, min(self._restart_at.values()) - now))
+        sentinels = [process.sentinel for process in self._processes.values()]
+        if sentinels:
+            wait(sentinels, timeout)
+        else:
+            time.sleep(timeout)
+        now = time.monotonic()
+        for index, process in list(self._processes.items()):
+            if process.is_alive():
+                continue
+            process.join()
+            del self._processes[index]
+            self.guild_counts[index] = 0
+            if now - self._started_at[index] < self.stable_uptime:
+                self._failures[index] = self._failures.get(index, 0) + 1
+            else:
+                self._failures[index] = 1
+            delay = min(
+                self.restart_delay * 2 ** (self._failures[index] - 1),
+                self.max_restart_delay,
+            )
+            self._restart_at[index] = now + delay
+            logger.warning(
+                "Cluster worker exited",
+                worker=index,
+                exit_code=process.exitcode,
+                restart_in_s=delay,
+            )
+        for index, restart_at in list(self._restart_at.items()):
+            if restart_at <= now:
+                del self._restart_at[index]
+                self.restarts += 1
+                self.start(index)
+        self.log_guild_quantity()
+
+    def log_guild_quantity(self) -> None:
+        """Log the quantity of guilds the cluster is joined to, whenever it changes."""
+        guild_counts = list(self.guild_counts)
+        if guild_counts != self._logged_guild_counts:
+            self._logged_guild_counts = guild_counts
+            logger.info(
+                "Guild information",
+                number_of_guilds=sum(guild_counts),
+                worker_guilds=guild_counts,
+            )
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop every worker, killing the ones that don't exit within timeout seconds."""
+        self._restart_at.clear()
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in self._processes.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
+        self._processes.clear()
+        logger.info("Stopped cluster workers", restarts=self.restarts)
+
+    def run(self) -> None:
+        """Start every worker, and supervise them until interrupted."""
+        for worker in self.workers:
+            self.start(worker.index)
+        try:
+            while True:
+                self.supervise()
+        finally:
+            self.stop()
+
+
+def worker_environment(
+    index: int, shard_ids: List[int], shard_count: int, metrics_port: int
+) -> Dict[str, str]:
+    """Return the settings of a worker, as environment variables.
+
+    Only the first worker syncs application commands, and each worker serves metrics on its
+    own port, counting up from the cluster's.
+    """
+    return {
+        "SHARD_IDS": str(shard_ids),
+        "SHARD_COUNT": str(shard_count),
+        "SYNC_COMMANDS": "true" if index == 0 else "false",
+        "METRICS_PORT": str(metrics_port + index if metrics_port else 0),
+    }
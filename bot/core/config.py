@@ -1,17 +1,67 @@
 """Contains bot settings."""
 
-from pydantic import BaseSettings, FilePath
+from typing import Dict, List
+from pydantic import BaseSettings, FilePath, validator
+
+# Interaction tokens, which questions' messages are edited with, expire after 15 minutes
+INTERACTION_TOKEN_LIFETIME = 900
 
 
 class Settings(BaseSettings):
     """Schema for bot settings."""
 
     QUESTION_POOL_FILEPATH: FilePath = "models/question_pool.yaml"
+    QUESTION_POOL_RELOAD_INTERVAL: int = 30
+    QUESTION_POOL_LAZY: bool = False
+    QUESTION_POOL_MAX_LOADED_QUESTIONS: int = 0
+    QUESTION_POOL_MAPPED: bool = False
     QUESTION_TIMEOUT: int = 180
+    QUESTION_MAX_LIVE: int = 1000
+    QUESTION_MAX_DISABLING: int = 10
+    SHUFFLE_BAGS_MAX_BYTES: int = 64 * 2**20
+    SHUFFLE_BAGS_FILEPATH: str = None
+    SHUFFLE_BAGS_SAVE_INTERVAL: int = 300
+    RESPONSE_DEFER_MARGIN: float = 0.5
+    RATE_LIMIT_PERIOD: float = 10.0
+    RATE_LIMIT_USER: int = 5
+    RATE_LIMIT_CHANNEL: int = 20
+    RATE_LIMIT_GUILD: int = 60
+    RATE_LIMIT_MAX_KEYS: int = 1_000_000
+    RATE_LIMIT_SWEEP_INTERVAL: int = 60
+    LOOP_LAG_INTERVAL: float = 0.5
+    LOOP_LAG_THRESHOLD: float = 0.25
+    TRACING: bool = False
+    MEMORY_PROFILING: bool = False
+    MEMORY_RSS_INTERVAL: int = 60
+    MEMORY_SNAPSHOT_INTERVAL: int = 3600
+    MEMORY_TRACE_FRAMES: int = 1
+    MEMORY_TOP_SITES: int = 10
+    METRICS_HOST: str = "127.0.0.1"
+    METRICS_PORT: int = 8080
     DEBUG: bool = False
+    LOG_FILEPATH: str = None
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_BATCH_SIZE: int = 256
+    LOG_OVERFLOW: str = "drop"
+    LOG_SAMPLE_RATES: Dict[str, float] = {"Sent embeds": 0.01}
     DISCORD_TOKEN: str = None
+    CLIENT_PROFILE: str = "default"
+    SHARD_COUNT: int = None
+    SHARD_IDS: List[int] = None
+    SYNC_COMMANDS: bool = True
+    CLUSTER_WORKERS: int = 0
     TEST_GUILD: int = None
 
+    @validator("QUESTION_TIMEOUT")
+    def question_timeout_within_token_lifetime(cls, value: int) -> int:
+        """Reject question timeouts after which questions' buttons could no longer be disabled."""
+        if value > INTERACTION_TOKEN_LIFETIME:
+            raise ValueError(
+                f"must be at most {INTERACTION_TOKEN_LIFETIME} seconds, "
+                "after which interaction tokens expire"
+            )
+        return value
+
     class Config:
         """Pydantic BaseSettings object configuration.
 
@@ -0,0 +1,101 @@
+"""Houses the prediction of whether interaction responses will make Discord's deadline."""
+
+from datetime import datetime
+from time import perf_counter
+from typing import Optional
+import structlog
+from disnake import HTTPException, Interaction
+from disnake.utils import utcnow
+from bot.core.metrics import registry
+
+logger = structlog.getLogger(name=__name__)
+
+# Seconds after an interaction's creation within which Discord accepts its initial response
+INTERACTION_RESPONSE_DEADLINE = 3.0
+
+
+class ResponseDeadline:
+    """Predictor of whether an interaction's initial response will reach Discord in time.
+
+    Discord fails interactions whose initial response arrives more than three seconds after
+    their creation, but accepts followups to deferred interactions for fifteen minutes. A
+    response is expected to arrive once the interaction's age, the current event loop lag and
+    the time taken to send a response have passed. Send times are estimated the way TCP
+    estimates its retransmission timeout: a smoothed mean plus four times the smoothed mean
+    deviation, so that the estimate rises quickly when send times become erratic under load.
+    """
+
+    def __init__(
+        self, deadline: float = INTERACTION_RESPONSE_DEADLINE, margin: float = 0.5
+    ) -> None:
+        """Instantiate a new predictor, deferring responses expected within margin seconds."""
+        self.deadline: float = deadline
+        self.margin: float = margin
+        self.latency: Optional[float] = None
+        self.deviation: float = 0.0
+        self.lag: float = 0.0
+
+    def observe_send(self, seconds: float) -> None:
+        """Update the send time estimate with the time taken to send a response."""
+        if self.latency is None:
+            self.latency, self.deviation = seconds, seconds / 2
+            return
+        self.deviation += (abs(seconds - self.latency) - self.deviation) / 4
+        self.latency += (seconds - self.latency) / 8
+
+    def observe_lag(self, seconds: float) -> None:
+        """Update the current event loop lag."""
+        self.lag = seconds
+
+    def expected_delay(self) -> float:
+        """Return how long a response is expected to take to reach Discord, in seconds."""
+        return self.lag + (self.latency or 0.0) + 4 * self.deviation
+
+    def should_defer(
+        self, created_at: datetime, now: Optional[datetime] = None
+    ) -> bool:
+        """Return whether a response to an interaction created at a time is expected late."""
+        age = ((now or utcnow()) - created_at).total_seconds()
+        return age + self.expected_delay() + self.margin > self.deadline
+
+
+response_deadline = ResponseDeadline()
+
+response_decisions = registry.counter(
+    "trivia_response_decisions_total",
+    "Initial interaction responses, by whether they were sent immediately or deferred.",
+    ("decision",),
+)
+registry.gauge(
+    "trivia_response_expected_delay_seconds",
+    "Time an interaction response is currently expected to take to reach Discord.",
+    callback=response_deadline.expected_delay,
+)
+
+
+async def defer_if_late(inter: Interaction, ephemeral: bool = False) -> bool:
+    """Defer an interaction if its response is expected to miss Discord's deadline.
+
+    The response then has to be sent as a followup, which send_embed() does for interactions
+    that have already been responded to. A followup is only ephemeral if the deferral was, so
+    responses meant for the invoker alone must be deferred with ephemeral set. Each decision is
+    counted.
+
+    Returns:
+        Whether the interaction was deferred.
+    """
+    if inter.response.is_done():
+        return False
+    if not response_deadline.should_defer(inter.created_at):
+        response_decisions.inc("immediate")
+        return False
+    start = perf_counter()
+    try:
+        await inter.response.defer(ephemeral=ephemeral)
+    except HTTPException as exc:  # Most likely the deadline passed already
+        response_decisions.inc("failed")
+        logger.warning("Failed to defer interaction response", error=str(exc))
+        return False
+    response_deadline.observe_send(perf_counter() - start)
+    response_decisions.inc("deferred")
+    return True
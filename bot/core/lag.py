@@ -0,0 +1,131 @@
+"""Houses the monitor that measures event loop lag and reports what blocks the event loop."""
+
+import asyncio
+import sys
+import threading
+import traceback
+from collections import deque
+from time import monotonic
+from types import FrameType
+from typing import Deque, Dict, Optional, Sequence, Tuple
+import disnake
+import structlog
+
+logger = structlog.getLogger(name=__name__)
+
+
+def interaction_context(frame: Optional[FrameType]) -> dict:
+    """Return the context of the innermost interaction being handled by a stack of frames.
+
+    The fields match those bound to structlog's context variables by command and event
+    handlers, which can't be read from another thread.
+    """
+    while frame is not None:
+        for value in list(frame.f_locals.values()):
+            if isinstance(value, disnake.Interaction):
+                data = getattr(value, "data", None)
+                author = getattr(value, "author", None)
+                return {
+                    "interaction_id": getattr(value, "id", None),
+                    "guild_id": getattr(value, "guild_id", None),
+                    "channel_id": getattr(value, "channel_id", None),
+                    "user_id": getattr(author, "id", None),
+                    "command_name": getattr(data, "name", None),
+                }
+        frame = frame.f_back
+    return {}
+
+
+class LoopLagMonitor:
+    """Monitor of the event loop's scheduling lag, with a watchdog for blocking calls.
+
+    measure() sleeps for one interval on the event loop and records how much later than asked
+    the loop woke it up, which is how long ready callbacks had to wait for their turn. Each
+    measurement is also a heartbeat: a watchdog thread checks that heartbeats keep coming, and
+    when none has for longer than the interval plus the threshold, the event loop is blocked
+    right now, so the watchdog logs the stack of the event loop's thread along with the
+    context of the interaction it's handling. Each blocking call is reported once.
+    """
+
+    def __init__(self, interval: float, threshold: float, window: int = 1000) -> None:
+        """Instantiate a new monitor keeping the given number of recent lags."""
+        self.interval: float = interval
+        self.threshold: float = threshold
+        self.lags: Deque[float] = deque(maxlen=window)
+        self.blocked: int = 0
+        self._heartbeat: float = monotonic()
+        self._reported_heartbeat: Optional[float] = None
+        self._loop_thread_id: Optional[int] = None
+        self._stopped: threading.Event = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    async def measure(self) -> float:
+        """Sleep for one interval and return how late the event loop woke up, in seconds.
+
+        The watchdog is started on the first measurement, from the event loop's thread.
+        """
+        if self._watchdog is None or self._stopped.is_set():
+            self.start(threading.get_ident())
+        start = monotonic()
+        await asyncio.sleep(self.interval)
+        self._heartbeat = now = monotonic()
+        lag = max(now - start - self.interval, 0.0)
+        self.lags.append(lag)
+        if lag > self.threshold:
+            logger.warning("Event loop lag", lag_ms=round(lag * 1000, 3))
+        return lag
+
+    def quantiles(self, quantiles: Sequence[float]) -> Dict[Tuple[str], float]:
+        """Return the given quantiles of the recent lags, keyed by quantile label."""
+        lags = sorted(self.lags)
+        if not lags:
+            return {}
+        return {
+            (str(quantile),): lags[min(int(quantile * len(lags)), len(lags) - 1)]
+            for quantile in quantiles
+        }
+
+    def start(self, loop_thread_id: int) -> None:
+        """Start the watchdog thread for the event loop running in the given thread."""
+        self._loop_thread_id = loop_thread_id
+        self._heartbeat = monotonic()
+        self._stopped = threading.Event()
+        self._watchdog = threading.Thread(
+            target=self._watch, args=(self._stopped,), name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        """Signal the watchdog thread to stop, e.g. once measurements stop."""
+        self._stopped.set()
+
+    def check(self, now: Optional[float] = None) -> bool:
+        """Report the event loop if it's blocked and hasn't been reported yet.
+
+        Returns:
+            True if the event loop was reported as blocked.
+        """
+        if now is None:
+            now = monotonic()
+        heartbeat = self._heartbeat
+        blocked = now - heartbeat - self.interval
+        if blocked <= self.threshold or heartbeat == self._reported_heartbeat:
+            return False
+        self._reported_heartbeat = heartbeat
+        self.blocked += 1
+        frame = sys._current_frames().get(self._loop_thread_id)
+        logger.warning(
+            "Event loop blocked",
+            blocked_ms=round(blocked * 1000, 3),
+            stack="".join(traceback.format_stack(frame)) if frame else None,
+            **interaction_context(frame),
+        )
+        return True
+
+    def _watch(self, stopped: threading.Event) -> None:
+        """Check for a blocked event loop a few times per interval until stopped."""
+        while not stopped.wait(self.interval / 4):
+            try:
+                self.check()
+            except Exception as exc:
+                print(f"Failed to check event loop: {exc!r}", file=sys.stderr)
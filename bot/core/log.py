@@ -0,0 +1,304 @@
+"""Houses the queue-based logging pipeline that keeps log rendering and I/O off the event loop."""
+
+import json
+import logging
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from random import random
+from time import time
+from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple, Union
+import structlog
+from structlog.contextvars import merge_contextvars
+from structlog.processors import format_exc_info
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library's JSON encoder
+    orjson = None
+
+LOG_OVERFLOW_POLICIES = ("drop", "block")
+
+# A structlog event waiting to be rendered: its level, creation time and event dict
+LogEvent = Tuple[str, float, dict]
+LogItem = Union[LogEvent, logging.LogRecord, None]
+
+
+def dumps(obj: Any) -> str:
+    """Serialize a log event to JSON, using orjson when it's installed.
+
+    Objects that can't be serialized natively are rendered with repr(), as structlog's
+    JSONRenderer does.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=repr).decode()
+        except TypeError:  # e.g. integers wider than 64 bits
+            pass
+    return json.dumps(obj, default=repr)
+
+
+def timestamp(created: float) -> str:
+    """Return an ISO 8601 timestamp in UTC of a time since the epoch."""
+    return (
+        datetime.fromtimestamp(created, tz=timezone.utc)
+        .isoformat()
+        .replace("+00:00", "Z")
+    )
+
+
+class Lazy:
+    """Log field whose value is only computed if its event is rendered.
+
+    Wrap payloads that are expensive to build, such as embed dictionaries, so that events
+    filtered out by their level or sampled out by a LogSampler never build them. The value is
+    computed by the writer thread, so whatever it's computed from must not be modified after
+    it's logged.
+    """
+
+    __slots__ = ("func", "args")
+
+    def __init__(self, func: Callable[..., Any], *args: Any) -> None:
+        """Defer calling a function with the given arguments."""
+        self.func = func
+        self.args = args
+
+    def __call__(self) -> Any:
+        """Compute the field's value."""
+        return self.func(*self.args)
+
+
+class LogSampler:
+    """structlog processor that only keeps the lazy payloads of a sample of events.
+
+    Each event named in the sample rates keeps its lazy fields with the probability given by
+    its rate, and loses them otherwise; the event itself is always logged. Events at warning
+    level and above always keep their lazy fields.
+    """
+
+    def __init__(self, rates: Dict[str, float]) -> None:
+        """Instantiate a new sampler with a sample rate for each event name."""
+        self.rates: Dict[str, float] = rates
+
+    def __call__(self, logger: Any, method_name: str, event_dict: dict) -> dict:
+        """Drop the lazy fields of an event unless it's sampled."""
+        rate = self.rates.get(event_dict.get("event"))
+        if rate is None or method_name not in ("debug", "info") or random() < rate:
+            return event_dict
+        return {
+            key: value
+            for key, value in event_dict.items()
+            if not isinstance(value, Lazy)
+        }
+
+
+def capture_exc_info(logger: Any, method_name: str, event_dict: dict) -> dict:
+    """Resolve exc_info=True to the exception being handled, while it's still being handled.
+
+    The writer thread formats tracebacks later on, when sys.exc_info() no longer refers to it.
+    """
+    if event_dict.get("exc_info") is True:
+        event_dict["exc_info"] = sys.exc_info()
+    return event_dict
+
+
+def enqueue_event(
+    logger: Any, method_name: str, event_dict: dict
+) -> Tuple[Tuple[LogEvent], dict]:
+    """Hand an event dict, along with its level and creation time, to a QueueLogger.
+
+    This is the final processor of structlog's processor chain; rendering is left to the
+    writer thread.
+    """
+    return ((method_name, time(), event_dict),), {}
+
+
+def render(item: Union[LogEvent, logging.LogRecord]) -> str:
+    """Render a structlog event or standard library log record as one line of JSON."""
+    if isinstance(item, logging.LogRecord):
+        level, created = item.levelname.lower(), item.created
+        event_dict = {"event": item.getMessage(), "logger": item.name}
+        if item.exc_info:
+            event_dict["exc_info"] = item.exc_info
+    else:
+        level, created, event_dict = item
+        for key, value in event_dict.items():
+            if isinstance(value, Lazy):
+                event_dict[key] = value()
+    event_dict["level"] = level
+    event_dict["timestamp"] = timestamp(created)
+    return dumps(format_exc_info(None, level, event_dict))
+
+
+class QueueLogHandler(logging.Handler):
+    """Log handler that hands log items to a writer thread through a bounded queue.
+
+    Items are rendered and written by the writer thread in batches, so that logging on the
+    event loop costs little more than a queue insert. When the queue is full, items are
+    either dropped and counted (the "drop" overflow policy), or the logging thread blocks
+    until the writer catches up (the "block" overflow policy). The number of dropped items
+    is written to the log as soon as the writer has room for it.
+    """
+
+    def __init__(
+        self,
+        stream: TextIO,
+        queue_size: int = 10000,
+        batch_size: int = 256,
+        overflow: str = "drop",
+    ) -> None:
+        """Instantiate a new queue log handler and start its writer thread."""
+        if overflow not in LOG_OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown log overflow policy: {overflow}")
+        super().__init__()
+        self.stream: TextIO = stream
+        self.batch_size: int = batch_size
+        self.overflow: str = overflow
+        self.enqueued: int = 0
+        self.dropped: int = 0
+        self.written: int = 0
+        self.batches: int = 0
+        self._reported_dropped: int = 0
+        self._queue: "queue.Queue[LogItem]" = queue.Queue(queue_size)
+        self._block: bool = overflow == "block"
+        self._writer = threading.Thread(
+            target=self._write_forever, name="log-writer", daemon=True
+        )
+        self._writer.start()
+
+    def enqueue(self, item: Union[LogEvent, logging.LogRecord]) -> None:
+        """Enqueue a log item to be rendered and written by the writer thread."""
+        try:
+            self._queue.put(item, block=self._block)
+        except queue.Full:
+            self.dropped += 1
+        else:
+            self.enqueued += 1
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Enqueue a standard library log record."""
+        self.enqueue(record)
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        """Filter and enqueue a record without taking the handler's lock."""
+        if not self.filter(record):
+            return False
+        self.enqueue(record)
+        return True
+
+    def flush(self) -> None:
+        """Wait until every enqueued item has been written."""
+        if self._writer.is_alive():
+            self._queue.join()
+
+    def close(self) -> None:
+        """Write every enqueued item, then stop the writer thread."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        super().close()
+
+    def _write_forever(self) -> None:
+        """Render and write batches of items until the handler is closed."""
+        while True:
+            batch: List[LogItem] = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+            if batch[-1] is None:
+                return
+
+    def _write(self, batch: List[LogItem]) -> None:
+        """Render and write one batch of items."""
+        lines = []
+        for item in batch:
+            if item is None:
+                break
+            try:
+                lines.append(render(item))
+            except Exception as exc:
+                print(f"Failed to render log: {exc!r}", file=sys.stderr)
+        dropped = self.dropped
+        if dropped != self._reported_dropped:
+            lines.append(
+                dumps(
+                    {
+                        "event": "Dropped log records",
+                        "dropped_records": dropped - self._reported_dropped,
+                        "total_dropped_records": dropped,
+                        "level": "warning",
+                        "timestamp": timestamp(time()),
+                    }
+                )
+            )
+            self._reported_dropped = dropped
+        if not lines:
+            return
+        try:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+        except Exception as exc:
+            print(f"Failed to write logs: {exc!r}", file=sys.stderr)
+        self.written += len(lines)
+        self.batches += 1
+
+
+class QueueLogger:
+    """structlog logger that hands events to a queue log handler instead of writing them.
+
+    Every log method does the same thing, since the level travels with the event.
+    """
+
+    def __init__(self, handler: QueueLogHandler) -> None:
+        """Instantiate a new logger for a queue log handler."""
+        self.handler: QueueLogHandler = handler
+
+    def log(self, event: LogEvent) -> None:
+        """Enqueue an event."""
+        self.handler.enqueue(event)
+
+    debug = info = warning = error = critical = msg = log
+
+
+def setup_logging(
+    level: int = logging.INFO,
+    filepath: Optional[str] = None,
+    queue_size: int = 10000,
+    batch_size: int = 256,
+    overflow: str = "drop",
+    sample_rates: Optional[Dict[str, float]] = None,
+) -> QueueLogHandler:
+    """Route structlog and standard library logging through a queue log handler.
+
+    Logs are written to stdout, or appended to a file if a filepath is given. structlog events
+    below the level are discarded without being processed, and the rest skip the standard
+    library's logging machinery entirely; only merging context variables and sampling lazy
+    payloads happen on the logging thread. Standard library log records, such as disnake's, go
+    through the same queue.
+    """
+    stream = sys.stdout if filepath is None else open(filepath, "a", encoding="utf-8")
+    handler = QueueLogHandler(
+        stream, queue_size=queue_size, batch_size=batch_size, overflow=overflow
+    )
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
+    queue_logger = QueueLogger(handler)
+    structlog.configure(
+        logger_factory=lambda *args: queue_logger,
+        wrapper_class=structlog.make_filtering_bound_logger(level),
+        processors=[
+            merge_contextvars,
+            capture_exc_info,
+            LogSampler(sample_rates or {}),
+            enqueue_event,
+        ],
+        cache_logger_on_first_use=True,
+    )
+    return handler
@@ -0,0 +1,384 @@
+"""Houses the question pool served from a compiled, memory-mapped file.
+
+Several bot processes on one host would each hold their own copy of the question pool as
+Python objects. A mapped question pool instead compiles the question pool into a read-only file
+of fixed-size records and a heap of UTF-8 strings, which every process memory-maps so that they
+share the same pages of the operating system's page cache. Only exam headers are decoded up
+front; questions are decoded from their records each time they're accessed.
+
+The compiled file is laid out as follows, with every integer little-endian:
+
+- A header: magic, format version, exam count and the SHA-256 checksum of the YAML it was
+  compiled from.
+- An exam table: each exam's JSON-encoded header, and the range of its questions.
+- A question table: each question's key, prompt, explanation, correct choice, and the ranges of
+  its choices and tags.
+- A choice table: each choice's ID and text.
+- A tag table: each tag's text.
+- A heap of the UTF-8 encoded strings the tables refer to by offset and length.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import structlog
+from bot.core.pool import QuestionPool, validate_pool
+from bot.core.tags import TagIndex
+from bot.core.util import question_pool
+from bot.models.question import Choice, Question
+
+logger = structlog.getLogger(name=__name__)
+
+MAPPED_POOL_MAGIC = b"DITQMMAP"
+MAPPED_POOL_VERSION = 1
+
+# Magic, version, exam count, checksum
+HEADER = struct.Struct("<8sII32s")
+# Header offset and length, first question and question count
+EXAM = struct.Struct("<IIII")
+# Key, prompt offset and length, explanation offset and length, correct choice, first choice,
+# choice count, first tag and tag count
+QUESTION = struct.Struct("<8sIIIIiIIII")
+# Key of a question, the first field of its record
+KEY = struct.Struct("<8s")
+# ID, text offset and length
+CHOICE = struct.Struct("<iII")
+# Text offset and length
+TAG = struct.Struct("<II")
+
+# Length of strings that are None
+NONE_LENGTH = 0xFFFFFFFF
+
+
+def mapped_pool_filepath(filepath: str) -> Path:
+    """Return the filepath of the compiled, mappable file for a question pool YAML file."""
+    return Path(filepath).with_suffix(".pool")
+
+
+class StringHeap:
+    """Heap of UTF-8 encoded strings, each stored once."""
+
+    def __init__(self) -> None:
+        """Instantiate a new empty heap."""
+        self.data = bytearray()
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+
+    def add(self, text: Optional[str]) -> Tuple[int, int]:
+        """Add a string to the heap, and return its offset and length in bytes."""
+        if text is None:
+            return 0, NONE_LENGTH
+        text = str(text)
+        location = self._offsets.get(text)
+        if location is None:
+            encoded = text.encode("utf-8")
+            location = self._offsets[text] = (len(self.data), len(encoded))
+            self.data += encoded
+        return location
+
+
+def write_mapped_pool(pool_file: BinaryIO, checksum: bytes, exams: List[dict]) -> None:
+    """Compile a validated question pool into a mappable file.
+
+    Raises:
+        ValueError: The question pool holds values that can't be compiled.
+    """
+    heap = StringHeap()
+    exam_records, question_records, choice_records, tag_records = [], [], [], []
+    try:
+        for exam in exams:
+            header = {key: value for key, value in exam.items() if key != "questions"}
+            questions = [Question.from_dict(q) for q in exam.get("questions")]
+            exam_records.append(
+                EXAM.pack(
+                    *heap.add(json.dumps(header)), len(question_records), len(questions)
+                )
+            )
+            for question in questions:
+                question_records.append(
+                    QUESTION.pack(
+                        question.key.encode("ascii"),
+                        *heap.add(question.prompt),
+                        *heap.add(question.explanation),
+                        question.correct_choice,
+                        len(choice_records),
+                        len(question.choices),
+                        len(tag_records),
+                        len(question.tags),
+                    )
+                )
+                for choice in question.choices:
+                    choice_records.append(
+                        CHOICE.pack(choice.id, *heap.add(choice.text))
+                    )
+                for tag in question.tags:
+                    tag_records.append(TAG.pack(*heap.add(tag)))
+    except (TypeError, struct.error) as exc:
+        raise ValueError(f"Question pool can't be compiled: {exc}") from exc
+    pool_file.write(
+        HEADER.pack(MAPPED_POOL_MAGIC, MAPPED_POOL_VERSION, len(exams), checksum)
+    )
+    for records in (exam_records, question_records, choice_records, tag_records):
+        pool_file.write(b"".join(records))
+    pool_file.write(heap.data)
+
+
+def compile_mapped_pool(filepath: str, mapped_filepath: Optional[Path] = None) -> Path:
+    """Parse, validate and compile a question pool YAML file into a mappable file.
+
+    The file is replaced atomically, so that processes that mapped the previous file keep a
+    consistent view of it.
+    """
+    if mapped_filepath is None:
+        mapped_filepath = mapped_pool_filepath(filepath)
+    with open(filepath, "rb") as yaml_file:
+        checksum = hashlib.sha256(yaml_file.read()).digest()
+    exams = question_pool(filepath)
+    validate_pool(exams)
+    temporary_filepath = Path(f"{mapped_filepath}.{os.getpid()}.tmp")
+    try:
+        with open(temporary_filepath, "wb") as pool_file:
+            write_mapped_pool(pool_file, checksum, exams)
+        os.replace(temporary_filepath, mapped_filepath)
+    finally:
+        if temporary_filepath.exists():
+            temporary_filepath.unlink()
+    return mapped_filepath
+
+
+class MappedQuestions(Sequence[Question]):
+    """Immutable sequence of an exam's questions, decoded from a mapped file on access."""
+
+    def __init__(self, pool: "MappedQuestionPool", first: int, count: int) -> None:
+        """Instantiate a view of count questions of a mapped pool, starting at first."""
+        self._pool = pool
+        self._first = first
+        self._count = count
+
+    def __len__(self) -> int:
+        """Return the number of questions."""
+        return self._count
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[Question, Tuple[Question, ...]]:
+        """Decode a question, or a tuple of questions for a slice."""
+        if isinstance(index, slice):
+            return tuple(self[i] for i in range(*index.indices(self._count)))
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("question index out of range")
+        return self._pool.decode_question(self._first + index)
+
+    def __iter__(self) -> Iterator[Question]:
+        """Iterate over the decoded questions."""
+        for index in range(self._count):
+            yield self._pool.decode_question(self._first + index)
+
+    def __eq__(self, other: object) -> bool:
+        """Compare equal to sequences of the same questions, such as tuples."""
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def key(self, index: int) -> str:
+        """Return a question's key without decoding the question."""
+        return self._pool.question_key(self._first + index)
+
+
+class MappedQuestionPool(QuestionPool):
+    """Question pool served from a compiled file mapped into memory.
+
+    The file is compiled next to the question pool YAML file, and recompiled whenever it was
+    compiled from different YAML contents. If it can't be written there, it's compiled into an
+    anonymous temporary file, which is only shared by the process that compiled it.
+    """
+
+    def __init__(
+        self, data: mmap.mmap, checksum: Optional[str] = None, mtime_ns: int = 0
+    ) -> None:
+        """Index the exam headers of a mapped file."""
+        magic, version, exam_count, _ = HEADER.unpack_from(data)
+        if magic != MAPPED_POOL_MAGIC or version != MAPPED_POOL_VERSION:
+            raise ValueError("Mapped question pool has an unsupported format")
+        self._data = data
+        # Strings are decoded straight from the mapped pages, without copying them to bytes first
+        self._view = memoryview(data)
+        self._exams_at = HEADER.size
+        self._questions_at = self._exams_at + exam_count * EXAM.size
+        question_count = sum(
+            EXAM.unpack_from(data, self._exams_at + i * EXAM.size)[3]
+            for i in range(exam_count)
+        )
+        self._choices_at = self._questions_at + question_count * QUESTION.size
+        choice_count = tag_count = 0
+        if question_count:
+            last = QUESTION.unpack_from(
+                data, self._questions_at + (question_count - 1) * QUESTION.size
+            )
+            choice_count, tag_count = last[6] + last[7], last[8] + last[9]
+        self._tags_at = self._choices_at + choice_count * CHOICE.size
+        self._heap_at = self._tags_at + tag_count * TAG.size
+        self._question_count = question_count
+        exams = []
+        for index in range(exam_count):
+            offset, length, first, count = EXAM.unpack_from(
+                data, self._exams_at + index * EXAM.size
+            )
+            header = json.loads(self._string(offset, length))
+            exams.append(dict(header, questions=MappedQuestions(self, first, count)))
+        super().__init__(exams, checksum=checksum, mtime_ns=mtime_ns)
+
+    @classmethod
+    def from_file(cls, filepath: str) -> "MappedQuestionPool":
+        """Map the compiled file of a question pool YAML file, compiling it if it's stale."""
+        mtime_ns = os.stat(filepath).st_mtime_ns
+        with open(filepath, "rb") as yaml_file:
+            checksum = hashlib.sha256(yaml_file.read()).digest()
+        mapped_filepath = mapped_pool_filepath(filepath)
+        data = map_pool_file(mapped_filepath, checksum)
+        if data is None:
+            try:
+                compile_mapped_pool(filepath, mapped_filepath)
+                data = map_pool_file(mapped_filepath, checksum)
+            except OSError as exc:
+                logger.warning(
+                    "Failed to write mapped question pool, compiling it privately",
+                    mapped_filepath=str(mapped_filepath),
+                    error=str(exc),
+                )
+            if data is None:
+                exams = question_pool(filepath)
+                validate_pool(exams)
+                with tempfile.TemporaryFile() as pool_file:
+                    write_mapped_pool(pool_file, checksum, exams)
+                    pool_file.flush()
+                    data = mmap.mmap(pool_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(data, checksum=checksum.hex(), mtime_ns=mtime_ns)
+
+    def question(
+        self, command_name: str, question_index: int, question_key: str
+    ) -> Optional[Question]:
+        """Return a question of an exam by its index, verified against its key.
+
+        Keys are compared from the question table, so only the matching question is decoded.
+        """
+        exam = self.exam(command_name)
+        if exam is None:
+            return None
+        questions = exam.get("questions")
+        if 0 <= question_index < len(questions):
+            if questions.key(question_index) == question_key:
+                return questions[question_index]
+        for index in range(len(questions)):
+            if questions.key(index) == question_key:
+                return questions[index]
+        return None
+
+    @property
+    def total_questions(self) -> int:
+        """Return the number of questions across all exams in the question pool."""
+        return self._question_count
+
+    def question_key(self, index: int) -> str:
+        """Return the key of a question by its index in the question table."""
+        offset = self._questions_at + index * QUESTION.size
+        return KEY.unpack_from(self._data, offset)[0].decode("ascii")
+
+    def decode_question(self, index: int) -> Question:
+        """Decode a question by its index in the question table."""
+        (
+            _,
+            prompt_offset,
+            prompt_length,
+            explanation_offset,
+            explanation_length,
+            correct_choice,
+            first_choice,
+            choice_count,
+            first_tag,
+            tag_count,
+        ) = QUESTION.unpack_from(self._data, self._questions_at + index * QUESTION.size)
+        string = self._string
+        start = self._choices_at + first_choice * CHOICE.size
+        end = start + choice_count * CHOICE.size
+        choices = tuple(
+            Choice(choice_id, string(offset, length))
+            for choice_id, offset, length in CHOICE.iter_unpack(self._view[start:end])
+        )
+        start = self._tags_at + first_tag * TAG.size
+        end = start + tag_count * TAG.size
+        tags = tuple(string(*tag) for tag in TAG.iter_unpack(self._view[start:end]))
+        return Question(
+            string(prompt_offset, prompt_length),
+            choices,
+            correct_choice,
+            string(explanation_offset, explanation_length),
+            tags,
+        )
+
+    def _freeze_exam(self, exam: dict) -> dict:
+        """Return an exam as is, since its questions are decoded from the mapped file on access."""
+        return exam
+
+    def _index_tags(self, exam: dict) -> TagIndex:
+        """Index the question tags of an exam from the question table."""
+        questions = exam.get("questions")
+        return self.index_tags(questions._first, questions._count)
+
+    def index_tags(self, first: int, count: int) -> TagIndex:
+        """Index the tags of count questions of the question table, starting at first.
+
+        Only tags are decoded, once per distinct tag, since the heap holds each string once.
+        """
+        names: Dict[int, str] = {}
+        question_tags = []
+        start = self._questions_at + first * QUESTION.size
+        end = start + count * QUESTION.size
+        for record in QUESTION.iter_unpack(self._view[start:end]):
+            first_tag, tag_count = record[8], record[9]
+            start = self._tags_at + first_tag * TAG.size
+            end = start + tag_count * TAG.size
+            tags = []
+            for offset, length in TAG.iter_unpack(self._view[start:end]):
+                name = names.get(offset)
+                if name is None:
+                    name = names[offset] = self._string(offset, length)
+                tags.append(name)
+            question_tags.append(tags)
+        return TagIndex.from_questions(question_tags)
+
+    def _string(self, offset: int, length: int) -> Optional[str]:
+        """Decode a string of the heap."""
+        if length == NONE_LENGTH:
+            return None
+        start = self._heap_at + offset
+        end = start + length
+        return str(self._view[start:end], "utf-8")
+
+
+def map_pool_file(mapped_filepath: Path, checksum: bytes) -> Optional[mmap.mmap]:
+    """Map a compiled question pool file if it was compiled from YAML with a checksum.
+
+    Returns None if the file is missing, of another format, or stale.
+    """
+    try:
+        with open(mapped_filepath, "rb") as pool_file:
+            data = mmap.mmap(pool_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(data) >= HEADER.size:
+        magic, version, _, file_checksum = HEADER.unpack_from(data)
+        if (magic, version, file_checksum) == (
+            MAPPED_POOL_MAGIC,
+            MAPPED_POOL_VERSION,
+            checksum,
+        ):
+            return data
+    data.close()
+    return None
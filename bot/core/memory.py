@@ -0,0 +1,119 @@
+"""Houses memory usage sampling, and the tracking of allocation sites that grow over time.
+
+Process RSS is cheap to sample, and is exposed as a metric. Finding out what holds on to the
+memory takes tracemalloc, which records the stack of every allocation made while it's tracing;
+recording a single frame per allocation keeps its overhead as low as tracemalloc allows, though
+allocation-heavy code still runs noticeably slower. Comparing periodic snapshots then shows
+which allocation sites grew in between.
+"""
+
+import os
+import sys
+import tracemalloc
+from typing import List, NamedTuple, Optional
+import structlog
+from bot.core.metrics import registry
+
+logger = structlog.getLogger(name=__name__)
+
+# Allocations made by tracemalloc and the import system are noise when looking for growth
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def rss_bytes() -> Optional[int]:
+    """Return the resident set size of this process, or None if it can't be read."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):  # Not on Linux
+        return None
+
+
+def site_name(frame: tracemalloc.Frame) -> str:
+    """Return the location of a frame, relative to the import path it was loaded from."""
+    filename = frame.filename
+    prefixes = [path for path in sys.path if path and filename.startswith(path)]
+    if prefixes:
+        start = len(max(prefixes, key=len))
+        filename = filename[start:].lstrip(os.sep)
+    return f"{filename}:{frame.lineno}"
+
+
+class SiteGrowth(NamedTuple):
+    """Growth of the memory allocated at one allocation site between two snapshots."""
+
+    site: str
+    size: int
+    size_diff: int
+    count: int
+    count_diff: int
+
+
+class MemoryProfiler:
+    """Tracker of the allocation sites that grew between consecutive tracemalloc snapshots.
+
+    Allocation sites are grouped by their innermost frame, or by their whole traceback when
+    more than one frame is recorded per allocation.
+    """
+
+    def __init__(self, frames: int = 1, top: int = 10) -> None:
+        """Instantiate a new profiler recording frames per allocation, reporting top sites."""
+        self.frames: int = frames
+        self.top: int = top
+        self.snapshots: int = 0
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    def start(self) -> None:
+        """Start tracing allocations, unless they're already being traced."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def stop(self) -> None:
+        """Stop tracing allocations, and forget the last snapshot."""
+        tracemalloc.stop()
+        self._previous = None
+
+    def growth(self) -> List[SiteGrowth]:
+        """Take a snapshot, and return the sites that grew the most since the last one.
+
+        The first snapshot is only kept as a baseline, so no sites are returned for it.
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        previous, self._previous = self._previous, snapshot
+        self.snapshots += 1
+        if previous is None:
+            return []
+        key_type = "traceback" if self.frames > 1 else "lineno"
+        grown = []
+        for stat in snapshot.compare_to(previous, key_type):
+            if stat.size_diff <= 0:
+                continue
+            grown.append(
+                SiteGrowth(
+                    " <- ".join(site_name(frame) for frame in reversed(stat.traceback)),
+                    stat.size,
+                    stat.size_diff,
+                    stat.count,
+                    stat.count_diff,
+                )
+            )
+            if len(grown) == self.top:
+                break
+        return grown
+
+
+registry.gauge(
+    "process_resident_memory_bytes",
+    "Resident memory size of the bot's process.",
+    callback=lambda: rss_bytes() or 0,
+)
+registry.gauge(
+    "trivia_traced_memory_bytes",
+    "Memory allocated by Python since tracemalloc started tracing, if it's tracing.",
+    callback=lambda: tracemalloc.get_traced_memory()[0],
+)
@@ -0,0 +1,26 @@
+"""Houses precomputed permutation tables used to randomize the order of answer choices."""
+
+from itertools import permutations
+from random import choice, sample
+from typing import Dict, Tuple
+
+# Questions rarely have more than a handful of choices. Tables beyond this size grow
+# factorially, so larger questions fall back to sampling a permutation.
+MAX_TABLE_CHOICES = 6
+
+PERMUTATION_TABLES: Dict[int, Tuple[Tuple[int, ...], ...]] = {
+    length: tuple(permutations(range(length)))
+    for length in range(1, MAX_TABLE_CHOICES + 1)
+}
+
+
+def random_permutation(length: int) -> Tuple[int, ...]:
+    """Return a uniformly random ordering of the indices of a sequence of a given length.
+
+    Orderings of up to MAX_TABLE_CHOICES indices are drawn from a precomputed table, so no
+    sequence is built or shuffled per call.
+    """
+    table = PERMUTATION_TABLES.get(length)
+    if table is None:
+        return tuple(sample(range(length), length))
+    return choice(table)
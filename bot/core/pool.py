@@ -0,0 +1,562 @@
+"""Houses the resident, in-memory question pool used to serve trivia commands."""
+
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import structlog
+from yaml import (
+    AliasEvent,
+    CollectionEndEvent,
+    CollectionStartEvent,
+    Event,
+    MappingEndEvent,
+    MappingStartEvent,
+    SafeLoader,
+    ScalarEvent,
+    SequenceEndEvent,
+    SequenceStartEvent,
+    YAMLError,
+    load,
+    parse,
+)
+from bot.core.tags import TagIndex
+from bot.core.util import question_pool
+from bot.models.question import Question
+
+try:
+    from yaml import CSafeLoader as FastSafeLoader
+except ImportError:  # PyYAML was built without libyaml
+    FastSafeLoader = SafeLoader
+
+logger = structlog.getLogger(name=__name__)
+
+
+class QuestionPool:
+    """Parsed question pool indexed by exam command name.
+
+    The question pool is parsed once and kept in memory so that trivia commands can look up
+    their exam in constant time instead of re-reading the question pool YAML file on every
+    invocation. The exams of a question pool are never modified after it is built; reloading
+    the question pool builds a new instance and swaps it in, so holders of an old instance keep
+    a consistent snapshot.
+    """
+
+    def __init__(
+        self, exams: List[dict], checksum: Optional[str] = None, mtime_ns: int = 0
+    ) -> None:
+        """Index a list of exams by their command name.
+
+        Each exam's questions are converted into an immutable tuple of questions.
+        """
+        self.exams: List[dict] = [self._freeze_exam(exam) for exam in exams]
+        self.checksum: Optional[str] = checksum
+        self.mtime_ns: int = mtime_ns
+        self.options: Dict[str, Any] = {}
+        self._index: Dict[str, dict] = {
+            exam.get("command_name"): exam for exam in self.exams
+        }
+        self._tag_indexes: Dict[str, TagIndex] = {
+            exam.get("command_name"): self._index_tags(exam)
+            for exam in self.exams
+            if "questions" in exam
+        }
+
+    @classmethod
+    def from_file(cls, filepath: str) -> "QuestionPool":
+        """Parse and validate a question pool YAML file into a new question pool."""
+        mtime_ns = os.stat(filepath).st_mtime_ns
+        checksum = file_checksum(filepath)
+        exams = question_pool(filepath)
+        validate_pool(exams)
+        return cls(exams, checksum=checksum, mtime_ns=mtime_ns)
+
+    def exam(self, command_name: str) -> Optional[dict]:
+        """Return the exam registered under a command name, if any."""
+        return self._index.get(command_name)
+
+    def tag_index(self, command_name: str) -> Optional[TagIndex]:
+        """Return the index of the question tags of an exam, if it's in the question pool."""
+        return self._tag_indexes.get(command_name)
+
+    def _freeze_exam(self, exam: dict) -> dict:
+        """Return an exam as the question pool keeps it."""
+        return freeze_exam(exam)
+
+    def _index_tags(self, exam: dict) -> TagIndex:
+        """Index the question tags of an exam the question pool keeps."""
+        return index_tags(exam)
+
+    def question(
+        self, command_name: str, question_index: int, question_key: str
+    ) -> Optional[Question]:
+        """Return a question of an exam by its index, verified against its key.
+
+        If a reload moved the question within its exam, the exam is searched for its key.
+        """
+        exam = self.exam(command_name)
+        if exam is None:
+            return None
+        questions = exam.get("questions")
+        if 0 <= question_index < len(questions):
+            question = questions[question_index]
+            if question.key == question_key:
+                return question
+        for question in questions:
+            if question.key == question_key:
+                return question
+        return None
+
+    def __iter__(self) -> Iterator[dict]:
+        """Iterate over exams in the order they appear in the question pool."""
+        return iter(self.exams)
+
+    def __len__(self) -> int:
+        """Return the number of exams in the question pool."""
+        return len(self.exams)
+
+    @property
+    def total_questions(self) -> int:
+        """Return the number of questions across all exams in the question pool."""
+        return sum(len(exam.get("questions", [])) for exam in self.exams)
+
+
+class LazyQuestionPool(QuestionPool):
+    """Question pool that only parses exam headers up front.
+
+    At startup, the question pool YAML file is streamed through PyYAML's event API to collect
+    each exam's header keys (everything except its questions) along with the byte offsets of
+    its questions block, which is skipped without being constructed. An exam's questions are
+    parsed the first time the exam is looked up. When max_loaded_questions is non-zero, the
+    least recently used exams have their questions evicted to keep the number of loaded
+    questions under that cap, and are parsed again on their next use.
+
+    Iterating over a lazy question pool yields exam headers, which have no questions key.
+    """
+
+    def __init__(
+        self,
+        filepath: str,
+        headers: List[dict],
+        offsets: Dict[str, Tuple[int, int, int]],
+        question_counts: Dict[str, int],
+        max_loaded_questions: int = 0,
+        checksum: Optional[str] = None,
+        mtime_ns: int = 0,
+    ) -> None:
+        """Index exam headers and the location of their questions in the question pool file."""
+        super().__init__(headers, checksum=checksum, mtime_ns=mtime_ns)
+        self.filepath: str = filepath
+        self.options = {"max_loaded_questions": max_loaded_questions}
+        self.max_loaded_questions: int = max_loaded_questions
+        self.loaded_questions: int = 0
+        self._offsets: Dict[str, Tuple[int, int, int]] = offsets
+        self._question_counts: Dict[str, int] = question_counts
+        self._loaded: "OrderedDict[str, dict]" = OrderedDict()
+
+    @classmethod
+    def from_file(
+        cls, filepath: str, max_loaded_questions: int = 0
+    ) -> "LazyQuestionPool":
+        """Scan the exam headers of a question pool YAML file into a new lazy question pool."""
+        mtime_ns = os.stat(filepath).st_mtime_ns
+        with open(filepath, "rb") as pool_file:
+            contents = pool_file.read()
+        headers, offsets, question_counts = scan_exam_headers(contents)
+        for header in headers:
+            validate_exam_header(header)
+            if not question_counts.get(header.get("command_name")):
+                raise ValueError(f"Exam {header.get('command_name')} has no questions")
+        validate_unique_command_names(headers)
+        return cls(
+            filepath,
+            headers,
+            offsets,
+            question_counts,
+            max_loaded_questions=max_loaded_questions,
+            checksum=hashlib.sha256(contents).hexdigest(),
+            mtime_ns=mtime_ns,
+        )
+
+    def exam(self, command_name: str) -> Optional[dict]:
+        """Return the exam registered under a command name, parsing its questions if needed."""
+        exam = self._loaded.get(command_name)
+        if exam is not None:
+            self._loaded.move_to_end(command_name)
+            return exam
+        header = self._index.get(command_name)
+        if header is None:
+            return None
+        start = perf_counter()
+        questions = self._load_questions(command_name)
+        validate_questions(command_name, questions)
+        exam = freeze_exam(dict(header, questions=questions))
+        self._loaded[command_name] = exam
+        self._tag_indexes[command_name] = index_tags(exam)
+        self.loaded_questions += len(questions)
+        logger.info(
+            "Exam questions loaded",
+            command_name=command_name,
+            total_questions=len(questions),
+            loaded_questions=self.loaded_questions,
+            duration_ms=round((perf_counter() - start) * 1000, 3),
+        )
+        self._evict()
+        return exam
+
+    def tag_index(self, command_name: str) -> Optional[TagIndex]:
+        """Return the index of the question tags of an exam, parsing its questions if needed."""
+        if self.exam(command_name) is None:
+            return None
+        return self._tag_indexes.get(command_name)
+
+    @property
+    def total_questions(self) -> int:
+        """Return the number of questions across all exams in the question pool."""
+        return sum(self._question_counts.values())
+
+    def _load_questions(self, command_name: str) -> List[dict]:
+        """Parse the questions block of an exam from the question pool file."""
+        start, end, column = self._offsets[command_name]
+        with open(self.filepath, "rb") as pool_file:
+            if os.fstat(pool_file.fileno()).st_mtime_ns == self.mtime_ns:
+                pool_file.seek(start)
+                block = pool_file.read(end - start).decode("utf-8")
+                # The block starts partway through a line, so restore its indentation.
+                return load(" " * column + block, FastSafeLoader)
+        # The file changed since its headers were scanned, so our offsets can't be trusted.
+        # Fall back to parsing the whole file until a reload swaps in a fresh question pool.
+        logger.warning(
+            "Question pool file changed before exam was loaded",
+            command_name=command_name,
+        )
+        for exam in question_pool(self.filepath):
+            if exam.get("command_name") == command_name:
+                return exam.get("questions")
+        raise ValueError(f"Exam {command_name} is no longer in the question pool")
+
+    def _evict(self) -> None:
+        """Evict least recently used exams until the loaded questions fit under the cap."""
+        if not self.max_loaded_questions:
+            return
+        while (
+            self.loaded_questions > self.max_loaded_questions and len(self._loaded) > 1
+        ):
+            command_name, exam = self._loaded.popitem(last=False)
+            del self._tag_indexes[command_name]
+            self.loaded_questions -= len(exam.get("questions"))
+            logger.info(
+                "Exam questions evicted",
+                command_name=command_name,
+                loaded_questions=self.loaded_questions,
+            )
+
+
+def index_tags(exam: dict) -> TagIndex:
+    """Index the question tags of a frozen exam."""
+    return TagIndex.from_questions(question.tags for question in exam.get("questions"))
+
+
+def freeze_exam(exam: dict) -> dict:
+    """Return a copy of an exam with its questions converted into an immutable tuple."""
+    if "questions" not in exam:
+        return exam
+    return dict(
+        exam, questions=tuple(Question.from_dict(q) for q in exam.get("questions"))
+    )
+
+
+def _skip_node(events: Iterator[Event], event: Event) -> Tuple[Event, int]:
+    """Consume the events of the node started by an event.
+
+    Returns:
+        The last event of the node and the number of items directly within it.
+    """
+    if not isinstance(event, CollectionStartEvent):
+        return event, 0
+    depth = 1
+    items = 0
+    for event in events:
+        if depth == 1 and isinstance(
+            event, (ScalarEvent, AliasEvent, CollectionStartEvent)
+        ):
+            items += 1
+        if isinstance(event, CollectionStartEvent):
+            depth += 1
+        elif isinstance(event, CollectionEndEvent):
+            depth -= 1
+            if depth == 0:
+                return event, items
+    raise ValueError("Question pool ended unexpectedly")
+
+
+def scan_exam_headers(
+    contents: bytes,
+) -> Tuple[List[dict], Dict[str, Tuple[int, int, int]], Dict[str, int]]:
+    """Scan a question pool's exam headers without constructing any questions.
+
+    Returns:
+        A list of exam headers (scalar keys of each exam), a mapping of command names to the
+        byte offsets and starting column of each exam's questions block, and a mapping of
+        command names to their number of questions.
+    """
+    text = contents.decode("utf-8")
+    # PyYAML marks are character indices, so convert them to byte offsets for seeking.
+    if len(text) == len(contents):
+
+        def byte_offset(index: int) -> int:
+            return index
+
+    else:
+        last = [0, 0]
+
+        def byte_offset(index: int) -> int:
+            previous_index = last[0]
+            last[1] += len(text[previous_index:index].encode("utf-8"))
+            last[0] = index
+            return last[1]
+
+    headers = []
+    offsets = {}
+    question_counts = {}
+    events = iter(parse(text, FastSafeLoader))
+    for event in events:
+        if isinstance(event, SequenceStartEvent):
+            break
+    else:
+        raise ValueError("Question pool must be a list of exams")
+    for event in events:
+        if isinstance(event, SequenceEndEvent):
+            break
+        if not isinstance(event, MappingStartEvent):
+            raise ValueError("Each exam must be a dictionary")
+        header = {}
+        questions = None
+        for key in events:
+            if isinstance(key, MappingEndEvent):
+                break
+            value = next(events)
+            if isinstance(key, ScalarEvent) and key.value == "questions":
+                end, count = _skip_node(events, value)
+                questions = (
+                    byte_offset(value.start_mark.index),
+                    byte_offset(end.end_mark.index),
+                    value.start_mark.column,
+                    count,
+                )
+            elif isinstance(key, ScalarEvent) and isinstance(value, ScalarEvent):
+                header[key.value] = value.value
+            else:
+                _skip_node(events, value)
+        headers.append(header)
+        if questions is not None:
+            offsets[header.get("command_name")] = questions[:3]
+            question_counts[header.get("command_name")] = questions[3]
+    return headers, offsets, question_counts
+
+
+def file_checksum(filepath: str) -> str:
+    """Return the SHA-256 checksum of a file's contents."""
+    with open(filepath, "rb") as pool_file:
+        return hashlib.sha256(pool_file.read()).hexdigest()
+
+
+def validate_exam_header(exam: dict) -> None:
+    """Ensure an exam's header keys are well-formed.
+
+    Raises:
+        ValueError: The exam header is malformed.
+    """
+    if not isinstance(exam, dict):
+        raise ValueError("Each exam must be a dictionary")
+    command_name = exam.get("command_name")
+    if not isinstance(command_name, str) or len(command_name.split(" ")) != 1:
+        raise ValueError(f"Exam has an invalid command_name: {command_name!r}")
+    for key in ("meta_name", "command_description"):
+        if not isinstance(exam.get(key), str):
+            raise ValueError(f"Exam {command_name} has an invalid {key}")
+
+
+def validate_unique_command_names(exams: List[dict]) -> None:
+    """Ensure no two exams share a command name.
+
+    Raises:
+        ValueError: A command name is not unique.
+    """
+    command_names = set()
+    for exam in exams:
+        command_name = exam.get("command_name")
+        if command_name in command_names:
+            raise ValueError(f"Exam command_name is not unique: {command_name}")
+        command_names.add(command_name)
+
+
+def validate_questions(command_name: str, questions: List[dict]) -> None:
+    """Ensure an exam's questions are well-formed enough to be asked.
+
+    Raises:
+        ValueError: The questions are malformed.
+    """
+    if not isinstance(questions, list) or not questions:
+        raise ValueError(f"Exam {command_name} has no questions")
+    for question in questions:
+        if not isinstance(question, dict) or not isinstance(
+            question.get("prompt"), str
+        ):
+            raise ValueError(f"Exam {command_name} has a question without a prompt")
+        choice_ids = [c.get("id") for c in question.get("choices") or []]
+        if question.get("correct_choice") not in choice_ids:
+            raise ValueError(
+                f"Exam {command_name} has a question whose correct_choice is not one of "
+                f"its choices: {question.get('prompt')!r}"
+            )
+
+
+def validate_pool(exams: List[dict]) -> None:
+    """Ensure a parsed question pool is well-formed enough to serve trivia commands.
+
+    Raises:
+        ValueError: The question pool is malformed.
+    """
+    if not isinstance(exams, list):
+        raise ValueError("Question pool must be a list of exams")
+    for exam in exams:
+        validate_exam_header(exam)
+        validate_questions(exam.get("command_name"), exam.get("questions"))
+    validate_unique_command_names(exams)
+
+
+_pool: Optional[QuestionPool] = None
+_failed_mtime_ns: Optional[int] = None
+
+
+def load_pool(
+    filepath: str,
+    lazy: bool = False,
+    max_loaded_questions: int = 0,
+    mapped: bool = False,
+) -> QuestionPool:
+    """Parse the question pool and make it the resident question pool.
+
+    Args:
+        filepath (str): Question pool YAML file.
+        lazy (bool): Only parse exam headers now, and each exam's questions on first use.
+        max_loaded_questions (int): For a lazy question pool, the number of loaded questions
+            above which least recently used exams are evicted. Zero means no limit.
+        mapped (bool): Serve the question pool from a compiled file mapped into memory, which
+            processes on the same host share. Takes precedence over lazy.
+    """
+    if mapped:
+        # Import here to avoid a circular import, as mapped pools are question pools.
+        from bot.core.mapped_pool import MappedQuestionPool
+
+        pool = MappedQuestionPool.from_file(filepath)
+    elif lazy:
+        pool = LazyQuestionPool.from_file(
+            filepath, max_loaded_questions=max_loaded_questions
+        )
+    else:
+        pool = QuestionPool.from_file(filepath)
+    swap_pool(pool)
+    logger.info(
+        "Question pool loaded",
+        filepath=str(filepath),
+        lazy=lazy,
+        mapped=mapped,
+        checksum=pool.checksum,
+        total_exams=len(pool),
+        total_questions=pool.total_questions,
+    )
+    return pool
+
+
+def swap_pool(pool: QuestionPool) -> None:
+    """Atomically replace the resident question pool."""
+    global _pool
+    _pool = pool
+
+
+def current_pool() -> QuestionPool:
+    """Return the resident question pool, loading it from settings if necessary.
+
+    Callers should fetch the resident question pool once per invocation and use that instance
+    throughout, so that a concurrent reload can't change the pool out from under them.
+    """
+    if _pool is None:
+        # Import here so unit tests that don't need settings work properly.
+        from bot.core.config import settings
+
+        return load_pool(
+            settings.QUESTION_POOL_FILEPATH,
+            lazy=settings.QUESTION_POOL_LAZY,
+            max_loaded_questions=settings.QUESTION_POOL_MAX_LOADED_QUESTIONS,
+            mapped=settings.QUESTION_POOL_MAPPED,
+        )
+    return _pool
+
+
+def _changed_pool(filepath: str, previous: QuestionPool) -> Optional[QuestionPool]:
+    """Return a freshly-parsed question pool if the file's contents differ from a pool's."""
+    if file_checksum(filepath) == previous.checksum:
+        return None
+    return type(previous).from_file(filepath, **previous.options)
+
+
+async def reload_pool(filepath: str) -> Optional[QuestionPool]:
+    """Reload the resident question pool if the question pool file has changed.
+
+    The file's modification time is checked first, and its contents are only hashed, parsed and
+    validated (in a worker thread, off the event loop) when it has changed. A valid new question
+    pool is swapped in atomically; an invalid one is logged and the resident pool is kept.
+
+    Returns:
+        The new resident question pool, or None if the resident question pool was not replaced.
+    """
+    global _failed_mtime_ns
+    previous = current_pool()
+    try:
+        mtime_ns = os.stat(filepath).st_mtime_ns
+    except OSError as exc:
+        logger.warning(
+            "Question pool file unavailable", filepath=str(filepath), error=str(exc)
+        )
+        return None
+    if mtime_ns in (previous.mtime_ns, _failed_mtime_ns):
+        return None
+    start = perf_counter()
+    loop = asyncio.get_running_loop()
+    try:
+        pool = await loop.run_in_executor(None, _changed_pool, filepath, previous)
+    except (OSError, YAMLError, ValueError) as exc:
+        _failed_mtime_ns = mtime_ns
+        logger.warning(
+            "Question pool reload failed",
+            outcome="invalid",
+            filepath=str(filepath),
+            error=str(exc),
+            duration_ms=round((perf_counter() - start) * 1000, 3),
+        )
+        return None
+    if pool is None:
+        # Only the modification time changed, so remember it to avoid hashing again.
+        previous.mtime_ns = mtime_ns
+        logger.info(
+            "Question pool reload skipped",
+            outcome="unchanged",
+            checksum=previous.checksum,
+            duration_ms=round((perf_counter() - start) * 1000, 3),
+        )
+        return None
+    swap_pool(pool)
+    logger.info(
+        "Question pool reloaded",
+        outcome="reloaded",
+        previous_checksum=previous.checksum,
+        checksum=pool.checksum,
+        total_exams=len(pool),
+        total_questions=pool.total_questions,
+        duration_ms=round((perf_counter() - start) * 1000, 3),
+    )
+    return pool
@@ -0,0 +1,132 @@
+"""Houses the token-bucket rate limiters placed in front of trivia commands and answers."""
+
+from itertools import islice
+from time import monotonic
+from typing import Dict, Hashable, Optional
+
+
+class TokenBucket:
+    """Token buckets of one scope, such as users, kept as one float per key.
+
+    Buckets follow the generic cell rate algorithm (GCRA): rather than a token count and a last
+    refill time, each key only stores the time at which its bucket will be full again. A bucket
+    allows up to limit hits at once, and refills one hit every period / limit seconds. Keys whose
+    buckets are full again are equivalent to absent keys, so sweep() removes them, and at most
+    max_keys keys are kept at any time. When max_keys keys are kept, the hundredth of the keys
+    that have been kept the longest are removed, and those whose buckets aren't full forgiven.
+    """
+
+    def __init__(self, limit: int, period: float, max_keys: int = 1_000_000) -> None:
+        """Instantiate new token buckets allowing limit hits per period seconds per key."""
+        self.limit: int = limit
+        self.period: float = period
+        self.max_keys: int = max_keys
+        self.interval: float = period / limit
+        self.tolerance: float = period - self.interval
+        self.evictions: int = 0
+        self._full_at: Dict[Hashable, float] = {}
+
+    def __len__(self) -> int:
+        """Return the number of keys whose buckets aren't full."""
+        return len(self._full_at)
+
+    def wait(self, key: Hashable, now: float) -> float:
+        """Return how long a key must wait before it may hit its bucket, or 0 if it may now."""
+        wait = self._full_at.get(key, now) - self.tolerance - now
+        # Allow for rounding errors accumulated over a burst of hits
+        return wait if wait > 1e-9 else 0.0
+
+    def hit(self, key: Hashable, now: float) -> None:
+        """Take one hit from a key's bucket, regardless of whether it may."""
+        full_at = self._full_at.get(key)
+        if full_at is None:
+            if len(self._full_at) >= self.max_keys:
+                self._evict(now)
+            full_at = now
+        self._full_at[key] = max(full_at, now) + self.interval
+
+    def _evict(self, now: float) -> None:
+        """Remove the hundredth of the keys that have been kept the longest.
+
+        Keys are popped from the front of the dictionary, which keeps them in insertion order,
+        rather than rebuilding it, so that a hit at the cap only takes time for the keys removed.
+        """
+        for key in list(islice(self._full_at, max(self.max_keys // 100, 1))):
+            if self._full_at.pop(key) > now:
+                self.evictions += 1
+
+    def sweep(self, now: float) -> int:
+        """Remove keys whose buckets are full again.
+
+        The buckets are rebuilt rather than deleted from, since dictionaries don't release memory
+        when keys are deleted.
+
+        Returns:
+            The number of keys removed.
+        """
+        before = len(self._full_at)
+        self._full_at = {
+            key: full_at for key, full_at in self._full_at.items() if full_at > now
+        }
+        return before - len(self._full_at)
+
+
+class RateLimiter:
+    """Rate limiter that checks token buckets of several scopes at once.
+
+    A hit is only allowed if it's allowed by the bucket of every scope it's keyed by, and is
+    only taken from the buckets if it's allowed, so that rejected hits don't count against a
+    user's own bucket when, say, their guild's bucket is empty. Scopes keyed by None, such as
+    the guild of a direct message, are skipped.
+    """
+
+    def __init__(self, period: float, max_keys: int = 1_000_000, **limits: int) -> None:
+        """Instantiate a new rate limiter with a per-period limit for each scope.
+
+        Scopes with a limit of 0 aren't rate limited.
+        """
+        self.buckets: Dict[str, TokenBucket] = {
+            scope: TokenBucket(limit, period, max_keys)
+            for scope, limit in limits.items()
+            if limit > 0
+        }
+        self.hits: int = 0
+        self.rejections: int = 0
+
+    def hit(self, now: Optional[float] = None, **keys: Hashable) -> float:
+        """Take a hit keyed by each scope, if every scope allows it.
+
+        Returns:
+            0 if the hit was allowed, otherwise how many seconds to wait before trying again.
+        """
+        if now is None:
+            now = monotonic()
+        keyed = [
+            (bucket, keys[scope])
+            for scope, bucket in self.buckets.items()
+            if keys.get(scope) is not None
+        ]
+        retry_after = 0.0
+        for bucket, key in keyed:
+            retry_after = max(retry_after, bucket.wait(key, now))
+        if retry_after > 0:
+            self.rejections += 1
+            return retry_after
+        for bucket, key in keyed:
+            bucket.hit(key, now)
+        self.hits += 1
+        return 0.0
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Remove keys whose buckets are full again from every scope.
+
+        Returns:
+            The number of keys removed.
+        """
+        if now is None:
+            now = monotonic()
+        return sum(bucket.sweep(now) for bucket in self.buckets.values())
+
+    def __len__(self) -> int:
+        """Return the number of keys kept across every scope."""
+        return sum(len(bucket) for bucket in self.buckets.values())
@@ -0,0 +1,208 @@
+"""Houses the shuffle bags trivia questions are drawn from, one per channel and exam.
+
+Drawing questions uniformly at random repeats them often in small exams. A shuffle bag instead
+draws each of an exam's questions once per round, in a random order, so a channel only sees a
+question again once it has seen every other question of the exam.
+
+Bags can be saved to and loaded from a local file, so that restarts don't reset every round.
+The file is laid out as follows, with every integer little-endian:
+
+- A header: magic, format version and bag count.
+- Each bag, from the least to the most recently drawn from: its channel ID, the length of its
+  exam's UTF-8 encoded command name, the size of its items, its item count, its exam's command
+  name and its items.
+"""
+
+import os
+import struct
+import sys
+from array import array
+from collections import OrderedDict
+from itertools import chain
+from pathlib import Path
+from random import random
+from typing import Dict, Iterator, Tuple
+
+SHUFFLE_BAGS_MAGIC = b"DITQBAGS"
+SHUFFLE_BAGS_VERSION = 1
+
+# Magic, version and bag count
+HEADER = struct.Struct("<8sII")
+# Channel ID, command name length, item size and item count
+BAG = struct.Struct("<QHBI")
+
+# Memory taken by a bag besides its items: the array, its key and its entry in the LRU order
+BAG_OVERHEAD = 232
+
+TYPECODES = {array(typecode).itemsize: typecode for typecode in ("H", "I")}
+
+
+def new_bag(questions: int) -> array:
+    """Return a bag of an exam's question indices, none of which were drawn yet."""
+    typecode = "H" if questions < 2**16 else "I"
+    return array(typecode, chain((0,), range(questions)))
+
+
+def bag_size(bag: array) -> int:
+    """Return the memory taken by a bag, in bytes."""
+    return BAG_OVERHEAD + bag.itemsize * len(bag)
+
+
+class ShuffleBags:
+    """Shuffle bags of question indices, kept per channel and exam within a memory budget.
+
+    Each bag is a single array: its first item is the number of questions drawn in the current
+    round, followed by the questions drawn this round in the order they were drawn, and then the
+    questions left to draw. Each draw swaps a random question left to draw into place, one step
+    of a Fisher-Yates shuffle, so draws take constant time. The first draw of a round never
+    repeats the last draw of the previous round.
+
+    Bags are created on a channel's first draw from an exam, and recreated if the exam's
+    question count changed. When bags take more than max_bytes, those drawn from the longest ago
+    are evicted.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2**20) -> None:
+        """Instantiate new shuffle bags taking up to max_bytes of memory."""
+        self.max_bytes: int = max_bytes
+        self.bytes: int = 0
+        self.draws: int = 0
+        self.evictions: int = 0
+        self._bags: "OrderedDict[Tuple[int, str], array]" = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of bags kept."""
+        return len(self._bags)
+
+    def draw(self, channel: int, command_name: str, questions: int) -> int:
+        """Draw the index of a question from a channel's bag for an exam of questions questions."""
+        key = (channel, command_name)
+        bag = self._bags.get(key)
+        if bag is None or len(bag) != questions + 1:
+            bag = self._add(key, new_bag(questions))
+        else:
+            self._bags.move_to_end(key)
+        drawn = bag[0]
+        end = questions + 1
+        if drawn == questions:
+            # Start a new round, leaving the last question drawn out of its first draw
+            drawn = 0
+            if questions > 1:
+                end -= 1
+        position = drawn + 1
+        # Faster than randrange(), and as uniform for any realistic question count
+        swapped = position + int(random() * (end - position))
+        bag[position], bag[swapped] = bag[swapped], bag[position]
+        bag[0] = position
+        self.draws += 1
+        return bag[position]
+
+    def _add(self, key: Tuple[int, str], bag: array) -> array:
+        """Keep a bag, replacing any bag with the same key, and evict bags over the budget."""
+        replaced = self._bags.pop(key, None)
+        if replaced is not None:
+            self.bytes -= bag_size(replaced)
+        self._bags[key] = bag
+        self.bytes += bag_size(bag)
+        while self.bytes > self.max_bytes and len(self._bags) > 1:
+            _, evicted = self._bags.popitem(last=False)
+            self.bytes -= bag_size(evicted)
+            self.evictions += 1
+        return bag
+
+    def dump_chunks(self, chunk_bags: int = 10_000) -> Iterator[bytes]:
+        """Serialize every bag, from the least to the most recently drawn from, in chunks.
+
+        The bags are serialized as they were when the chunk holding them was, so bags can still
+        be drawn from between chunks.
+        """
+        bags = list(self._bags.items())
+        yield HEADER.pack(SHUFFLE_BAGS_MAGIC, SHUFFLE_BAGS_VERSION, len(bags))
+        names: Dict[str, bytes] = {}
+        for start in range(0, len(bags), chunk_bags):
+            end = start + chunk_bags
+            records = []
+            for (channel, command_name), bag in bags[start:end]:
+                name = names.get(command_name)
+                if name is None:
+                    name = names[command_name] = command_name.encode()
+                if sys.byteorder == "big":
+                    bag = array(bag.typecode, bag)
+                    bag.byteswap()
+                records.append(BAG.pack(channel, len(name), bag.itemsize, len(bag)))
+                records.append(name)
+                records.append(bag.tobytes())
+            yield b"".join(records)
+
+    def dumps(self) -> bytes:
+        """Serialize every bag, from the least to the most recently drawn from."""
+        return b"".join(self.dump_chunks())
+
+    def loads(self, data: bytes) -> int:
+        """Keep the bags serialized by dumps(), as the most recently drawn from.
+
+        Returns:
+            The number of bags loaded.
+
+        Raises:
+            ValueError: The data isn't serialized bags.
+        """
+        try:
+            magic, version, count = HEADER.unpack_from(data)
+        except struct.error as exc:
+            raise ValueError("Truncated shuffle bags") from exc
+        if magic != SHUFFLE_BAGS_MAGIC or version != SHUFFLE_BAGS_VERSION:
+            raise ValueError("Not shuffle bags of a supported version")
+        bags = []
+        offset = HEADER.size
+        try:
+            for _ in range(count):
+                channel, name_length, itemsize, length = BAG.unpack_from(data, offset)
+                offset += BAG.size
+                end = offset + name_length
+                command_name = data[offset:end].decode()
+                offset, end = end, end + itemsize * length
+                bag = array(TYPECODES[itemsize])
+                bag.frombytes(data[offset:end])
+                offset = end
+                if sys.byteorder == "big":
+                    bag.byteswap()
+                if len(bag) != length or length < 2 or bag[0] >= length:
+                    raise ValueError("Truncated or corrupt shuffle bag")
+                if max(bag[1:]) >= length - 1:
+                    raise ValueError("Corrupt shuffle bag")
+                bags.append(((channel, command_name), bag))
+        except (struct.error, KeyError, UnicodeDecodeError, IndexError) as exc:
+            raise ValueError("Truncated or corrupt shuffle bags") from exc
+        for key, bag in bags:
+            self._add(key, bag)
+        return len(bags)
+
+    def save(self, filepath: Path) -> None:
+        """Atomically write every bag to a file."""
+        write_shuffle_bags(filepath, self.dumps())
+
+    def load(self, filepath: Path) -> int:
+        """Keep the bags written to a file by save().
+
+        Returns:
+            The number of bags loaded.
+
+        Raises:
+            OSError: The file can't be read.
+            ValueError: The file doesn't hold serialized bags.
+        """
+        with open(filepath, "rb") as bags_file:
+            return self.loads(bags_file.read())
+
+
+def write_shuffle_bags(filepath: Path, data: bytes) -> None:
+    """Atomically write bags serialized by ShuffleBags.dumps() to a file."""
+    temporary_filepath = Path(f"{filepath}.{os.getpid()}.tmp")
+    try:
+        with open(temporary_filepath, "wb") as bags_file:
+            bags_file.write(data)
+        os.replace(temporary_filepath, filepath)
+    finally:
+        if temporary_filepath.exists():
+            temporary_filepath.unlink()
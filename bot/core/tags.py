@@ -0,0 +1,154 @@
+"""Houses the inverted index of question tags trivia commands filter their questions by.
+
+Each exam's index maps every tag to a bitset, held in an int, whose bit i is set if the exam's
+question i has the tag. Questions matching several tags are the intersection or union of their
+bitsets, and a random matching question is picked by drawing a rank below the number of set
+bits and selecting the bit of that rank, without looking at any question.
+"""
+
+from typing import Dict, Iterable, List, Sequence
+
+# Separates the tags of a trivia command's tags option
+TAG_SEPARATOR = ","
+# Discord's limits on the autocomplete choices of an option, and on the length of their values
+MAX_AUTOCOMPLETE_CHOICES = 25
+MAX_OPTION_VALUE_LENGTH = 100
+# Bytes of the blocks select() counts the set bits of before looking at their words
+SELECT_BLOCK_BYTES = 64
+
+
+def popcount(bits: int) -> int:
+    """Return the number of set bits of a bitset."""
+    return bin(bits).count("1")
+
+
+def select(bits: int, rank: int) -> int:
+    """Return the index of the set bit of a bitset that has rank set bits below it.
+
+    Raises:
+        IndexError: The bitset has no more than rank set bits.
+    """
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    # Skip whole blocks of words, then whole words, before clearing bits within a word
+    for block_start in range(0, len(data), SELECT_BLOCK_BYTES):
+        block_end = block_start + SELECT_BLOCK_BYTES
+        count = popcount(int.from_bytes(data[block_start:block_end], "little"))
+        if rank >= count:
+            rank -= count
+            continue
+        for start in range(block_start, block_end, 8):
+            end = start + 8
+            word = int.from_bytes(data[start:end], "little")
+            count = popcount(word)
+            if rank < count:
+                for _ in range(rank):
+                    word &= word - 1
+                return start * 8 + (word & -word).bit_length() - 1
+            rank -= count
+    raise IndexError("bitset rank out of range")
+
+
+def parse_tags(text: str) -> List[str]:
+    """Split the value of a trivia command's tags option into tags."""
+    return [tag.strip() for tag in text.split(TAG_SEPARATOR) if tag.strip()]
+
+
+def filter_name(command_name: str, tags: Sequence[str], match_all: bool = True) -> str:
+    """Return a name identifying the questions of an exam filtered by tags, such as a bag's."""
+    keys = sorted({tag.casefold() for tag in tags})
+    return f"{command_name}[{'all' if match_all else 'any'}:{TAG_SEPARATOR.join(keys)}]"
+
+
+class TagIndex:
+    """Inverted index of an exam's question tags, mapping each tag to a bitset of questions.
+
+    Tags are matched case-insensitively, and are named as they first appear in the exam.
+    """
+
+    def __init__(self, question_count: int, bitsets: Dict[str, int]) -> None:
+        """Instantiate an index of question_count questions from the bitsets of their tags."""
+        self.question_count: int = question_count
+        self.all: int = (1 << question_count) - 1
+        self._names: Dict[str, str] = {}
+        self._bitsets: Dict[str, int] = {}
+        for name, bits in bitsets.items():
+            key = name.casefold()
+            self._names.setdefault(key, name)
+            self._bitsets[key] = self._bitsets.get(key, 0) | bits
+        # Tags tagging the most questions are suggested first
+        self.tags: List[str] = [
+            self._names[key]
+            for key in sorted(
+                self._bitsets, key=lambda key: -popcount(self._bitsets[key])
+            )
+        ]
+
+    @classmethod
+    def from_questions(cls, question_tags: Iterable[Sequence[str]]) -> "TagIndex":
+        """Index the tags of an exam's questions, given in the order of its questions."""
+        tagged: Dict[str, List[int]] = {}
+        question_count = 0
+        for index, tags in enumerate(question_tags):
+            question_count = index + 1
+            for tag in tags:
+                tagged.setdefault(tag, []).append(index)
+        bitsets = {}
+        for tag, indices in tagged.items():
+            data = bytearray((question_count + 7) // 8)
+            for index in indices:
+                data[index >> 3] |= 1 << (index & 7)
+            bitsets[tag] = int.from_bytes(data, "little")
+        return cls(question_count, bitsets)
+
+    def __len__(self) -> int:
+        """Return the number of distinct tags."""
+        return len(self._bitsets)
+
+    def name(self, tag: str) -> str:
+        """Return the name of a tag as it appears in the exam, or the tag itself if it doesn't."""
+        return self._names.get(tag.casefold(), tag)
+
+    def questions(self, tags: Sequence[str], match_all: bool = True) -> int:
+        """Return the bitset of questions tagged with every, or any, of the given tags.
+
+        Unknown tags tag no questions, and no tags at all match every question.
+        """
+        if not tags:
+            return self.all
+        bitsets = [self._bitsets.get(tag.casefold(), 0) for tag in tags]
+        bits = bitsets[0]
+        for other in bitsets[1:]:
+            bits = bits & other if match_all else bits | other
+        return bits
+
+    def complete(self, text: str, limit: int = 25) -> List[str]:
+        """Return up to limit tags containing some text, those starting with it first."""
+        text = text.casefold()
+        starting = []
+        containing = []
+        for name in self.tags:
+            key = name.casefold()
+            if key.startswith(text):
+                starting.append(name)
+            elif text in key:
+                containing.append(name)
+        return (starting + containing)[:limit]
+
+
+def complete_tags(index: TagIndex, text: str) -> List[str]:
+    """Return autocomplete choices for the value of a tags option being typed.
+
+    The tags already entered are kept, and the tag being typed is completed with the tags of the
+    index that contain it and weren't entered yet.
+    """
+    *entered, typed = text.split(TAG_SEPARATOR)
+    entered = [index.name(tag.strip()) for tag in entered if tag.strip()]
+    keys = {tag.casefold() for tag in entered}
+    choices = []
+    for tag in index.complete(typed.strip(), limit=len(index)):
+        value = f"{TAG_SEPARATOR} ".join([*entered, tag])
+        if tag.casefold() not in keys and len(value) <= MAX_OPTION_VALUE_LENGTH:
+            choices.append(value)
+            if len(choices) == MAX_AUTOCOMPLETE_CHOICES:
+                break
+    return choices
@@ -0,0 +1,121 @@
+"""Houses lightweight per-interaction tracing of the time spent in each phase of a response."""
+
+from contextvars import ContextVar
+from datetime import datetime
+from time import perf_counter, time
+from typing import Any, Dict, Optional
+
+_enabled: bool = False
+
+
+class Trace:
+    """Time spent in each phase of responding to one interaction.
+
+    The time spent in a phase that's entered more than once, such as sending each message of a
+    response, is summed up.
+    """
+
+    __slots__ = ("created_at", "started_at", "phases")
+
+    def __init__(self, created_at: datetime) -> None:
+        """Instantiate a new trace of an interaction created at the given time."""
+        self.created_at: datetime = created_at
+        self.started_at: float = perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def add(self, phase: str, duration: float) -> None:
+        """Add time spent in a phase, in seconds."""
+        self.phases[phase] = self.phases.get(phase, 0.0) + duration
+
+    def summary(self) -> Dict[str, Any]:
+        """Return log fields summarizing the trace, with times in milliseconds.
+
+        The total is measured from the interaction's creation by Discord, so it includes the
+        time taken for the interaction to reach the bot and wait for its turn on the event loop.
+        """
+        return {
+            "phases_ms": {
+                phase: round(duration * 1000, 3)
+                for phase, duration in self.phases.items()
+            },
+            "traced_ms": round((perf_counter() - self.started_at) * 1000, 3),
+            "total_ms": round((time() - self.created_at.timestamp()) * 1000, 3),
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+class Span:
+    """Context manager adding the time spent in its block to a phase of a trace."""
+
+    __slots__ = ("trace", "phase", "start")
+
+    def __init__(self, trace: Trace, phase: str) -> None:
+        """Instantiate a new span of a phase."""
+        self.trace: Trace = trace
+        self.phase: str = phase
+
+    def __enter__(self) -> None:
+        """Start timing the phase."""
+        self.start: float = perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Stop timing the phase."""
+        self.trace.add(self.phase, perf_counter() - self.start)
+
+
+class NoSpan:
+    """Context manager standing in for a span when no interaction is traced."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        """Do nothing."""
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Do nothing."""
+
+
+NO_SPAN = NoSpan()
+
+
+def enable_tracing(enabled: bool) -> None:
+    """Enable or disable tracing of interactions started from now on."""
+    global _enabled
+    _enabled = enabled
+
+
+def tracing_enabled() -> bool:
+    """Return whether interactions started from now on are traced."""
+    return _enabled
+
+
+def start_trace(created_at: datetime) -> None:
+    """Start tracing the current interaction, if tracing is enabled.
+
+    The trace is kept in a context variable, like the log context bound by structlog, so that
+    it follows the interaction through every coroutine it awaits and every event dispatched
+    on its behalf, such as on_slash_command_completion. It isn't bound to structlog's context,
+    so that it's neither rendered in every log record nor cleared by clear_contextvars().
+    """
+    if _enabled:
+        _current_trace.set(Trace(created_at))
+
+
+def end_trace() -> Optional[Trace]:
+    """Stop tracing the current interaction, and return its trace if it was traced."""
+    trace = _current_trace.get()
+    if trace is not None:
+        _current_trace.set(None)
+    return trace
+
+
+def span(phase: str) -> Any:
+    """Return a context manager timing a phase of the current interaction's trace.
+
+    When the current interaction isn't traced, a shared no-op context manager is returned, so
+    that spans cost little more than a context variable lookup.
+    """
+    trace = _current_trace.get()
+    return NO_SPAN if trace is None else Span(trace, phase)
@@ -1,25 +1,45 @@
 """Houses utility functions that don't fit elsewhere in the codebase."""
 
-from typing import List, Optional
+import hashlib
+import marshal
+import os
+from pathlib import Path
+from time import perf_counter
+from typing import List, Optional, Sequence
 from yaml import SafeLoader, load
 from aiohttp.client_exceptions import ClientOSError
-from disnake import (
-    ApplicationCommandInteraction,
-    Embed,
-    Forbidden,
-    HTTPException,
-    InteractionResponded,
-)
-from disnake.ui import View
+from disnake import ApplicationCommandInteraction, Embed, Forbidden, HTTPException
+from disnake.ui import Item, View
 from disnake.utils import MISSING
 import structlog
 from structlog.contextvars import (
     bind_contextvars,
     unbind_contextvars,
 )
+from bot.core.deadline import response_deadline
+from bot.core.log import Lazy
+from bot.core.metrics import registry
+from bot.core.trace import span
 
 logger = structlog.getLogger(name=__name__)
 
+# Discord's embed limitations
+EMBED_TITLE_LIMIT = 256
+EMBED_DESCRIPTION_LIMIT = 4096
+EMBED_FIELDS_LIMIT = 25
+EMBED_FIELD_NAME_LIMIT = 256
+EMBED_FIELD_VALUE_LIMIT = 1024
+EMBED_FOOTER_TEXT_LIMIT = 2048
+EMBED_AUTHOR_NAME_LIMIT = 256
+EMBED_TOTAL_LIMIT = 6000
+EMBEDS_PER_MESSAGE_LIMIT = 10
+
+embed_send_failures = registry.counter(
+    "trivia_embed_send_failures_total",
+    "Messages of embeds that failed to send, by exception type.",
+    ("exception",),
+)
+
 
 def get_empty_embed_field_index(embed: Embed) -> Optional[int]:
     """Return the index of a field in an embed that is empty."""
@@ -42,90 +62,191 @@ def remove_empty_embed_fields(embed: Embed) -> Embed:
     return embed
 
 
+def truncate_embed_text(text: str, limit: int) -> str:
+    """Truncate text that is too long for an embed, marking the cut with an ellipsis."""
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit - 3]}..."
+
+
+def split_embed_line(line: str, limit: int = EMBED_FIELD_VALUE_LIMIT) -> List[str]:
+    """Cut one line that is too long for a field value into pieces that each fit.
+
+    Every cut is marked with an ellipsis on both sides of it.
+    """
+    end = limit - 3
+    pieces = [f"{line[:end]}..."]
+    while len(line) - end > limit - 3:
+        start, end = end, end + limit - 6
+        pieces.append(f"...{line[start:end]}...")
+    pieces.append(f"...{line[end:]}")
+    return pieces
+
+
+def split_embed_field_value(
+    value: str, limit: int = EMBED_FIELD_VALUE_LIMIT
+) -> List[str]:
+    """Split a field value of any length into chunks that each fit within a field value.
+
+    Lines are packed greedily into chunks in a single pass, keeping a running length of the
+    current chunk. Lines too long for a chunk of their own are cut up with split_embed_line().
+    Chunks that would be empty are dropped, since Discord rejects empty field values.
+    """
+    if len(value) <= limit:
+        return [value] if value.strip() else []
+    chunks = []
+    lines: List[str] = []
+    length = -1  # The first line of a chunk isn't preceded by a newline
+    for line in value.split("\n"):
+        if len(line) > limit:
+            if lines:
+                chunks.append("\n".join(lines))
+            pieces = split_embed_line(line, limit)
+            chunks.extend(pieces[:-1])
+            lines, length = [], -1
+            line = pieces[-1]
+        elif length + 1 + len(line) > limit:
+            chunks.append("\n".join(lines))
+            lines, length = [], -1
+        lines.append(line)
+        length += 1 + len(line)
+    chunks.append("\n".join(lines))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
 def normalize_embed(embed: Embed) -> List[Embed]:
     """Normalize one large embed by breaking it up into smaller embeds.
 
-    Conform with Discord's embed limitations.
+    Conform with Discord's embed limitations. Field values that are too long are split into
+    several fields, and fields are then packed greedily into as few embeds as possible, using
+    running sums of their lengths. The first embed is a copy of the original; the embeds after
+    it only carry over the original's title, description and colour. Titles, descriptions, footers,
+    authors and field names that are too long are truncated, and the description is trimmed
+    further if the first embed wouldn't fit otherwise, before any field is added to it.
     """
-    embeds = []
-    # Normalize fields within the embed to ensure the embed abides by field limitations
-    for index, field in enumerate(embed.fields):
-        if len(field.value) > 1024:
-            # Handle multi-line value elegantly
-            lines = field.value.splitlines()
-            if len(lines) > 1:  # Multiple lines present
-                # Keep track of what lines in the field's value we're removing
-                removed_lines = []
-                for line_index in reversed(range(len(lines))):
-                    modified_field_value = "\n".join(lines[:line_index])
-                    if len(modified_field_value) <= 1024:
-                        removed_lines.insert(0, lines[line_index])
-                        embed.set_field_at(
-                            index=index,
-                            name=field.name,
-                            value=modified_field_value,
-                            inline=field.inline,
-                        )
-                        embed.insert_field_at(
-                            index=index + 1,
-                            name=field.name,
-                            value="\n".join(removed_lines),
-                            inline=field.inline,
-                        )
-                        break
-            else:
-                # Handle single-line value elegantly
-                embed.set_field_at(
-                    index=index,
-                    name=field.name,
-                    value=f"{field.value[:1021]}...",
-                    inline=field.inline,
-                )
-                embed.insert_field_at(
-                    index=index + 1,
-                    name=field.name,
-                    value=f"...{field.value[1021:]}",
-                    inline=field.inline,
+    if embed_fits(embed):
+        return [embed]
+    title = truncate_embed_text(embed.title, EMBED_TITLE_LIMIT)
+    footer = truncate_embed_text(embed.footer.text, EMBED_FOOTER_TEXT_LIMIT)
+    author = truncate_embed_text(embed.author.name, EMBED_AUTHOR_NAME_LIMIT)
+    description = truncate_embed_text(
+        embed.description,
+        min(
+            EMBED_DESCRIPTION_LIMIT,
+            EMBED_TOTAL_LIMIT - len(title) - len(footer) - len(author),
+        ),
+    )
+    original_fields = embed.fields
+    base = {**embed.to_dict(), "fields": []}
+    if footer:
+        base["footer"] = {**base["footer"], "text": footer}
+    if author:
+        base["author"] = {**base["author"], "name": author}
+    current = Embed.from_dict(base)
+    current.title = title
+    current.description = description
+    embeds = [current]
+    length = len(current)
+    fields = 0
+    for field in original_fields:
+        name = truncate_embed_text(field.name, EMBED_FIELD_NAME_LIMIT)
+        for value in split_embed_field_value(field.value):
+            size = len(name) + len(value)
+            if fields == EMBED_FIELDS_LIMIT or length + size > EMBED_TOTAL_LIMIT:
+                current = Embed(
+                    title=title, description=description, colour=embed.colour
                 )
-    # Split up single large embed into multiple small embeds, if necessary
-    embeds.append(embed)
-    for e in embeds:
-        if len(e) > 6000:
-            # Copy the original embed so that we're not manipulating the original, which Python
-            # doesn't like.
-            new_embed = Embed(title=e.title, description=e.description, colour=e.color)
-            # Iterate through the original embed (not the copy) from bottom to top.
-            for index, field in reversed(list(enumerate(e.fields))):
-                # "Migrate" the field from the original embed to the new embed. Then, delete the
-                # field from the original embed copy.
-                new_embed.insert_field_at(
-                    index=0, name=field.name, value=field.value, inline=field.inline
-                )
-                e.remove_field(index)
-                # Check to see if the copy (which has the field removed) is within Discord's embed
-                # limitations. If so, add the new embed to our list of embeds and stop the loop
-                # through the original embed's fields.
-                if len(e) <= 6000:
-                    embeds.append(new_embed)
-                    break
+                embeds.append(current)
+                length = len(title) + len(description)
+                fields = 0
+            current.add_field(name=name, value=value, inline=field.inline)
+            length += size
+            fields += 1
     return embeds
 
 
+def embed_fits(embed: Embed) -> bool:
+    """Return whether an embed is already within Discord's embed limitations.
+
+    An embed that fits needs no sanitization: it has no empty fields and needs no
+    normalization.
+    """
+    if len(embed.title) > EMBED_TITLE_LIMIT:
+        return False
+    if len(embed.description) > EMBED_DESCRIPTION_LIMIT:
+        return False
+    if len(embed.footer.text) > EMBED_FOOTER_TEXT_LIMIT:
+        return False
+    if len(embed.author.name) > EMBED_AUTHOR_NAME_LIMIT:
+        return False
+    if len(embed.fields) > EMBED_FIELDS_LIMIT:
+        return False
+    for field in embed.fields:
+        if field.value is None or not field.value.strip():
+            return False
+        if len(field.name) > EMBED_FIELD_NAME_LIMIT:
+            return False
+        if len(field.value) > EMBED_FIELD_VALUE_LIMIT:
+            return False
+    return len(embed) <= EMBED_TOTAL_LIMIT
+
+
 def sanitize_embed(embed: Embed) -> List[Embed]:
     """Validate embed to make sure it's valid and normalized prior to sending."""
     embed = remove_empty_embed_fields(embed)
     return normalize_embed(embed)
 
 
+def embed_dicts(embeds: List[Embed]) -> List[dict]:
+    """Return the dictionary representations of embeds, for logging."""
+    return [e.to_dict() for e in embeds]
+
+
+def pack_embeds(embeds: List[Embed]) -> List[List[Embed]]:
+    """Pack embeds greedily into as few messages as possible.
+
+    Each message holds up to 10 embeds, whose combined length is within the same 6000 character
+    limit that applies to a single embed.
+    """
+    messages: List[List[Embed]] = []
+    length = 0
+    for e in embeds:
+        size = len(e)
+        if (
+            not messages
+            or len(messages[-1]) == EMBEDS_PER_MESSAGE_LIMIT
+            or length + size > EMBED_TOTAL_LIMIT
+        ):
+            messages.append([])
+            length = 0
+        messages[-1].append(e)
+        length += size
+    return messages
+
+
 async def send_embed(
     inter: ApplicationCommandInteraction,
     embed: Embed,
     ephemeral: bool = False,
     view: View = MISSING,
-) -> None:
-    """Send one or more embeds in response to a slash command."""
-    embeds = sanitize_embed(embed)
-    for e in embeds:
+    sanitize: bool = True,
+    components: Sequence[Item] = MISSING,
+) -> bool:
+    """Send one or more embeds in response to a slash command.
+
+    Embeds are sanitized prior to sending unless sanitize is False, which callers should only
+    pass for embeds already known to fit Discord's embed limitations. Sanitized embeds are packed
+    into as few messages as possible, and the view or components are only attached to the first
+    message. The first message is the interaction's original response, unless the interaction
+    has already been responded to, e.g. deferred, in which case every message is a followup.
+
+    Returns:
+        Whether every embed was sent.
+    """
+    with span("sanitize"):
+        messages = pack_embeds(sanitize_embed(embed) if sanitize else [embed])
+    sent = True
+    for message in messages:
         bind_contextvars(
             guild_id=inter.guild.id,
             guild_name=inter.guild.name,
@@ -133,39 +254,131 @@ async def send_embed(
             channel_name=inter.channel.name,
         )
         try:
-            await inter.response.send_message(embed=e, ephemeral=ephemeral, view=view)
-            logger.info("Sent embed", embed=e.to_dict())
-        except InteractionResponded:
-            await inter.followup.send(embed=e, ephemeral=ephemeral, view=view)
-            logger.info("Sent embed", embed=e.to_dict())
-        except Forbidden:
+            if inter.response.is_done():
+                with span("send"):
+                    await inter.followup.send(
+                        embeds=message,
+                        ephemeral=ephemeral,
+                        view=view,
+                        components=components,
+                    )
+            else:
+                start = perf_counter()
+                with span("send"):
+                    await inter.response.send_message(
+                        embeds=message,
+                        ephemeral=ephemeral,
+                        view=view,
+                        components=components,
+                    )
+                response_deadline.observe_send(perf_counter() - start)
+            with span("log"):
+                logger.info("Sent embeds", embeds=Lazy(embed_dicts, message))
+        except Forbidden as exc:
+            sent = False
+            embed_send_failures.inc(type(exc).__name__)
             logger.warning("Failed to send message due to permissions error")
         except HTTPException as exc:
+            sent = False
+            embed_send_failures.inc(type(exc).__name__)
             if exc.code == 50035:
                 logger.warning(
                     "Invalid form body",
-                    embed=e.to_dict(),
+                    embeds=Lazy(embed_dicts, message),
                 )
-        except ClientOSError:
+        except ClientOSError as exc:
+            sent = False
+            embed_send_failures.inc(type(exc).__name__)
             logger.warning(
                 "Failed to send message due to client error",
             )
         finally:
             unbind_contextvars("guild_id", "guild_name", "channel_id", "channel_name")
+        view, components = MISSING, MISSING
+    return sent
+
+
+QUESTION_POOL_ARTIFACT_MAGIC = b"DITQPOOL"
+
+
+def question_pool_artifact_filepath(filepath: str) -> Path:
+    """Return the filepath of the compiled artifact for a question pool YAML file."""
+    return Path(filepath).with_suffix(".marshal")
+
+
+def load_question_pool_artifact(
+    artifact_filepath: Path, checksum: bytes
+) -> Optional[List[dict]]:
+    """Load a compiled question pool artifact if it was compiled from YAML with a checksum.
+
+    Returns None if the artifact is missing, corrupt, compiled by an incompatible version of
+    Python, or stale (compiled from different YAML contents).
+    """
+    header = QUESTION_POOL_ARTIFACT_MAGIC + bytes([marshal.version]) + checksum
+    try:
+        with open(artifact_filepath, "rb") as artifact_file:
+            if artifact_file.read(len(header)) != header:
+                return None
+            return marshal.loads(artifact_file.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+
+def write_question_pool_artifact(
+    artifact_filepath: Path, checksum: bytes, pool: List[dict]
+) -> None:
+    """Atomically write a compiled question pool artifact keyed by its YAML's checksum."""
+    header = QUESTION_POOL_ARTIFACT_MAGIC + bytes([marshal.version]) + checksum
+    temporary_filepath = Path(f"{artifact_filepath}.{os.getpid()}.tmp")
+    with open(temporary_filepath, "wb") as artifact_file:
+        artifact_file.write(header)
+        artifact_file.write(marshal.dumps(pool))
+    os.replace(temporary_filepath, artifact_filepath)
+
+
+def compile_question_pool(
+    filepath: str, artifact_filepath: Optional[Path] = None
+) -> Path:
+    """Compile a question pool YAML file into a binary artifact and return its filepath."""
+    if artifact_filepath is None:
+        artifact_filepath = question_pool_artifact_filepath(filepath)
+    with open(filepath, "rb") as pool_file:
+        contents = pool_file.read()
+    write_question_pool_artifact(
+        artifact_filepath, hashlib.sha256(contents).digest(), load(contents, SafeLoader)
+    )
+    return artifact_filepath
 
 
 def question_pool(filepath: str) -> List[dict]:
-    """Open question pool YAML file and return contents."""
-    with open(filepath) as pool_file:
-        return load(pool_file, SafeLoader)
+    """Open question pool YAML file and return contents.
+
+    Parsing YAML is slow, so the contents are loaded from the question pool's compiled artifact
+    when it was compiled from the current contents of the YAML file. Otherwise, the YAML file is
+    parsed and the artifact is (re)compiled on a best-effort basis for the next load.
+    """
+    with open(filepath, "rb") as pool_file:
+        contents = pool_file.read()
+    checksum = hashlib.sha256(contents).digest()
+    artifact_filepath = question_pool_artifact_filepath(filepath)
+    pool = load_question_pool_artifact(artifact_filepath, checksum)
+    if pool is not None:
+        return pool
+    pool = load(contents, SafeLoader)
+    try:
+        write_question_pool_artifact(artifact_filepath, checksum, pool)
+    except (OSError, ValueError) as exc:
+        logger.debug(
+            "Failed to compile question pool artifact",
+            artifact_filepath=str(artifact_filepath),
+            error=str(exc),
+        )
+    return pool
 
 
-def exam_from_pool(exam_name: str) -> Optional[List[dict]]:
-    """Get data about exam from question pool."""
-    # TODO: Import here so unit tests work properly. This is a hack, refactor later.
-    from bot.core.config import settings
+def exam_from_pool(exam_name: str) -> Optional[dict]:
+    """Get data about exam from the resident question pool."""
+    # Import here to avoid a circular import, as bot.core.pool parses files with question_pool().
+    from bot.core.pool import current_pool
 
-    pool = question_pool(settings.QUESTION_POOL_FILEPATH)
-    for exam in pool:
-        if exam.get("command_name") == exam_name:
-            return exam
+    return current_pool().exam(exam_name)
@@ -1,7 +1,13 @@
 """Trivia command user feedback embeds."""
 
-from typing import List, Optional
+from collections import OrderedDict
+from math import ceil
+from time import time
+from typing import List, NamedTuple, Optional, Sequence, Tuple
 from disnake import Embed
+from disnake.utils import utcnow
+from bot.core.util import embed_fits
+from bot.models.question import Question
 from .general import (
     command_ok,
     command_wrong,
@@ -9,8 +15,14 @@ from .general import (
 
 __all__ = [
     "trivia_ok_multiple_choice_question",
+    "trivia_ok_question",
     "trivia_ok_correct",
     "trivia_ok_incorrect",
+    "trivia_wrong_exam_unavailable",
+    "trivia_wrong_no_tagged_questions",
+    "trivia_wrong_question_unavailable",
+    "trivia_wrong_question_expired",
+    "trivia_wrong_rate_limited",
 ]
 
 
@@ -37,6 +49,82 @@ def trivia_ok_multiple_choice_question(
     return embed
 
 
+class QuestionTemplate(NamedTuple):
+    """Pre-rendered multiple choice question embed, minus its timestamp and choice order."""
+
+    payload: dict
+    question_field: dict
+    choice_values: Tuple[str, ...]
+    fits: bool
+
+
+QUESTION_TEMPLATE_CACHE_SIZE = 4096
+_question_templates: "OrderedDict[tuple, QuestionTemplate]" = OrderedDict()
+
+
+def question_template(exam_name: str, question: Question) -> QuestionTemplate:
+    """Return the pre-rendered embed of a question, rendering and caching it if necessary.
+
+    Templates are keyed by the question's contents, so a question changed by a question pool
+    reload gets a new template. The least recently used templates are evicted once the cache
+    holds QUESTION_TEMPLATE_CACHE_SIZE templates.
+    """
+    key = (exam_name, question)
+    template = _question_templates.get(key)
+    if template is not None:
+        _question_templates.move_to_end(key)
+        return template
+    embed = trivia_ok_multiple_choice_question(
+        exam_name, question.prompt, [c.text for c in question.choices]
+    )
+    payload = embed.to_dict()
+    payload.pop("timestamp", None)
+    fields = payload.pop("fields")
+    template = QuestionTemplate(
+        payload=payload,
+        question_field=fields[0],
+        choice_values=tuple(field["value"] for field in fields[1:]),
+        fits=embed_fits(embed),
+    )
+    _question_templates[key] = template
+    if len(_question_templates) > QUESTION_TEMPLATE_CACHE_SIZE:
+        _question_templates.popitem(last=False)
+    return template
+
+
+def trivia_ok_question(
+    exam_name: str, question: Question, order: Sequence[int]
+) -> Tuple[Embed, bool]:
+    """Embed for a multiple choice question, built from its pre-rendered template.
+
+    Equivalent to trivia_ok_multiple_choice_question() with the choices in the given order, but
+    only the choice order and timestamp are filled in per call.
+
+    Args:
+        exam_name (str): Name of exam to insert into embed title.
+        question (Question): Question asked to users.
+        order (Sequence[int]): Indices of the question's choices in the order they are
+            displayed.
+
+    Returns:
+        The embed, and whether it is known to fit Discord's embed limitations (in which case it
+        doesn't need to be sanitized).
+    """
+    template = question_template(exam_name, question)
+    fields = [template.question_field]
+    for number, index in enumerate(order, start=1):
+        fields.append(
+            {
+                "name": f"Choice #{number}",
+                "value": template.choice_values[index],
+                "inline": False,
+            }
+        )
+    embed = Embed.from_dict(dict(template.payload, fields=fields))
+    embed.timestamp = utcnow()
+    return embed, template.fits
+
+
 @command_ok(title="__Trivia Answer Correct__")
 def trivia_ok_correct(embed: Embed, explanation: Optional[str] = None) -> Embed:
     """Embed for when answer to trivia question is correct."""
@@ -72,3 +160,64 @@ def trivia_ok_incorrect(
     if explanation is not None:
         embed.add_field(name="Explanation", value=explanation, inline=False)
     return embed
+
+
+@command_wrong()
+def trivia_wrong_exam_unavailable(embed: Embed, command_name: str) -> Embed:
+    """Embed for when a trivia command's exam is no longer in the question pool."""
+    embed.add_field(
+        name="Exam Unavailable",
+        value=f"The `/{command_name}` exam is no longer available. Please try another exam.",
+        inline=False,
+    )
+    return embed
+
+
+@command_wrong()
+def trivia_wrong_no_tagged_questions(
+    embed: Embed, command_name: str, tags: List[str], match_all: bool = True
+) -> Embed:
+    """Embed for when none of an exam's questions have the tags a trivia command asked for."""
+    wanted = " and " if match_all else " or "
+    embed.add_field(
+        name="No Matching Questions",
+        value=(
+            f"No `/{command_name}` question is tagged "
+            f"{wanted.join(f'`{tag}`' for tag in tags)}. Please try other tags."
+        ),
+        inline=False,
+    )
+    return embed
+
+
+@command_wrong()
+def trivia_wrong_question_unavailable(embed: Embed) -> Embed:
+    """Embed for when an answered question is no longer in the question pool."""
+    embed.add_field(
+        name="Question Unavailable",
+        value="This question is no longer available. Please ask for a new question.",
+        inline=False,
+    )
+    return embed
+
+
+@command_wrong()
+def trivia_wrong_question_expired(embed: Embed) -> Embed:
+    """Embed for when an answered question has timed out."""
+    embed.add_field(
+        name="Question Expired",
+        value="This question is no longer accepting answers. Please ask for a new question.",
+        inline=False,
+    )
+    return embed
+
+
+@command_wrong()
+def trivia_wrong_rate_limited(embed: Embed, retry_after: float) -> Embed:
+    """Embed for when trivia is being used too quickly."""
+    embed.add_field(
+        name="Slow Down",
+        value=f"Trivia is being used too quickly. Try again <t:{ceil(time() + retry_after)}:R>.",
+        inline=False,
+    )
+    return embed
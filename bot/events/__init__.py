@@ -1,5 +1,6 @@
 """Contains Discord event handlers."""
 
+from .button_click import *  # noqa: F401, F403
 from .error import *  # noqa: F401, F403
 from .guild_join import *  # noqa: F401, F403
 from .guild_remove import *  # noqa: F401, F403
@@ -0,0 +1,125 @@
+"""Contains events relevant to clicks of message buttons."""
+
+from datetime import timedelta
+import structlog
+from disnake import MessageInteraction
+from disnake.utils import utcnow
+from bot.client import discord_bot
+from bot.core.config import settings
+from bot.core.metrics import registry
+from bot.core.pool import current_pool
+from bot.core.ratelimit import RateLimiter
+from bot.core.trace import end_trace, span, start_trace
+from bot.embeds.trivia import (
+    trivia_ok_correct,
+    trivia_ok_incorrect,
+    trivia_wrong_question_expired,
+    trivia_wrong_question_unavailable,
+    trivia_wrong_rate_limited,
+)
+from bot.views import AnswerCustomId
+
+
+logger = structlog.get_logger(name=__name__)
+
+__all__ = ["on_button_click"]
+
+answer_limiter = RateLimiter(
+    period=settings.RATE_LIMIT_PERIOD,
+    max_keys=settings.RATE_LIMIT_MAX_KEYS,
+    user=settings.RATE_LIMIT_USER,
+    channel=settings.RATE_LIMIT_CHANNEL,
+    guild=settings.RATE_LIMIT_GUILD,
+)
+
+answers_total = registry.counter(
+    "trivia_answers_total",
+    "Answer choices selected, by exam command and outcome.",
+    ("command_name", "outcome"),
+)
+
+
+@discord_bot.listen("on_button_click")
+async def on_button_click(inter: MessageInteraction) -> None:
+    """Inform user whether their answer choice for a trivia question is correct or incorrect."""
+    answer = AnswerCustomId.decode(inter.data.custom_id)
+    if answer is None:
+        return
+    start_trace(inter.created_at)
+    try:
+        await reply_to_answer(inter, answer)
+    finally:
+        trace = end_trace()
+        if trace is not None:
+            logger.info(
+                "Answer traced",
+                command_name=answer.command_name,
+                guild_id=inter.guild_id,
+                **trace.summary(),
+            )
+
+
+async def reply_to_answer(inter: MessageInteraction, answer: AnswerCustomId) -> None:
+    """Reply to an answer choice, unless it's rate limited or its question is gone."""
+    with span("rate_limit"):
+        retry_after = answer_limiter.hit(
+            user=inter.author.id, channel=inter.channel_id, guild=inter.guild_id
+        )
+    if retry_after:
+        answers_total.inc(answer.command_name, "rate_limited")
+        with span("send"):
+            await inter.response.send_message(
+                embed=trivia_wrong_rate_limited(retry_after), ephemeral=True
+            )
+        return
+    # Enforce the question timeout from the message itself, so that it also applies to
+    # questions asked before a restart.
+    if utcnow() - inter.message.created_at > timedelta(
+        seconds=settings.QUESTION_TIMEOUT
+    ):
+        answers_total.inc(answer.command_name, "expired")
+        with span("send"):
+            await inter.response.send_message(
+                embed=trivia_wrong_question_expired(), ephemeral=True
+            )
+        return
+    with span("pool_lookup"):
+        question = current_pool().question(
+            answer.command_name, answer.question_index, answer.question_key
+        )
+    if question is None:
+        answers_total.inc(answer.command_name, "unavailable")
+        logger.info(
+            "Answer selected for unavailable question",
+            command_name=answer.command_name,
+            question_key=answer.question_key,
+            guild_id=inter.guild_id,
+        )
+        with span("send"):
+            await inter.response.send_message(
+                embed=trivia_wrong_question_unavailable(), ephemeral=True
+            )
+        return
+    correct = answer.choice_id == question.correct_choice
+    answers_total.inc(answer.command_name, "correct" if correct else "incorrect")
+    with span("log"):
+        logger.info(
+            "Answer selected",
+            command_name=answer.command_name,
+            question_key=answer.question_key,
+            choice_id=answer.choice_id,
+            choice_text=inter.component.label,
+            choice_correct=correct,
+            guild_id=inter.guild_id,
+            guild_name=inter.guild.name if inter.guild else None,
+        )
+    with span("embed_build"):
+        if correct:
+            embed = trivia_ok_correct(explanation=question.explanation)
+        else:
+            embed = trivia_ok_incorrect(
+                correct_answer=question.correct_choice_text,
+                explanation=question.explanation,
+            )
+    with span("send"):
+        await inter.response.send_message(embed=embed, ephemeral=True)
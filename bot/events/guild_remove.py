@@ -3,6 +3,7 @@
 import structlog
 from disnake import Guild
 from bot.client import discord_bot
+from bot.core.cluster import report_guild_count
 
 
 logger = structlog.get_logger(name=__name__)
@@ -14,3 +15,4 @@ __all__ = ["on_guild_remove"]
 async def on_guild_remove(guild: Guild) -> None:
     """Logs when bot is removed from a guild."""
     logger.info("Removed from guild", guild_id=guild.id, guild_name=guild.name)
+    report_guild_count(len(discord_bot.guilds))
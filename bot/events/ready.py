@@ -2,7 +2,17 @@
 
 import structlog
 from bot.client import discord_bot
-from bot.tasks import log_guild_quantity
+from bot.core.config import settings
+from bot.tasks import (
+    expire_questions,
+    log_guild_quantity,
+    log_memory_growth,
+    log_memory_usage,
+    monitor_loop_lag,
+    reload_question_pool,
+    save_shuffle_bags,
+    sweep_rate_limits,
+)
 
 
 logger = structlog.get_logger(name=__name__)
@@ -14,7 +24,17 @@ __all__ = ["on_ready"]
 async def on_ready():
     """Triggers when the bot is fully connected and ready to do work."""
     logger.info("Logged in", bot_name=discord_bot.user.name, bot_id=discord_bot.user.id)
-    tasks = [log_guild_quantity]
+    tasks = [
+        log_guild_quantity,
+        monitor_loop_lag,
+        reload_question_pool,
+        expire_questions,
+        sweep_rate_limits,
+    ]
+    if settings.MEMORY_PROFILING:
+        tasks.extend((log_memory_usage, log_memory_growth))
+    if settings.SHUFFLE_BAGS_FILEPATH:
+        tasks.append(save_shuffle_bags)
     for task in tasks:
         if not task.is_running():
             task.start()
@@ -3,6 +3,7 @@
 import structlog
 from disnake import ApplicationCommandInteraction
 from bot.client import discord_bot
+from bot.core.trace import end_trace
 
 
 logger = structlog.get_logger(name=__name__)
@@ -12,7 +13,11 @@ __all__ = ["on_slash_command_completion"]
 
 @discord_bot.event
 async def on_slash_command_completion(inter: ApplicationCommandInteraction) -> None:
-    """Log that command was completed successfully."""
+    """Log that command was completed successfully.
+
+    If the command was traced, its trace is summarized in the same record.
+    """
+    trace = end_trace()
     logger.info(
         "Command completed",
         command_name=inter.data.name,
@@ -20,4 +25,5 @@ async def on_slash_command_completion(inter: ApplicationCommandInteraction) -> N
         message_author_name=inter.author.name,
         guild_id=inter.guild.id,
         guild_name=inter.guild.name,
+        **(trace.summary() if trace is not None else {}),
     )
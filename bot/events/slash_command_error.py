@@ -8,6 +8,7 @@ from structlog.contextvars import clear_contextvars, bind_contextvars
 from disnake import ApplicationCommandInteraction
 from disnake.ext import commands
 from bot.client import discord_bot
+from bot.core.deadline import defer_if_late
 from bot.core.util import send_embed
 from bot.core.config import settings
 from bot.embeds import command_failed
@@ -40,26 +41,23 @@ async def on_slash_command_error(
         channel_name=inter.channel.name,
         command=inter.data.name,
     )
+    # Formatting and normalizing the traceback takes a while, so defer first if need be.
+    await defer_if_late(inter)
     unique_error_id = str(uuid4())
+    # Format the traceback once; it's logged, printed and sent in an embed.
     formatted_traceback = "".join(
         traceback.format_exception(type(error), error, error.__traceback__, 4)
-    ).encode("utf-8")
-    traceback_checksum = hashlib.sha1(formatted_traceback).hexdigest()
+    )
+    traceback_checksum = hashlib.sha1(formatted_traceback.encode("utf-8")).hexdigest()
     logger.warning(
         "Command failed",
         error=error,
-        traceback="".join(
-            traceback.format_exception(type(error), error, error.__traceback__, 4)
-        ),
+        traceback=formatted_traceback,
         checksum=traceback_checksum,
         error_id=unique_error_id,
     )
     if settings.TEST_GUILD is not None:
-        print(
-            "".join(
-                traceback.format_exception(type(error), error, error.__traceback__, 4)
-            )
-        )
+        print(formatted_traceback)
     await send_embed(
         inter,
         command_failed(
@@ -7,27 +7,16 @@ from bot.core.config import settings
 # Initialize logging
 
 import logging
-import sys
 import structlog
-
-from structlog.contextvars import merge_contextvars
-from structlog.stdlib import filter_by_level
-
-if settings.DEBUG:
-    logging.basicConfig(stream=sys.stdout, level=logging.DEBUG, format="%(message)s")
-else:
-    logging.basicConfig(stream=sys.stdout, level=logging.INFO, format="%(message)s")
-
-structlog.configure(
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    context_class=structlog.threadlocal.wrap_dict(dict),
-    processors=[
-        filter_by_level,
-        merge_contextvars,
-        structlog.stdlib.add_log_level,
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.JSONRenderer(),
-    ],
+from bot.core.log import setup_logging
+
+log_handler = setup_logging(
+    level=logging.DEBUG if settings.DEBUG else logging.INFO,
+    filepath=settings.LOG_FILEPATH,
+    queue_size=settings.LOG_QUEUE_SIZE,
+    batch_size=settings.LOG_BATCH_SIZE,
+    overflow=settings.LOG_OVERFLOW,
+    sample_rates=settings.LOG_SAMPLE_RATES,
 )
 
 logger = structlog.getLogger(name=__name__)
@@ -43,26 +32,44 @@ from bot.client import discord_bot  # noqa: E402
 from bot.commands import *  # noqa: E402, F401, F403
 from bot.events import *  # noqa: E402, F401, F403
 
+# Defer interaction responses expected to arrive within this margin of Discord's deadline
+
+from bot.core.deadline import response_deadline  # noqa: E402
+
+response_deadline.margin = settings.RESPONSE_DEFER_MARGIN
+
 # Create dynamic slash commands based on question pool
 
-from disnake.ext import commands  # noqa: E402
-from bot.commands.trivia import trivia  # noqa: E402
-from bot.core.util import question_pool  # noqa: E402
+from bot.commands.trivia import register_exam_command  # noqa: E402
+from bot.core.pool import load_pool  # noqa: E402
 
-pool = question_pool(settings.QUESTION_POOL_FILEPATH)
+pool = load_pool(
+    settings.QUESTION_POOL_FILEPATH,
+    lazy=settings.QUESTION_POOL_LAZY,
+    max_loaded_questions=settings.QUESTION_POOL_MAX_LOADED_QUESTIONS,
+    mapped=settings.QUESTION_POOL_MAPPED,
+)
 
 for exam in pool:
-    command = commands.InvokableSlashCommand(
-        trivia,
-        name=exam.get("command_name"),
-        description=exam.get("command_description"),
-    )
-    discord_bot.add_slash_command(command)
-    logger.info(
-        "Registered slash command",
-        command_name=exam.get("command_name"),
-        command_description=exam.get("command_description"),
-    )
+    register_exam_command(exam)
+
+# Resume the rounds of the shuffle bags questions are drawn from
+
+from bot.commands.trivia import shuffle_bags  # noqa: E402
+from bot.core.cluster import worker_filepath  # noqa: E402
+
+if settings.SHUFFLE_BAGS_FILEPATH:
+    shuffle_bags_filepath = worker_filepath(settings.SHUFFLE_BAGS_FILEPATH)
+    try:
+        logger.info(
+            "Shuffle bags loaded",
+            bags=shuffle_bags.load(shuffle_bags_filepath),
+            kept_bags=len(shuffle_bags),
+        )
+    except FileNotFoundError:
+        logger.info("No shuffle bags saved yet", filepath=str(shuffle_bags_filepath))
+    except (OSError, ValueError) as exc:
+        logger.warning("Failed to load shuffle bags", error=str(exc))
 
 logger.info("Total text commands registered", total_commands=len(discord_bot.commands))
 for command in discord_bot.commands:
@@ -74,8 +81,55 @@ logger.info(
 for command in discord_bot.slash_commands:
     logger.info("Registered slash command", command_name=command.name)
 
+# Trace interactions, toggled at runtime by sending the process SIGUSR1
+
+import signal  # noqa: E402
+from bot.core.trace import enable_tracing, tracing_enabled  # noqa: E402
+
+
+def toggle_tracing() -> None:
+    """Enable tracing if it's disabled, and disable it if it's enabled."""
+    enable_tracing(not tracing_enabled())
+    logger.info("Tracing toggled", tracing_enabled=tracing_enabled())
+
+
+enable_tracing(settings.TRACING)
+try:
+    discord_bot.loop.add_signal_handler(signal.SIGUSR1, toggle_tracing)
+except (AttributeError, NotImplementedError):  # Signals aren't available on Windows
+    logger.info("Tracing can't be toggled at runtime on this platform")
+
+# Serve metrics and health probes on the bot's event loop
+
+from bot.core.metrics import registry, start_metrics_server  # noqa: E402
+
+registry.counter(
+    "trivia_log_records_total",
+    "Log records handed to the log writer, by outcome.",
+    ("outcome",),
+    callback=lambda: {
+        ("written",): log_handler.written,
+        ("dropped",): log_handler.dropped,
+    },
+)
+if settings.METRICS_PORT:
+    discord_bot.loop.create_task(
+        start_metrics_server(
+            settings.METRICS_HOST,
+            settings.METRICS_PORT,
+            ready=lambda: discord_bot.is_ready() and not discord_bot.is_closed(),
+        )
+    )
+
 # Connect to Discord
 
 logger.info("Connecting to Discord")
 discord_bot.run(settings.DISCORD_TOKEN)
 logger.info("Connected to Discord!")
+
+if settings.SHUFFLE_BAGS_FILEPATH:
+    try:
+        shuffle_bags.save(shuffle_bags_filepath)
+        logger.info("Shuffle bags saved", bags=len(shuffle_bags))
+    except OSError as exc:
+        logger.warning("Failed to save shuffle bags", error=str(exc))
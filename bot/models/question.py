@@ -0,0 +1,51 @@
+"""Contains immutable models of questions within the question pool."""
+
+import hashlib
+from typing import NamedTuple, Optional, Tuple
+
+
+class Choice(NamedTuple):
+    """An answer choice for a question."""
+
+    id: int
+    text: str
+
+
+class Question(NamedTuple):
+    """A multiple choice question.
+
+    Questions are immutable so that the resident question pool can be shared between concurrent
+    trivia commands without any of them copying or modifying it.
+    """
+
+    prompt: str
+    choices: Tuple[Choice, ...]
+    correct_choice: int
+    explanation: Optional[str] = None
+    tags: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_dict(cls, question: dict) -> "Question":
+        """Build a question from its question pool data structure."""
+        return cls(
+            prompt=question.get("prompt"),
+            choices=tuple(
+                Choice(c.get("id"), c.get("text")) for c in question.get("choices")
+            ),
+            correct_choice=question.get("correct_choice"),
+            explanation=question.get("explanation"),
+            tags=tuple(question.get("tags") or ()),
+        )
+
+    @property
+    def key(self) -> str:
+        """Return a short, stable identifier for the question derived from its prompt."""
+        return hashlib.sha1(self.prompt.encode("utf-8")).hexdigest()[:8]
+
+    @property
+    def correct_choice_text(self) -> Optional[str]:
+        """Return the text of the correct answer choice."""
+        for choice in self.choices:
+            if choice.id == self.correct_choice:
+                return choice.text
+        return None
@@ -1,14 +1,190 @@
 """Contains scheduled tasks executed by bot."""
 
+import asyncio
+import tracemalloc
 import structlog
 from disnake.ext import tasks
 from bot.client import discord_bot
+from bot.commands.trivia import (
+    command_limiter,
+    live_questions,
+    shuffle_bags,
+    sync_exam_commands,
+)
+from bot.events.button_click import answer_limiter
+from bot.core.cluster import report_guild_count, worker_filepath
+from bot.core.config import settings
+from bot.core.deadline import response_deadline
+from bot.core.lag import LoopLagMonitor
+from bot.core.memory import MemoryProfiler, rss_bytes
+from bot.core.metrics import registry
+from bot.core.pool import current_pool, reload_pool
+from bot.core.sampler import write_shuffle_bags
 
 logger = structlog.getLogger(name=__name__)
 
+loop_lag_monitor = LoopLagMonitor(
+    interval=settings.LOOP_LAG_INTERVAL, threshold=settings.LOOP_LAG_THRESHOLD
+)
+event_loop_lag = registry.histogram(
+    "trivia_event_loop_lag_seconds",
+    "Time ready callbacks waited for the event loop.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+registry.gauge(
+    "trivia_event_loop_lag_quantile_seconds",
+    "Quantiles of the event loop lag over the most recent measurements.",
+    ("quantile",),
+    callback=lambda: loop_lag_monitor.quantiles((0.5, 0.9, 0.99, 1)),
+)
+registry.counter(
+    "trivia_event_loop_blocked_total",
+    "Times the event loop was found blocked by its watchdog.",
+    callback=lambda: loop_lag_monitor.blocked,
+)
+
+memory_profiler = MemoryProfiler(
+    frames=settings.MEMORY_TRACE_FRAMES, top=settings.MEMORY_TOP_SITES
+)
+
 
 @tasks.loop(hours=1)
 async def log_guild_quantity() -> None:
     """Log the quantity of guilds bot is joined to."""
     await discord_bot.wait_until_ready()
     logger.info("Guild information", number_of_guilds=len(discord_bot.guilds))
+    report_guild_count(len(discord_bot.guilds))
+
+
+@tasks.loop(seconds=settings.MEMORY_RSS_INTERVAL)
+async def log_memory_usage() -> None:
+    """Log the process' resident memory size, and Python's traced memory if it's traced."""
+    rss = rss_bytes()
+    traced, traced_peak = tracemalloc.get_traced_memory()
+    logger.info(
+        "Memory usage",
+        rss_mib=round(rss / 2**20, 1) if rss is not None else None,
+        traced_mib=round(traced / 2**20, 1),
+        traced_peak_mib=round(traced_peak / 2**20, 1),
+    )
+
+
+@tasks.loop(seconds=settings.MEMORY_SNAPSHOT_INTERVAL)
+async def log_memory_growth() -> None:
+    """Log the allocation sites whose memory grew the most since the previous snapshot."""
+    # Snapshots are taken and compared in a worker thread, as they take a while for big heaps
+    loop = asyncio.get_running_loop()
+    grown = await loop.run_in_executor(None, memory_profiler.growth)
+    for rank, site in enumerate(grown, start=1):
+        logger.info(
+            "Allocation site grew",
+            rank=rank,
+            site=site.site,
+            size_kib=round(site.size / 1024, 1),
+            size_diff_kib=round(site.size_diff / 1024, 1),
+            count=site.count,
+            count_diff=site.count_diff,
+        )
+    logger.info(
+        "Memory snapshot taken",
+        snapshot=memory_profiler.snapshots,
+        grown_sites=len(grown),
+        growth_kib=round(sum(site.size_diff for site in grown) / 1024, 1),
+    )
+
+
+@log_memory_growth.before_loop
+async def start_memory_tracing() -> None:
+    """Start tracing allocations before the first snapshot is taken."""
+    memory_profiler.start()
+
+
+@log_memory_growth.after_loop
+async def stop_memory_tracing() -> None:
+    """Stop tracing allocations once snapshots are no longer taken."""
+    memory_profiler.stop()
+
+
+@tasks.loop(seconds=0)
+async def monitor_loop_lag() -> None:
+    """Measure the event loop's lag continuously, and watch for blocking calls."""
+    lag = await loop_lag_monitor.measure()
+    event_loop_lag.observe(lag)
+    response_deadline.observe_lag(lag)
+
+
+@monitor_loop_lag.after_loop
+async def stop_loop_watchdog() -> None:
+    """Stop watching for blocking calls once the lag is no longer measured."""
+    loop_lag_monitor.stop()
+
+
+@tasks.loop(seconds=settings.QUESTION_POOL_RELOAD_INTERVAL)
+async def reload_question_pool() -> None:
+    """Reload the question pool and its slash commands when the question pool file changes."""
+    await discord_bot.wait_until_ready()
+    previous = current_pool()
+    pool = await reload_pool(settings.QUESTION_POOL_FILEPATH)
+    if pool is not None:
+        sync_exam_commands(previous, pool)
+
+
+@tasks.loop(seconds=5)
+async def expire_questions() -> None:
+    """Disable the answer choices of questions that have been live longer than their timeout."""
+    await discord_bot.wait_until_ready()
+    expired = await live_questions.expire()
+    if expired:
+        logger.info(
+            "Live questions",
+            live_questions=len(live_questions),
+            expired_questions=expired,
+            total_expirations=live_questions.expirations,
+            total_evictions=live_questions.evictions,
+        )
+
+
+@tasks.loop(seconds=settings.RATE_LIMIT_SWEEP_INTERVAL)
+async def sweep_rate_limits() -> None:
+    """Remove the token buckets of rate-limited users, channels and guilds that are full again."""
+    await discord_bot.wait_until_ready()
+    for name, limiter in (("commands", command_limiter), ("answers", answer_limiter)):
+        removed = limiter.sweep()
+        logger.info(
+            "Rate limiter swept",
+            rate_limiter=name,
+            removed_keys=removed,
+            kept_keys=len(limiter),
+            total_hits=limiter.hits,
+            total_rejections=limiter.rejections,
+        )
+
+
+@tasks.loop(seconds=settings.SHUFFLE_BAGS_SAVE_INTERVAL)
+async def save_shuffle_bags() -> None:
+    """Save the shuffle bags questions are drawn from, so that a restart resumes their rounds."""
+    await discord_bot.wait_until_ready()
+    # Bags are serialized on the event loop, as draws change them, yielding to it between chunks
+    chunks = []
+    for chunk in shuffle_bags.dump_chunks():
+        chunks.append(chunk)
+        await asyncio.sleep(0)
+    data = b"".join(chunks)
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(
+            None,
+            write_shuffle_bags,
+            worker_filepath(settings.SHUFFLE_BAGS_FILEPATH),
+            data,
+        )
+    except OSError as exc:
+        logger.warning("Failed to save shuffle bags", error=str(exc))
+        return
+    logger.info(
+        "Shuffle bags saved",
+        bags=len(shuffle_bags),
+        size_kib=round(len(data) / 1024, 1),
+        total_draws=shuffle_bags.draws,
+        total_evictions=shuffle_bags.evictions,
+    )
@@ -1,80 +1,184 @@
 """Contains views relevant to trivia questions."""
 
-from typing import List, Optional
+import asyncio
+from collections import OrderedDict
+from time import monotonic
+from typing import List, NamedTuple, Optional, Sequence, Set, Tuple
 import structlog
 import disnake
-from bot.embeds.trivia import trivia_ok_correct, trivia_ok_incorrect
+from aiohttp.client_exceptions import ClientOSError
+from disnake.http import HTTPClient, Route
+from disnake.ui.action_row import components_to_dict
+from bot.models.question import Question
 
 logger = structlog.getLogger(name=__name__)
 
+ANSWER_CUSTOM_ID_PREFIX = "answer"
+
+
+class AnswerCustomId(NamedTuple):
+    """Everything needed to resolve a click of an answer choice button.
+
+    Encoded into the button's custom ID, so answer choice buttons hold no state in the bot and
+    keep working across restarts and shards.
+    """
+
+    command_name: str
+    question_index: int
+    question_key: str
+    choice_id: int
+
+    def encode(self) -> str:
+        """Encode into a custom ID for a button."""
+        return ":".join(
+            [
+                ANSWER_CUSTOM_ID_PREFIX,
+                self.command_name,
+                str(self.question_index),
+                self.question_key,
+                str(self.choice_id),
+            ]
+        )
+
+    @classmethod
+    def decode(cls, custom_id: str) -> Optional["AnswerCustomId"]:
+        """Decode a button's custom ID, returning None if it isn't an answer choice's."""
+        parts = custom_id.split(":")
+        if len(parts) != 5 or parts[0] != ANSWER_CUSTOM_ID_PREFIX:
+            return None
+        try:
+            return cls(parts[1], int(parts[2]), parts[3], int(parts[4]))
+        except ValueError:
+            return None
+
 
 class AnswerChoice(disnake.ui.Button):
-    """Button representing an answer choice for a question."""
+    """Button representing an answer choice for a question.
 
-    def __init__(
-        self,
-        correct: bool,
-        correct_choice_text: str,
-        choice_id: int,
-        explanation: Optional[str] = None,
-        *args,
-        **kwargs,
-    ) -> None:
+    Clicks are handled by the global on_button_click listener, which resolves the answer from
+    the question pool using the button's custom ID.
+    """
+
+    def __init__(self, answer: AnswerCustomId, label: str) -> None:
         """Instantiate a new answer choice."""
-        self.correct: bool = correct
-        self.correct_choice_text: str = correct_choice_text
-        self.choice_id: int = choice_id
-        self.explanation: str = explanation
-
-        super().__init__(*args, **kwargs)
-
-    async def callback(self, interaction: disnake.MessageInteraction) -> None:
-        """Inform user whether their choice is correct or incorrect."""
-        logger.info(
-            "Answer selected",
-            choice_id=self.choice_id,
-            choice_text=self.label,
-            choice_correct=self.correct,
-            guild_id=interaction.guild_id,
-            guild_name=interaction.guild.name,
+        super().__init__(label=label, custom_id=answer.encode())
+
+
+def answer_choices(
+    command_name: str, question_index: int, question: Question, order: Sequence[int]
+) -> List[AnswerChoice]:
+    """Return the answer choice buttons for a question.
+
+    Args:
+        command_name (str): Command name of the exam the question belongs to.
+        question_index (int): Index of the question within its exam.
+        question (Question): Question whose answer choices are displayed.
+        order (Sequence[int]): Indices of the question's choices in the order they are
+            displayed.
+    """
+    question_key = question.key
+    return [
+        AnswerChoice(
+            AnswerCustomId(
+                command_name, question_index, question_key, question.choices[index].id
+            ),
+            label=f"Choice #{number}",
         )
-        if self.correct:
-            await interaction.response.send_message(
-                embed=trivia_ok_correct(explanation=self.explanation),
-                ephemeral=True,
-            )
-        else:
-            await interaction.response.send_message(
-                embed=trivia_ok_incorrect(
-                    correct_answer=self.correct_choice_text,
-                    explanation=self.explanation,
-                ),
-                ephemeral=True,
-            )
-        return await super().callback(interaction)
-
-
-class AnswerChoices(disnake.ui.View):
-    """View that displays answer choices for a question."""
+        for number, index in enumerate(order, start=1)
+    ]
+
+
+# Expiry time, application ID, interaction token, and custom ID and label of each button
+LiveQuestion = Tuple[float, int, str, Tuple[Tuple[str, str], ...]]
+
+ORIGINAL_MESSAGE_ROUTE = (
+    "/webhooks/{application_id}/{interaction_token}/messages/@original"
+)
+
+
+class LiveQuestions:
+    """Bounded registry of sent questions whose answer choice buttons are still enabled.
+
+    Each question's buttons are disabled once it has been live for longer than its timeout.
+    When more than max_live questions are live, the oldest are evicted early by disabling their
+    buttons, so that a burst of questions can't grow memory without limit. Only what editing a
+    question's message takes is kept, rather than its interaction, and at most max_disabling
+    messages are edited at once.
+    """
 
     def __init__(
-        self, choices: List[dict], correct_choice_id: int, explanation: str
+        self, http: HTTPClient, timeout: float, max_live: int, max_disabling: int = 10
     ) -> None:
-        """Instantiate a new view."""
-        super().__init__()
-        self.choices = choices
-        for choice in self.choices:
-            if choice.get("id") == correct_choice_id:
-                correct_choice_text = choice.get("text")
+        """Instantiate a new registry of live questions, edited through an HTTP client."""
+        self.http: HTTPClient = http
+        self.timeout: float = timeout
+        self.max_live: int = max_live
+        self.max_disabling: int = max_disabling
+        self.evictions: int = 0
+        self.expirations: int = 0
+        self._questions: "OrderedDict[int, LiveQuestion]" = OrderedDict()
+        self._disabling: Set[asyncio.Task] = set()
+        # Created on first use, as semaphores are bound to the running event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def __len__(self) -> int:
+        """Return the number of live questions."""
+        return len(self._questions)
+
+    def add(self, inter: disnake.Interaction, buttons: List[AnswerChoice]) -> None:
+        """Register a question sent in response to an interaction."""
+        self._questions[inter.id] = (
+            monotonic() + self.timeout,
+            inter.application_id,
+            inter.token,
+            tuple((button.custom_id, button.label) for button in buttons),
+        )
+        while len(self._questions) > self.max_live:
+            _, evicted = self._questions.popitem(last=False)
+            self.evictions += 1
+            task = asyncio.create_task(self.disable(*evicted[1:]))
+            self._disabling.add(task)
+            task.add_done_callback(self._disabling.discard)
+
+    async def expire(self) -> int:
+        """Disable the buttons of every question that has timed out.
+
+        Returns:
+            The number of questions that timed out.
+        """
+        now = monotonic()
+        expired = []
+        # Questions share one timeout, so they expire in the order they were added.
+        while self._questions:
+            question = next(iter(self._questions.values()))
+            if question[0] > now:
                 break
-        for index, choice in enumerate(self.choices, start=1):
-            correct_choice = choice.get("id") == correct_choice_id
-            self.add_item(
-                AnswerChoice(
-                    correct=correct_choice,
-                    correct_choice_text=correct_choice_text,
-                    choice_id=choice.get("id"),
-                    explanation=explanation,
-                    label=f"Choice #{index}",
-                )
-            )
+            self._questions.popitem(last=False)
+            expired.append(self.disable(*question[1:]))
+        self.expirations += len(expired)
+        await asyncio.gather(*expired)
+        return len(expired)
+
+    async def disable(
+        self, application_id: int, token: str, buttons: Sequence[Tuple[str, str]]
+    ) -> None:
+        """Disable the answer choice buttons of a question, given their custom IDs and labels."""
+        components = components_to_dict(
+            [
+                disnake.ui.Button(label=label, custom_id=custom_id, disabled=True)
+                for custom_id, label in buttons
+            ]
+        )
+        route = Route(
+            "PATCH",
+            ORIGINAL_MESSAGE_ROUTE,
+            application_id=application_id,
+            interaction_token=token,
+        )
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_disabling)
+        async with self._semaphore:
+            try:
+                await self.http.request(route, json={"components": components})
+            except (disnake.HTTPException, ClientOSError) as exc:
+                logger.debug("Failed to disable answer choices", error=str(exc))
@@ -1,11 +1,70 @@
 """House pytest fixtures for unit tests."""
 
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import Callable
 import pytest
-from yaml import SafeLoader, load
+from disnake import InteractionResponded
+from disnake.utils import utcnow
+from bot.core.util import question_pool as load_question_pool
+
+
+class FakeResponse:
+    """Stand-in for an interaction response or followup webhook that records messages."""
+
+    def __init__(self, messages: list, responded: bool) -> None:
+        """Instantiate a new fake response."""
+        self.messages = messages
+        self.responded = responded
+        self.deferred = False
+        self.ephemeral = False
+
+    def is_done(self) -> bool:
+        """Return whether the interaction has been responded to."""
+        return self.responded
+
+    async def defer(self, ephemeral: bool = False) -> None:
+        """Record that the interaction was deferred, or raise if it was responded to."""
+        if self.responded:
+            raise InteractionResponded(None)
+        self.responded = self.deferred = True
+        self.ephemeral = ephemeral
+
+    async def send_message(self, **kwargs) -> None:
+        """Record a message, or raise if the interaction has already been responded to."""
+        if self.responded:
+            raise InteractionResponded(None)
+        self.responded = True
+        self.messages.append(kwargs)
+
+    async def send(self, **kwargs) -> None:
+        """Record a followup message."""
+        self.messages.append(kwargs)
+
+
+class FakeInteraction:
+    """Stand-in for an interaction that can be responded to."""
+
+    def __init__(self, id: int = 1, age: float = 0.0) -> None:
+        """Instantiate a new fake interaction created age seconds ago."""
+        self.id = id
+        self.application_id = 1
+        self.token = f"token-{id}"
+        self.created_at = utcnow() - timedelta(seconds=age)
+        self.messages: list = []
+        self.guild = self.channel = SimpleNamespace(id=1, name="test")
+        self.response = FakeResponse(self.messages, responded=False)
+        self.followup = FakeResponse(self.messages, responded=True)
+        self.followup.send_message = self.followup.send
 
 
 @pytest.fixture
 def question_pool():
     """Open question pool YAML file and return contents."""
-    with open("./bot/models/question_pool.yaml") as pool_file:
-        yield load(pool_file, SafeLoader)
+    yield load_question_pool("./bot/models/question_pool.yaml")
+
+
+@pytest.fixture
+def fake_interaction() -> Callable[..., FakeInteraction]:
+    """Return a factory of fake interactions, given their ID and age in seconds."""
+    return FakeInteraction
@@ -0,0 +1,64 @@
+"""Test the cluster of worker processes in bot.core.cluster module."""
+
+import time
+from structlog.testing import capture_logs
+from bot.core.cluster import Cluster, IdentifyGate, shard_ranges, worker_environment
+
+
+def test_shard_ranges() -> None:
+    """Ensure shards are split into contiguous ranges of nearly equal sizes."""
+    assert shard_ranges(10, 3) == [[0, 1, 2, 3], [4, 5, 6], [7, 8, 9]]
+    assert shard_ranges(2, 4) == [[0], [1]]
+    assert shard_ranges(1, 0) == [[0]]
+
+
+def test_worker_environment() -> None:
+    """Ensure only the first worker syncs commands, and each serves metrics on its own port."""
+    assert worker_environment(0, [0, 1], 4, 8080) == {
+        "SHARD_IDS": "[0, 1]",
+        "SHARD_COUNT": "4",
+        "SYNC_COMMANDS": "true",
+        "METRICS_PORT": "8080",
+    }
+    environment = worker_environment(1, [2, 3], 4, 8080)
+    assert environment["SYNC_COMMANDS"] == "false"
+    assert environment["METRICS_PORT"] == "8081"
+    assert worker_environment(1, [2, 3], 4, 0)["METRICS_PORT"] == "0"
+
+
+def test_identify_gate() -> None:
+    """Ensure identifies in the same bucket are spaced out, and other buckets aren't held up."""
+    gate = IdentifyGate(max_concurrency=2, interval=5)
+    assert gate.reserve(0, now=100) == 0
+    assert gate.reserve(1, now=100) == 0
+    assert gate.reserve(2, now=100) == 5
+    assert gate.reserve(4, now=101) == 9
+    assert gate.reserve(3, now=120) == 0
+
+
+def test_cluster_restarts_exited_workers() -> None:
+    """Ensure workers that exit are restarted with a growing delay, and guilds are summed."""
+    # Running bot.core.cluster as a module does nothing, so its workers exit immediately
+    cluster = Cluster(
+        shard_count=3, workers=2, module="bot.core.cluster", restart_delay=0.05
+    )
+    assert [worker.shard_ids for worker in cluster.workers] == [[0, 1], [2]]
+    with capture_logs() as logs:
+        for worker in cluster.workers:
+            cluster.start(worker.index)
+        deadline = time.monotonic() + 30
+        while cluster.restarts < 4 and time.monotonic() < deadline:
+            cluster.supervise(timeout=0.1)
+        cluster.stop()
+    assert cluster.restarts >= 4
+    delays = [
+        log["restart_in_s"] for log in logs if log["event"] == "Cluster worker exited"
+    ]
+    assert 0.1 in delays
+
+    cluster.workers[0].report_guilds(3)
+    cluster.workers[1].report_guilds(4)
+    with capture_logs() as logs:
+        cluster.log_guild_quantity()
+        cluster.log_guild_quantity()
+    assert [log["number_of_guilds"] for log in logs] == [7]
@@ -0,0 +1,75 @@
+"""Test interaction response deadline predictions in bot.core.deadline module."""
+
+from datetime import timedelta
+from typing import Callable
+import pytest
+from disnake import Embed
+from disnake.utils import utcnow
+from bot.core.deadline import (
+    ResponseDeadline,
+    defer_if_late,
+    response_deadline,
+    response_decisions,
+)
+from bot.core.util import send_embed
+
+
+def test_send_estimate_rises_with_erratic_latencies() -> None:
+    """Ensure the expected delay covers erratic send times, and includes loop lag."""
+    deadline = ResponseDeadline()
+    assert deadline.expected_delay() == 0
+    deadline.observe_send(0.1)
+    assert deadline.expected_delay() == pytest.approx(0.3)
+    for _ in range(50):
+        deadline.observe_send(0.1)
+    steady = deadline.expected_delay()
+    assert steady == pytest.approx(0.1, abs=0.01)
+    for latency in (0.1, 0.9, 0.1, 0.9):
+        deadline.observe_send(latency)
+    assert deadline.expected_delay() > 0.9
+    deadline.observe_lag(1.0)
+    assert deadline.expected_delay() > 1.9
+
+
+def test_should_defer_near_deadline() -> None:
+    """Ensure responses are deferred once they're expected within the margin of the deadline."""
+    deadline = ResponseDeadline(deadline=3, margin=0.5)
+    deadline.observe_send(0.2)
+    deadline.deviation = 0
+    now = utcnow()
+    assert not deadline.should_defer(now - timedelta(seconds=2.2), now)
+    assert deadline.should_defer(now - timedelta(seconds=2.4), now)
+    deadline.observe_lag(1.0)
+    assert deadline.should_defer(now - timedelta(seconds=1.4), now)
+
+
+async def test_defer_if_late(
+    monkeypatch: pytest.MonkeyPatch, fake_interaction: Callable
+) -> None:
+    """Ensure only interactions expected to miss the deadline are deferred, and counted."""
+    monkeypatch.setattr(response_deadline, "latency", 0.1)
+    monkeypatch.setattr(response_deadline, "deviation", 0.0)
+    monkeypatch.setattr(response_deadline, "lag", 0.0)
+    before = dict(response_decisions.values())
+    fresh, stale = fake_interaction(age=0.1), fake_interaction(age=2.9)
+    assert not await defer_if_late(fresh)
+    assert await defer_if_late(stale)
+    assert stale.response.deferred and not fresh.response.deferred
+    assert not await defer_if_late(stale)  # Already responded to
+    after = response_decisions.values()
+    assert after[("immediate",)] - before.get(("immediate",), 0) == 1
+    assert after[("deferred",)] - before.get(("deferred",), 0) == 1
+
+
+async def test_deferred_error_reply_stays_ephemeral(
+    monkeypatch: pytest.MonkeyPatch, fake_interaction: Callable
+) -> None:
+    """Ensure an error reply to a late interaction is deferred ephemerally, then followed up."""
+    monkeypatch.setattr(response_deadline, "latency", 0.1)
+    monkeypatch.setattr(response_deadline, "deviation", 0.0)
+    monkeypatch.setattr(response_deadline, "lag", 0.0)
+    inter = fake_interaction(age=2.9)
+    assert await defer_if_late(inter, ephemeral=True)
+    assert await send_embed(inter, Embed(title="Exam unavailable"), ephemeral=True)
+    assert inter.response.deferred and inter.response.ephemeral
+    assert len(inter.messages) == 1 and inter.messages[0]["ephemeral"]
@@ -0,0 +1,89 @@
+"""Test event loop lag monitoring in bot.core.lag module."""
+
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+import disnake
+from structlog.testing import capture_logs
+from bot.core.lag import LoopLagMonitor, interaction_context
+
+
+def fake_interaction() -> disnake.ApplicationCommandInteraction:
+    """Return an application command interaction with only its context set."""
+    inter = object.__new__(disnake.ApplicationCommandInteraction)
+    inter.id = 1
+    inter.guild_id = 2
+    inter.channel_id = 3
+    inter.author = SimpleNamespace(id=4)
+    inter.data = SimpleNamespace(name="trivia")
+    return inter
+
+
+def test_interaction_context() -> None:
+    """Ensure the innermost interaction is found by walking up a stack of frames."""
+
+    def handler(inter: disnake.Interaction) -> dict:
+        return interaction_context(sys._getframe())
+
+    assert handler(fake_interaction()) == {
+        "interaction_id": 1,
+        "guild_id": 2,
+        "channel_id": 3,
+        "user_id": 4,
+        "command_name": "trivia",
+    }
+    assert interaction_context(sys._getframe()) == {}
+
+
+def test_quantiles() -> None:
+    """Ensure quantiles are taken from the recent lags only."""
+    monitor = LoopLagMonitor(interval=1, threshold=1, window=100)
+    assert monitor.quantiles((0.5,)) == {}
+    monitor.lags.extend(range(200))
+    assert monitor.quantiles((0, 0.5, 0.99, 1)) == {
+        ("0",): 100,
+        ("0.5",): 150,
+        ("0.99",): 199,
+        ("1",): 199,
+    }
+
+
+def test_check_reports_each_block_once() -> None:
+    """Ensure a missed heartbeat is reported once, and only past the threshold."""
+    monitor = LoopLagMonitor(interval=1, threshold=0.5)
+    monitor._heartbeat = 100
+    with capture_logs() as logs:
+        assert not monitor.check(now=101.4)
+        assert monitor.check(now=101.6)
+        assert not monitor.check(now=105)
+        monitor._heartbeat = 106
+        assert monitor.check(now=108)
+    assert monitor.blocked == 2
+    assert [log["event"] for log in logs] == ["Event loop blocked"] * 2
+
+
+async def test_watchdog_reports_blocking_call() -> None:
+    """Ensure the watchdog logs the stack and interaction of a call blocking the loop."""
+    monitor = LoopLagMonitor(interval=0.05, threshold=0.1)
+
+    async def measure_forever() -> None:
+        while True:
+            await monitor.measure()
+
+    async def blocking_handler(inter: disnake.Interaction) -> None:
+        time.sleep(0.5)
+
+    with capture_logs() as logs:
+        task = asyncio.ensure_future(measure_forever())
+        await asyncio.sleep(0.1)
+        await blocking_handler(fake_interaction())
+        await asyncio.sleep(0.1)
+        task.cancel()
+        monitor.stop()
+    blocked = [log for log in logs if log["event"] == "Event loop blocked"]
+    assert len(blocked) == 1 and monitor.blocked == 1
+    assert "blocking_handler" in blocked[0]["stack"]
+    assert blocked[0]["command_name"] == "trivia"
+    assert any(log["event"] == "Event loop lag" for log in logs)
+    assert max(monitor.lags) >= 0.4
@@ -0,0 +1,178 @@
+"""Test the queue-based logging pipeline in bot.core.log module."""
+
+import io
+import json
+import logging
+import threading
+from typing import Any, Iterator, List, Optional
+import pytest
+import structlog
+from structlog.contextvars import bind_contextvars, clear_contextvars, merge_contextvars
+from bot.core.log import (
+    Lazy,
+    LogSampler,
+    QueueLogHandler,
+    QueueLogger,
+    capture_exc_info,
+    enqueue_event,
+)
+
+
+class BlockingStream(io.StringIO):
+    """In-memory stream whose writes wait until they're released."""
+
+    def __init__(self) -> None:
+        """Instantiate a new blocked stream."""
+        super().__init__()
+        self.released = threading.Event()
+
+    def write(self, text: str) -> int:
+        """Write text once writes have been released."""
+        self.released.wait()
+        return super().write(text)
+
+
+def make_logger(
+    name: str, handler: QueueLogHandler, sample_rates: Optional[dict] = None
+) -> Any:
+    """Return a structlog logger that logs through the given handler.
+
+    Standard library records of the logger with the same name are also logged through it.
+    """
+    stdlib_logger = logging.getLogger(name)
+    stdlib_logger.handlers = [handler]
+    stdlib_logger.propagate = False
+    stdlib_logger.setLevel(logging.INFO)
+    return structlog.wrap_logger(
+        QueueLogger(handler),
+        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+        processors=[
+            merge_contextvars,
+            capture_exc_info,
+            LogSampler(sample_rates or {}),
+            enqueue_event,
+        ],
+    )
+
+
+def lines(stream: io.StringIO) -> List[dict]:
+    """Return the JSON log lines written to a stream."""
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+@pytest.fixture
+def context() -> Iterator[None]:
+    """Clear context variables before and after a test."""
+    clear_contextvars()
+    yield
+    clear_contextvars()
+
+
+def test_queue_log_handler_renders_json(context: None) -> None:
+    """Ensure structlog and standard library records are written as JSON lines in order."""
+    stream = io.StringIO()
+    handler = QueueLogHandler(stream)
+    logger = make_logger("test_renders_json", handler)
+    bind_contextvars(guild_id=1)
+    logger.debug("Filtered out")
+    logger.info("Sent embeds", embeds=[{"title": "Test"}], error=ValueError("x"))
+    logging.getLogger("test_renders_json").warning("Foreign %s", "record")
+    handler.close()
+    first, second = lines(stream)
+    assert first["event"] == "Sent embeds"
+    assert first["guild_id"] == 1
+    assert first["embeds"] == [{"title": "Test"}]
+    assert first["error"] == "ValueError('x')"
+    assert first["level"] == "info"
+    assert first["timestamp"].endswith("Z")
+    assert second["event"] == "Foreign record"
+    assert second["level"] == "warning"
+    assert second["logger"] == "test_renders_json"
+    assert handler.written == 2 and handler.dropped == 0
+
+
+def test_queue_log_handler_formats_exceptions(context: None) -> None:
+    """Ensure tracebacks of handled exceptions are formatted by the writer thread."""
+    stream = io.StringIO()
+    handler = QueueLogHandler(stream)
+    logger = make_logger("test_formats_exceptions", handler)
+    try:
+        raise ValueError("Something went wrong")
+    except ValueError:
+        logger.exception("Command failed")
+    handler.close()
+    (line,) = lines(stream)
+    assert "ValueError: Something went wrong" in line["exception"]
+
+
+def test_queue_log_handler_drops_when_full(context: None) -> None:
+    """Ensure records are dropped and counted, rather than blocking, when the queue is full."""
+    stream = BlockingStream()
+    handler = QueueLogHandler(stream, queue_size=2, batch_size=1)
+    logger = make_logger("test_drops_when_full", handler)
+    for index in range(10):
+        logger.info("Logged", index=index)
+    assert handler.dropped >= 10 - 3  # The writer may hold one record while blocked
+    stream.released.set()
+    handler.close()
+    written = lines(stream)
+    assert [line["index"] for line in written if "index" in line] == list(
+        range(10 - handler.dropped)
+    )
+    reports = [line for line in written if line["event"] == "Dropped log records"]
+    assert sum(report["dropped_records"] for report in reports) == handler.dropped
+
+
+def test_queue_log_handler_blocks_when_full(context: None) -> None:
+    """Ensure no records are dropped under the block overflow policy."""
+    stream = io.StringIO()
+    handler = QueueLogHandler(stream, queue_size=2, batch_size=1, overflow="block")
+    logger = make_logger("test_blocks_when_full", handler)
+    for index in range(100):
+        logger.info("Logged", index=index)
+    handler.close()
+    assert [line["index"] for line in lines(stream)] == list(range(100))
+    assert handler.dropped == 0
+
+
+def test_lazy_fields(context: None) -> None:
+    """Ensure lazy fields are computed once their event is rendered, and only then."""
+    computed = []
+
+    def payload(value: int) -> dict:
+        computed.append(value)
+        return {"value": value}
+
+    stream = io.StringIO()
+    handler = QueueLogHandler(stream)
+    logger = make_logger("test_lazy_fields", handler)
+    logger.debug("Filtered out", payload=Lazy(payload, 1))
+    logger.info("Logged", payload=Lazy(payload, 2))
+    handler.close()
+    (line,) = lines(stream)
+    assert line["payload"] == {"value": 2}
+    assert computed == [2]
+
+
+def test_log_sampler(context: None) -> None:
+    """Ensure sampled events only keep their lazy fields at their sample rate or on warnings."""
+    stream = io.StringIO()
+    handler = QueueLogHandler(stream)
+    logger = make_logger(
+        "test_log_sampler", handler, {"Never sampled": 0, "Always sampled": 1}
+    )
+    for event in ("Never sampled", "Always sampled", "Not sampled"):
+        logger.info(event, payload=Lazy(dict, {"value": 1}), guild_id=1)
+    logger.warning("Never sampled", payload=Lazy(dict, {"value": 1}))
+    handler.close()
+    never, always, unsampled, warning = lines(stream)
+    assert "payload" not in never and never["guild_id"] == 1
+    assert always["payload"] == {"value": 1}
+    assert unsampled["payload"] == {"value": 1}
+    assert warning["payload"] == {"value": 1}
+
+
+def test_queue_log_handler_unknown_overflow() -> None:
+    """Ensure unknown overflow policies are rejected."""
+    with pytest.raises(ValueError):
+        QueueLogHandler(io.StringIO(), overflow="ignore")
@@ -0,0 +1,99 @@
+"""Test the memory-mapped question pool in bot.core.mapped_pool module."""
+
+import os
+import shutil
+from pathlib import Path
+import pytest
+import yaml
+from bot.core import mapped_pool
+from bot.core.mapped_pool import MappedQuestionPool, mapped_pool_filepath
+from bot.core.pool import QuestionPool, current_pool, load_pool, reload_pool
+
+
+def copy_question_pool(tmp_path: Path) -> Path:
+    """Copy the shipped question pool into a temporary directory."""
+    pool_filepath = tmp_path / "question_pool.yaml"
+    shutil.copy("./bot/models/question_pool.yaml", pool_filepath)
+    return pool_filepath
+
+
+def test_mapped_pool_matches_question_pool(tmp_path: Path) -> None:
+    """Ensure a mapped pool serves the same exams and questions as a resident pool."""
+    pool_filepath = copy_question_pool(tmp_path)
+    pool = QuestionPool.from_file(pool_filepath)
+    mapped = MappedQuestionPool.from_file(pool_filepath)
+    assert mapped_pool_filepath(pool_filepath).exists()
+    assert mapped.checksum == pool.checksum
+    assert mapped.total_questions == pool.total_questions
+    assert [e.get("command_name") for e in mapped] == [
+        e.get("command_name") for e in pool
+    ]
+    for exam in pool:
+        command_name = exam.get("command_name")
+        assert mapped.exam(command_name) == exam
+        questions = mapped.exam(command_name).get("questions")
+        assert questions[-1] == exam.get("questions")[-1]
+        assert questions[1:3] == exam.get("questions")[1:3]
+        with pytest.raises(IndexError):
+            questions[len(questions)]
+        question = exam.get("questions")[5]
+        assert mapped.question(command_name, 5, question.key) == question
+        assert mapped.question(command_name, 0, question.key) == question
+        assert mapped.question(command_name, 5, "missing") is None
+    assert mapped.exam("does-not-exist") is None
+
+
+def test_mapped_pool_recompiles_stale_file(tmp_path: Path) -> None:
+    """Ensure a file compiled from other YAML contents is recompiled, and odd values survive."""
+    pool_filepath = copy_question_pool(tmp_path)
+    original = MappedQuestionPool.from_file(pool_filepath)
+    exams = [
+        {
+            "meta_name": "Exämé",
+            "command_name": "exam",
+            "command_description": "Ünïcödé exam.",
+            "questions": [
+                {
+                    "prompt": "Whät is ✓?",
+                    "correct_choice": -1,
+                    "choices": [{"id": -1}, {"id": 2, "text": "✓"}],
+                    "tags": ["ünï", "cödé"],
+                }
+            ],
+        }
+    ]
+    pool_filepath.write_text(yaml.safe_dump(exams, allow_unicode=True), "utf-8")
+    mapped = MappedQuestionPool.from_file(pool_filepath)
+    assert mapped.exams == QuestionPool(exams).exams
+    # Processes that mapped the previous file keep serving it.
+    assert original.exam("ccna") is not None
+    assert original.exam("ccna").get("questions")[0].prompt
+
+
+def test_mapped_pool_compiles_privately(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Ensure the pool is still mapped when its compiled file can't be written."""
+
+    def read_only(*args: object) -> None:
+        raise PermissionError("Read-only file system")
+
+    monkeypatch.setattr(mapped_pool, "compile_mapped_pool", read_only)
+    pool_filepath = copy_question_pool(tmp_path)
+    mapped = MappedQuestionPool.from_file(pool_filepath)
+    assert not mapped_pool_filepath(pool_filepath).exists()
+    assert mapped.exams == QuestionPool.from_file(pool_filepath).exams
+
+
+async def test_reload_mapped_pool(tmp_path: Path) -> None:
+    """Ensure a mapped pool is reloaded as a mapped pool."""
+    pool_filepath = copy_question_pool(tmp_path)
+    original = load_pool(pool_filepath, mapped=True)
+    assert isinstance(original, MappedQuestionPool)
+    exams = yaml.safe_load(open(pool_filepath))[:1]
+    pool_filepath.write_text(yaml.safe_dump(exams))
+    os.utime(pool_filepath, ns=(0, original.mtime_ns + 1))
+    reloaded = await reload_pool(pool_filepath)
+    assert isinstance(reloaded, MappedQuestionPool)
+    assert reloaded is current_pool()
+    assert reloaded.exams == QuestionPool(exams).exams
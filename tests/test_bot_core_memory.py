@@ -0,0 +1,38 @@
+"""Test memory usage sampling and allocation growth tracking in bot.core.memory module."""
+
+import sys
+import tracemalloc
+import pytest
+from bot.core.memory import MemoryProfiler, rss_bytes, site_name
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Reads /proc")
+def test_rss_bytes() -> None:
+    """Ensure the resident set size of the process is sampled."""
+    assert rss_bytes() > 1024 * 1024
+
+
+def test_site_name() -> None:
+    """Ensure allocation sites are named relative to the import path."""
+    frame = tracemalloc.Frame((__file__, 12))
+    assert site_name(frame) == "tests/test_bot_core_memory.py:12"
+
+
+def test_memory_profiler_growth() -> None:
+    """Ensure the sites that grew since the last snapshot are reported, largest first."""
+    profiler = MemoryProfiler(frames=1, top=3)
+    profiler.start()
+    try:
+        assert profiler.growth() == []
+        retained = [bytearray(1024) for _ in range(1000)]
+        grown = profiler.growth()
+        assert len(grown) <= 3
+        assert grown[0].site.startswith("tests/test_bot_core_memory.py:")
+        assert grown[0].size_diff >= 1000 * 1024
+        assert grown[0].count_diff >= 1000
+        assert profiler.snapshots == 2
+        del retained
+        assert all(site.size_diff > 0 for site in profiler.growth())
+    finally:
+        profiler.stop()
+    assert not tracemalloc.is_tracing()
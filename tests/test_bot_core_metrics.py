@@ -0,0 +1,77 @@
+"""Test the metrics registry and endpoint in bot.core.metrics module."""
+
+import math
+import aiohttp
+from bot.core.metrics import Registry, start_metrics_server
+
+
+def test_registry_render() -> None:
+    """Ensure counters, gauges and histograms are rendered in Prometheus' text format."""
+    registry = Registry()
+    commands = registry.counter(
+        "commands_total", "Commands.", ("command_name", "outcome")
+    )
+    commands.inc("ccna", "asked")
+    commands.inc("ccna", "asked")
+    commands.inc('say "hi"', "failed", amount=0.5)
+    registry.gauge(
+        "latency_seconds",
+        "Latency.",
+        ("shard_id",),
+        callback=lambda: {("0",): 0.25, ("1",): math.inf},
+    )
+    registry.gauge("guilds", "Guilds.").set(3)
+    duration = registry.histogram("duration_seconds", "Duration.", buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 5):
+        duration.observe(value)
+    assert registry.render().splitlines() == [
+        "# HELP commands_total Commands.",
+        "# TYPE commands_total counter",
+        'commands_total{command_name="ccna",outcome="asked"} 2',
+        'commands_total{command_name="say \\"hi\\"",outcome="failed"} 0.5',
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds gauge",
+        'latency_seconds{shard_id="0"} 0.25',
+        'latency_seconds{shard_id="1"} +Inf',
+        "# HELP guilds Guilds.",
+        "# TYPE guilds gauge",
+        "guilds 3",
+        "# HELP duration_seconds Duration.",
+        "# TYPE duration_seconds histogram",
+        'duration_seconds_bucket{le="0.1"} 2',
+        'duration_seconds_bucket{le="1"} 3',
+        'duration_seconds_bucket{le="+Inf"} 4',
+        "duration_seconds_sum 5.65",
+        "duration_seconds_count 4",
+    ]
+
+
+def test_registry_render_failing_callback() -> None:
+    """Ensure a metric whose callback fails doesn't prevent the others from being rendered."""
+    registry = Registry()
+    registry.gauge("broken", "Broken.", callback=lambda: 1 / 0)
+    registry.gauge("working", "Working.").set(1)
+    assert registry.render().splitlines()[-1] == "working 1"
+
+
+async def test_metrics_server() -> None:
+    """Ensure metrics and health probes are served over HTTP."""
+    registry = Registry()
+    registry.gauge("guilds", "Guilds.").set(3)
+    ready = False
+    runner = await start_metrics_server("127.0.0.1", 0, lambda: ready, registry)
+    port = runner.addresses[0][1]
+    try:
+        async with aiohttp.ClientSession(f"http://127.0.0.1:{port}") as session:
+            async with session.get("/metrics") as response:
+                assert response.status == 200
+                assert "guilds 3" in await response.text()
+            async with session.get("/healthz") as response:
+                assert response.status == 200
+            async with session.get("/readyz") as response:
+                assert response.status == 503
+            ready = True
+            async with session.get("/readyz") as response:
+                assert response.status == 200
+    finally:
+        await runner.cleanup()
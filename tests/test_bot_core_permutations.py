@@ -0,0 +1,30 @@
+"""Test permutation tables in bot.core.permutations module."""
+
+from collections import Counter
+from math import factorial
+import pytest
+from bot.core.permutations import (
+    MAX_TABLE_CHOICES,
+    PERMUTATION_TABLES,
+    random_permutation,
+)
+
+
+@pytest.mark.parametrize("length", range(1, MAX_TABLE_CHOICES + 1))
+def test_permutation_tables_are_complete(length: int) -> None:
+    """Ensure each table holds every ordering of its length exactly once."""
+    table = PERMUTATION_TABLES[length]
+    assert len(table) == len(set(table)) == factorial(length)
+    assert all(sorted(p) == list(range(length)) for p in table)
+
+
+@pytest.mark.parametrize("length", [0, 4, MAX_TABLE_CHOICES + 2])
+def test_random_permutation(length: int) -> None:
+    """Ensure random permutations are orderings of every index."""
+    assert sorted(random_permutation(length)) == list(range(length))
+
+
+def test_random_permutation_covers_table() -> None:
+    """Ensure every ordering of four choices is drawn."""
+    draws = Counter(random_permutation(4) for _ in range(5000))
+    assert set(draws) == set(PERMUTATION_TABLES[4])
@@ -0,0 +1,158 @@
+"""Test the resident question pool in bot.core.pool module."""
+
+from pathlib import Path
+from typing import List
+import os
+import shutil
+import pytest
+import yaml
+from bot.core.pool import (
+    LazyQuestionPool,
+    QuestionPool,
+    current_pool,
+    load_pool,
+    reload_pool,
+    validate_pool,
+)
+from bot.models.question import Question
+
+
+def test_question_pool_exam_lookup(question_pool: List[dict]) -> None:
+    """Ensure every exam can be looked up by its command name."""
+    pool = QuestionPool(question_pool)
+    assert len(pool) == len(question_pool)
+    for exam in question_pool:
+        pool_exam = pool.exam(exam.get("command_name"))
+        assert pool_exam.get("meta_name") == exam.get("meta_name")
+        assert len(pool_exam.get("questions")) == len(exam.get("questions"))
+
+
+def test_question_pool_unknown_exam(question_pool: List[dict]) -> None:
+    """Ensure looking up an unknown command name returns None."""
+    assert QuestionPool(question_pool).exam("does-not-exist") is None
+
+
+def test_question_pool_iteration_order(question_pool: List[dict]) -> None:
+    """Ensure iterating over the pool yields exams in question pool order."""
+    assert [e.get("command_name") for e in QuestionPool(question_pool)] == [
+        e.get("command_name") for e in question_pool
+    ]
+
+
+def test_question_pool_questions_are_immutable(question_pool: List[dict]) -> None:
+    """Ensure questions in the pool are converted into immutable questions."""
+    pool = QuestionPool(question_pool)
+    for exam in question_pool:
+        questions = pool.exam(exam.get("command_name")).get("questions")
+        assert isinstance(questions, tuple)
+        assert questions == tuple(Question.from_dict(q) for q in exam.get("questions"))
+
+
+def test_validate_pool_accepts_question_pool(question_pool: List[dict]) -> None:
+    """Ensure the shipped question pool passes validation."""
+    validate_pool(question_pool)
+
+
+@pytest.mark.parametrize(
+    "exams",
+    [
+        pytest.param({"command_name": "ccna"}, id="Pool is not a list"),
+        pytest.param(
+            [{"command_name": "two words"}], id="Command name is not one word"
+        ),
+        pytest.param(
+            [
+                {"command_name": "a", "meta_name": "A", "command_description": "A"},
+                {"command_name": "a", "meta_name": "A", "command_description": "A"},
+            ],
+            id="Command name is not unique",
+        ),
+        pytest.param(
+            [{"command_name": "a", "meta_name": "A", "command_description": "A"}],
+            id="Exam has no questions",
+        ),
+        pytest.param(
+            [
+                {
+                    "command_name": "a",
+                    "meta_name": "A",
+                    "command_description": "A",
+                    "questions": [
+                        {"prompt": "Q?", "correct_choice": 3, "choices": [{"id": 1}]}
+                    ],
+                }
+            ],
+            id="Correct choice is not a choice",
+        ),
+    ],
+)
+def test_validate_pool_rejects_malformed_pool(exams: List[dict]) -> None:
+    """Ensure malformed question pools are rejected."""
+    with pytest.raises(ValueError):
+        validate_pool(exams)
+
+
+async def test_reload_pool(tmp_path: Path) -> None:
+    """Ensure the resident pool is swapped only when the file changes to a valid pool."""
+    pool_filepath = tmp_path / "question_pool.yaml"
+    shutil.copy("./bot/models/question_pool.yaml", pool_filepath)
+    original = load_pool(pool_filepath)
+    assert await reload_pool(pool_filepath) is None
+
+    pool_filepath.write_text("- command_name: broken\n")
+    os.utime(pool_filepath, ns=(0, original.mtime_ns + 1))
+    assert await reload_pool(pool_filepath) is None
+    assert current_pool() is original
+
+    exams = yaml.safe_load(open("./bot/models/question_pool.yaml"))[:1]
+    pool_filepath.write_text(yaml.safe_dump(exams))
+    os.utime(pool_filepath, ns=(0, original.mtime_ns + 2))
+    reloaded = await reload_pool(pool_filepath)
+    assert reloaded is current_pool()
+    assert reloaded.exams == QuestionPool(exams).exams
+    assert original.exam(original.exams[-1].get("command_name")) is not None
+
+
+def test_lazy_question_pool_matches_question_pool() -> None:
+    """Ensure a lazy pool loads the same exams as a fully-parsed pool."""
+    pool = QuestionPool.from_file("./bot/models/question_pool.yaml")
+    lazy_pool = LazyQuestionPool.from_file("./bot/models/question_pool.yaml")
+    assert lazy_pool.total_questions == pool.total_questions
+    for exam in pool:
+        header = {k: v for k, v in exam.items() if k != "questions"}
+        assert lazy_pool.exams[pool.exams.index(exam)] == header
+        assert lazy_pool.exam(exam.get("command_name")) == exam
+
+
+def test_lazy_question_pool_non_ascii(tmp_path: Path) -> None:
+    """Ensure questions blocks are located by byte offset in files with multi-byte characters."""
+    exams = [
+        {
+            "meta_name": f"Exämé {index}",
+            "command_name": f"exam{index}",
+            "command_description": "Ünïcödé exam.",
+            "questions": [
+                {"prompt": "Whät is ✓?", "correct_choice": 1, "choices": [{"id": 1}]}
+            ],
+        }
+        for index in range(3)
+    ]
+    pool_filepath = tmp_path / "question_pool.yaml"
+    pool_filepath.write_text(yaml.safe_dump(exams, allow_unicode=True), "utf-8")
+    lazy_pool = LazyQuestionPool.from_file(pool_filepath)
+    for exam in QuestionPool(exams):
+        assert lazy_pool.exam(exam.get("command_name")) == exam
+
+
+def test_lazy_question_pool_eviction() -> None:
+    """Ensure least recently used exams are evicted once over the loaded question cap."""
+    lazy_pool = LazyQuestionPool.from_file(
+        "./bot/models/question_pool.yaml", max_loaded_questions=100
+    )
+    ccna = lazy_pool.exam("ccna")
+    lazy_pool.exam("ccnp")
+    assert lazy_pool.loaded_questions == 96
+    lazy_pool.exam("dccor")
+    assert lazy_pool.loaded_questions == 99
+    # The evicted exam is parsed again on its next use, and in-flight holders keep their copy.
+    assert lazy_pool.exam("ccna") == ccna
@@ -0,0 +1,64 @@
+"""Test token-bucket rate limiting in bot.core.ratelimit module."""
+
+import pytest
+from bot.core.ratelimit import RateLimiter, TokenBucket
+
+
+def test_rate_limiter_allows_burst_then_refills() -> None:
+    """Ensure a key may use its whole bucket at once, then one hit per refill interval."""
+    limiter = RateLimiter(period=10, user=5)
+    assert all(limiter.hit(now=0, user=1) == 0 for _ in range(5))
+    assert limiter.hit(now=0, user=1) == pytest.approx(2)
+    assert limiter.hit(now=0, user=2) == 0
+    assert limiter.hit(now=2, user=1) == 0
+    assert limiter.hit(now=2, user=1) == pytest.approx(2)
+    assert limiter.hits == 7 and limiter.rejections == 2
+
+
+def test_rate_limiter_scopes() -> None:
+    """Ensure a hit rejected by one scope isn't taken from the buckets of the others."""
+    limiter = RateLimiter(period=10, user=2, channel=3, guild=0)
+    assert "guild" not in limiter.buckets
+    assert limiter.hit(now=0, user=1, channel=1, guild=1) == 0
+    assert limiter.hit(now=0, user=2, channel=1, guild=1) == 0
+    assert limiter.hit(now=0, user=3, channel=1, guild=1) == 0
+    assert limiter.hit(now=0, user=1, channel=1, guild=1) > 0  # Channel is empty
+    assert limiter.hit(now=0, user=1, channel=2, guild=1) == 0  # User still has a hit
+    assert limiter.hit(now=0, user=1, channel=3, guild=1) > 0
+    assert limiter.hit(now=0, user=4, channel=None, guild=None) == 0
+
+
+def test_token_bucket_sweep() -> None:
+    """Ensure keys whose buckets are full again are swept away."""
+    bucket = TokenBucket(limit=2, period=10)
+    bucket.hit("idle", now=0)
+    bucket.hit("busy", now=0)
+    bucket.hit("busy", now=0)
+    assert len(bucket) == 2
+    assert bucket.sweep(now=5) == 1
+    assert len(bucket) == 1
+    assert bucket.wait("idle", now=5) == 0
+    assert bucket.sweep(now=10) == 1
+    assert len(bucket) == 0
+
+
+def test_token_bucket_max_keys() -> None:
+    """Ensure no more than max_keys keys are kept, forgiving the oldest first."""
+    bucket = TokenBucket(limit=1, period=60, max_keys=100)
+    for key in range(1000):
+        bucket.hit(key, now=0)
+        assert len(bucket) <= 100
+    assert bucket.evictions == 900
+    assert bucket.wait(0, now=0) == 0
+    assert bucket.wait(999, now=0) > 0
+
+
+def test_token_bucket_evicts_few_keys() -> None:
+    """Ensure a key past max_keys only removes a few of the oldest, forgiving only unfull ones."""
+    bucket = TokenBucket(limit=1, period=60, max_keys=1000)
+    for key in range(1000):
+        bucket.hit(key, now=-100 if key < 5 else 0)
+    bucket.hit("new", now=0)
+    assert len(bucket) == 991
+    assert bucket.evictions == 5
+    assert bucket.wait(9, now=0) == 0 and bucket.wait(10, now=0) > 0
@@ -0,0 +1,67 @@
+"""Test shuffle bags in bot.core.sampler module."""
+
+from pathlib import Path
+import pytest
+from bot.core.sampler import ShuffleBags, bag_size, new_bag
+
+
+@pytest.mark.parametrize("questions", [1, 2, 7])
+def test_shuffle_bag_rounds(questions: int) -> None:
+    """Ensure every question is drawn once per round, and never twice in a row across rounds."""
+    bags = ShuffleBags()
+    draws = [bags.draw(1, "exam", questions) for _ in range(questions * 50)]
+    for start in range(0, len(draws), questions):
+        end = start + questions
+        assert sorted(draws[start:end]) == list(range(questions))
+    if questions > 1:
+        assert all(a != b for a, b in zip(draws, draws[1:]))
+    assert bags.draws == len(draws)
+
+
+def test_shuffle_bags_are_kept_per_channel_and_exam() -> None:
+    """Ensure bags are separate per channel and exam, and recreated when an exam is resized."""
+    bags = ShuffleBags()
+    bags.draw(1, "exam", 5)
+    bags.draw(2, "exam", 5)
+    bags.draw(1, "other", 5)
+    assert len(bags) == 3
+    draws = [bags.draw(1, "exam", 3) for _ in range(3)]
+    assert sorted(draws) == [0, 1, 2]
+    assert len(bags) == 3
+    assert bags.bytes == 2 * bag_size(new_bag(5)) + bag_size(new_bag(3))
+
+
+def test_shuffle_bags_evict_least_recently_drawn() -> None:
+    """Ensure the bags drawn from the longest ago are evicted over the memory budget."""
+    bags = ShuffleBags(max_bytes=3 * bag_size(new_bag(10)))
+    for channel in range(3):
+        bags.draw(channel, "exam", 10)
+    bags.draw(0, "exam", 10)
+    bags.draw(3, "exam", 10)
+    assert len(bags) == 3
+    assert bags.evictions == 1
+    assert bags.bytes <= bags.max_bytes
+    assert [channel for channel, _ in bags._bags] == [2, 0, 3]
+
+
+def test_shuffle_bags_save_and_load(tmp_path: Path) -> None:
+    """Ensure saved bags are loaded with their rounds and LRU order, and bad files rejected."""
+    bags = ShuffleBags()
+    for channel in (2**63 + 1, 5, 9):
+        for _ in range(channel % 4):
+            bags.draw(channel, "exäm", 70_000 if channel == 5 else 4)
+    filepath = tmp_path / "bags"
+    bags.save(filepath)
+    loaded = ShuffleBags()
+    assert loaded.load(filepath) == 3
+    assert loaded.dumps() == bags.dumps()
+    assert loaded.bytes == bags.bytes
+    # Channel 9 drew one question before saving, and draws the other three after loading
+    first = loaded._bags[(9, "exäm")][1]
+    rest = [loaded.draw(9, "exäm", 4) for _ in range(3)]
+    assert sorted([first, *rest]) == [0, 1, 2, 3]
+    data = filepath.read_bytes()
+    for corrupt in (b"", data[:10], data[:-1], b"NOTBAGS!" + data[8:]):
+        with pytest.raises(ValueError):
+            ShuffleBags().loads(corrupt)
+    assert not list(tmp_path.glob("*.tmp"))
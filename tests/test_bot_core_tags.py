@@ -0,0 +1,94 @@
+"""Test the question tag index in bot.core.tags module."""
+
+import random
+import shutil
+from pathlib import Path
+import pytest
+from bot.core.mapped_pool import MappedQuestionPool
+from bot.core.pool import LazyQuestionPool, QuestionPool
+from bot.core.tags import (
+    TagIndex,
+    complete_tags,
+    filter_name,
+    parse_tags,
+    popcount,
+    select,
+)
+
+
+@pytest.mark.parametrize("size", [1, 63, 64, 65, 1000])
+def test_select(size: int) -> None:
+    """Ensure selecting each rank of a bitset returns its set bits in order."""
+    indices = sorted(random.sample(range(size), max(size // 3, 1)))
+    bits = sum(1 << index for index in indices)
+    assert popcount(bits) == len(indices)
+    assert [select(bits, rank) for rank in range(len(indices))] == indices
+    with pytest.raises(IndexError):
+        select(bits, len(indices))
+
+
+def test_tag_index_questions() -> None:
+    """Ensure questions match every or any tag, case-insensitively."""
+    index = TagIndex.from_questions(
+        [("Switching", "Ethernet"), (), ("ethernet",), ("OSPF",), ("Ethernet", "OSPF")]
+    )
+    assert len(index) == 3
+    assert index.tags == ["Ethernet", "OSPF", "Switching"]
+    assert index.questions([]) == 0b11111
+    assert index.questions(["ETHERNET"]) == 0b10101
+    assert index.questions(["Ethernet", "OSPF"]) == 0b10000
+    assert index.questions(["Ethernet", "OSPF"], match_all=False) == 0b11101
+    assert index.questions(["Ethernet", "Unknown"]) == 0
+    assert index.questions(["Switching", "Unknown"], match_all=False) == 0b00001
+    assert parse_tags(" ethernet,, OSPF ,") == ["ethernet", "OSPF"]
+    assert filter_name("ccna", ["OSPF", "ethernet"]) == filter_name(
+        "ccna", ["Ethernet", "ospf"]
+    )
+    assert filter_name("ccna", ["OSPF"]) != filter_name("ccna", ["OSPF"], False)
+
+
+def test_complete_tags() -> None:
+    """Ensure the tag being typed is completed, keeping the tags already entered."""
+    index = TagIndex.from_questions(
+        [("Network Fundamentals", "Subnetting"), ("Subnetting", "Ethernet")]
+    )
+    assert complete_tags(index, "") == [
+        "Subnetting",
+        "Network Fundamentals",
+        "Ethernet",
+    ]
+    assert complete_tags(index, "net") == [
+        "Network Fundamentals",
+        "Subnetting",
+        "Ethernet",
+    ]
+    assert complete_tags(index, "subnetting, eth") == ["Subnetting, Ethernet"]
+    assert complete_tags(index, "Ethernet,Subnetting,") == [
+        "Ethernet, Subnetting, Network Fundamentals"
+    ]
+    assert complete_tags(TagIndex.from_questions([()]), "a") == []
+
+
+def test_pools_share_tag_indexes(tmp_path: Path) -> None:
+    """Ensure resident, lazy and mapped question pools index the same tags."""
+    pool_filepath = tmp_path / "question_pool.yaml"
+    shutil.copy("./bot/models/question_pool.yaml", pool_filepath)
+    pools = [
+        QuestionPool.from_file(pool_filepath),
+        LazyQuestionPool.from_file(pool_filepath, max_loaded_questions=1),
+        MappedQuestionPool.from_file(pool_filepath),
+    ]
+    for exam in pools[0]:
+        command_name = exam.get("command_name")
+        indexes = [pool.tag_index(command_name) for pool in pools]
+        expected = {tag for question in exam.get("questions") for tag in question.tags}
+        for index in indexes:
+            assert set(index.tags) == expected
+            assert index.question_count == len(exam.get("questions"))
+            for tag in expected:
+                bits = index.questions([tag])
+                assert [tag in q.tags for q in exam.get("questions")] == [
+                    bool(bits >> i & 1) for i in range(index.question_count)
+                ]
+    for pool in pools:
+        assert pool.tag_index("does-not-exist") is None
@@ -0,0 +1,71 @@
+"""Test interaction tracing in bot.core.trace module."""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+import pytest
+from bot.core.trace import (
+    NO_SPAN,
+    enable_tracing,
+    end_trace,
+    span,
+    start_trace,
+    tracing_enabled,
+)
+
+
+@pytest.fixture
+def tracing() -> Iterator[None]:
+    """Enable tracing for the duration of a test."""
+    enable_tracing(True)
+    yield
+    enable_tracing(False)
+
+
+def test_disabled_tracing_uses_no_op_spans() -> None:
+    """Ensure nothing is traced while tracing is disabled."""
+    assert not tracing_enabled()
+    start_trace(datetime.now(timezone.utc))
+    assert span("phase") is NO_SPAN
+    with span("phase"):
+        pass
+    assert end_trace() is None
+
+
+def test_trace_sums_phases(tracing: None) -> None:
+    """Ensure time spent in a phase entered several times is summed up."""
+    start_trace(datetime.now(timezone.utc) - timedelta(seconds=1))
+    for _ in range(2):
+        with span("send"):
+            time.sleep(0.01)
+    with span("log"):
+        pass
+    trace = end_trace()
+    assert end_trace() is None
+    summary = trace.summary()
+    assert list(summary["phases_ms"]) == ["send", "log"]
+    assert summary["phases_ms"]["send"] >= 20
+    assert summary["traced_ms"] >= summary["phases_ms"]["send"]
+    assert summary["total_ms"] >= 1000
+
+
+async def test_trace_follows_dispatched_events(tracing: None) -> None:
+    """Ensure a trace started by a command is seen by events dispatched after it."""
+
+    async def command() -> None:
+        start_trace(datetime.now(timezone.utc))
+        with span("pool_lookup"):
+            await asyncio.sleep(0)
+
+    async def completion() -> dict:
+        return end_trace().summary()
+
+    await command()
+    summary = await asyncio.ensure_future(completion())
+    assert list(summary["phases_ms"]) == ["pool_lookup"]
+    # The trace was only ended in the dispatched event's copy of the context
+    assert end_trace() is not None
+    enable_tracing(False)
+    await command()
+    assert end_trace() is None
@@ -1,9 +1,31 @@
 """Test utility functions in bot.core.util module."""
 
-from typing import List
+from pathlib import Path
+from typing import Callable, List
+import marshal
+import shutil
 import pytest
+from hypothesis import given, strategies as st
 from disnake import Embed
-from bot.core.util import normalize_embed
+from disnake.utils import MISSING
+from bot.core.util import (
+    EMBED_FIELD_NAME_LIMIT,
+    EMBED_FIELD_VALUE_LIMIT,
+    EMBED_FIELDS_LIMIT,
+    EMBED_FOOTER_TEXT_LIMIT,
+    EMBED_AUTHOR_NAME_LIMIT,
+    EMBED_DESCRIPTION_LIMIT,
+    EMBED_TITLE_LIMIT,
+    EMBED_TOTAL_LIMIT,
+    EMBEDS_PER_MESSAGE_LIMIT,
+    compile_question_pool,
+    embed_fits,
+    normalize_embed,
+    pack_embeds,
+    question_pool,
+    question_pool_artifact_filepath,
+    send_embed,
+)
 
 
 @pytest.mark.parametrize(
@@ -357,3 +379,147 @@ def test_normalize_embed(embed: Embed, expected_embeds: List[Embed]) -> None:
     assert [e.to_dict() for e in normalize_embed(embed)] == [
         e.to_dict() for e in expected_embeds
     ]
+
+
+# Field values are drawn without periods, so that ellipses added by normalization can be told
+# apart from the original content.
+field_values = st.text(alphabet="ab \n", max_size=5000) | st.builds(
+    lambda line, lines: "\n".join([line] * lines),
+    st.text(alphabet="ab", min_size=1, max_size=1500),
+    st.integers(min_value=1, max_value=10),
+)
+fields = st.tuples(st.text(alphabet="ab", min_size=1, max_size=300), field_values)
+
+
+def build_embed(
+    title: str,
+    embed_fields: List[tuple],
+    description: str = "",
+    footer: str = "",
+    author: str = "",
+) -> Embed:
+    """Build an embed with a title and fields, and optionally a description, footer and author."""
+    embed = Embed(title=title, description=description or Embed.Empty)
+    if footer:
+        embed.set_footer(text=footer)
+    if author:
+        embed.set_author(name=author)
+    for name, value in embed_fields:
+        embed.add_field(name=name, value=value)
+    return embed
+
+
+def content(values: List[str]) -> str:
+    """Return the content of field values, ignoring whitespace and ellipses."""
+    return "".join("".join(value.split()).replace(".", "") for value in values)
+
+
+@given(
+    st.text(alphabet="ab", max_size=300),
+    st.lists(fields, max_size=40),
+    st.text(alphabet="ab \n", max_size=5000),
+    st.text(alphabet="ab", max_size=2500),
+    st.text(alphabet="ab", max_size=300),
+)
+def test_normalize_embed_limits(
+    title: str, embed_fields: List[tuple], description: str, footer: str, author: str
+) -> None:
+    """Ensure every normalized embed is within all of Discord's embed limitations."""
+    embed = build_embed(title, embed_fields, description, footer, author)
+    for e in normalize_embed(embed):
+        assert len(e.title) <= EMBED_TITLE_LIMIT
+        assert len(e.description) <= EMBED_DESCRIPTION_LIMIT
+        assert len(e.footer.text) <= EMBED_FOOTER_TEXT_LIMIT
+        assert len(e.author.name) <= EMBED_AUTHOR_NAME_LIMIT
+        assert len(e) <= EMBED_TOTAL_LIMIT
+        assert len(e.fields) <= EMBED_FIELDS_LIMIT
+        for field in e.fields:
+            assert field.value.strip()
+            assert len(field.name) <= EMBED_FIELD_NAME_LIMIT
+            assert len(field.value) <= EMBED_FIELD_VALUE_LIMIT
+        assert embed_fits(e)
+
+
+def test_normalize_embed_trims_description_to_fit_footer() -> None:
+    """Ensure the first embed fits when its title, description and footer alone wouldn't."""
+    embed = build_embed(
+        "t" * 300, [("Field", "a" * 1024)] * 3, "d" * 5000, footer="f" * 2048
+    )
+    embeds = normalize_embed(embed)
+    assert all(embed_fits(e) for e in embeds)
+    assert embeds[0].footer.text == "f" * 2048
+    assert [len(e.fields) for e in embeds] == [0, 1, 1, 1]
+
+
+@given(st.lists(fields, max_size=40))
+def test_normalize_embed_keeps_content(embed_fields: List[tuple]) -> None:
+    """Ensure normalization keeps the content and order of field values."""
+    embeds = normalize_embed(build_embed("Test", embed_fields))
+    assert content(field.value for e in embeds for field in e.fields) == content(
+        value for _, value in embed_fields
+    )
+
+
+@given(st.lists(fields, max_size=40))
+def test_normalize_embed_does_not_modify_original(embed_fields: List[tuple]) -> None:
+    """Ensure normalization leaves the original embed untouched."""
+    embed = build_embed("Test", embed_fields)
+    original = embed.to_dict()
+    normalize_embed(embed)
+    assert embed.to_dict() == original
+
+
+@given(st.lists(fields, max_size=60))
+def test_pack_embeds(embed_fields: List[tuple]) -> None:
+    """Ensure normalized embeds are packed in order into messages within Discord's limits."""
+    embeds = normalize_embed(build_embed("Test", embed_fields))
+    messages = pack_embeds(embeds)
+    assert [e for message in messages for e in message] == embeds
+    for message in messages:
+        assert 0 < len(message) <= EMBEDS_PER_MESSAGE_LIMIT
+        assert sum(len(e) for e in message) <= EMBED_TOTAL_LIMIT
+
+
+async def test_send_embed_packs_messages(fake_interaction: Callable) -> None:
+    """Ensure a long embed is sent in as few messages as possible, with one set of components."""
+    inter = fake_interaction()
+    embed = build_embed("Test", [("Traceback", "a" * 1000)] * 15)
+    assert await send_embed(inter, embed, components=["button"])
+    assert [len(message["embeds"]) for message in inter.messages] == [1, 1, 1]
+    assert [message["components"] for message in inter.messages] == [
+        ["button"],
+        MISSING,
+        MISSING,
+    ]
+    embed = build_embed("Test", [("T", "a" * 10)] * 300)
+    inter = fake_interaction()
+    assert await send_embed(inter, embed)
+    assert [len(message["embeds"]) for message in inter.messages] == [10, 2]
+
+
+def test_question_pool_artifact(tmp_path: Path) -> None:
+    """Test bot.core.util.question_pool() loads a fresh compiled artifact instead of YAML."""
+    pool_filepath = tmp_path / "question_pool.yaml"
+    shutil.copy("./bot/models/question_pool.yaml", pool_filepath)
+    artifact_filepath = question_pool_artifact_filepath(pool_filepath)
+    from_yaml = question_pool(pool_filepath)
+    assert artifact_filepath.exists()
+    # Tamper with the artifact's payload while keeping its header, which proves it is used.
+    compile_question_pool(pool_filepath)
+    contents = artifact_filepath.read_bytes()
+    header = contents[: -len(marshal.dumps(from_yaml))]
+    artifact_filepath.write_bytes(
+        header + marshal.dumps([{"command_name": "artifact"}])
+    )
+    assert question_pool(pool_filepath) == [{"command_name": "artifact"}]
+
+
+def test_question_pool_stale_artifact(tmp_path: Path) -> None:
+    """Test bot.core.util.question_pool() falls back to YAML when the artifact is stale."""
+    pool_filepath = tmp_path / "question_pool.yaml"
+    pool_filepath.write_text("- command_name: original\n")
+    assert question_pool(pool_filepath) == [{"command_name": "original"}]
+    pool_filepath.write_text("- command_name: updated\n")
+    assert question_pool(pool_filepath) == [{"command_name": "updated"}]
+    question_pool_artifact_filepath(pool_filepath).write_bytes(b"corrupt")
+    assert question_pool(pool_filepath) == [{"command_name": "updated"}]
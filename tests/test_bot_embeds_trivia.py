@@ -0,0 +1,40 @@
+"""Test trivia embeds in bot.embeds.trivia module."""
+
+from itertools import permutations
+from typing import List
+from bot.core.util import embed_fits
+from bot.embeds.trivia import trivia_ok_multiple_choice_question, trivia_ok_question
+from bot.models.question import Choice, Question
+
+
+def test_trivia_ok_question_matches_multiple_choice_question(
+    question_pool: List[dict],
+) -> None:
+    """Ensure pre-rendered question embeds match freshly-built ones in every choice order."""
+    for exam in question_pool:
+        for question in exam.get("questions"):
+            question = Question.from_dict(question)
+            choices = [c.text for c in question.choices]
+            for order in permutations(range(len(choices))):
+                expected = trivia_ok_multiple_choice_question(
+                    exam.get("meta_name"),
+                    question.prompt,
+                    [choices[index] for index in order],
+                )
+                embed, fits = trivia_ok_question(exam.get("meta_name"), question, order)
+                assert fits == embed_fits(expected)
+                expected, embed = expected.to_dict(), embed.to_dict()
+                assert embed.pop("timestamp") is not None
+                expected.pop("timestamp")
+                assert embed == expected
+
+
+def test_trivia_ok_question_oversize_choice_does_not_fit() -> None:
+    """Ensure a question with a choice too large for an embed field must be sanitized."""
+    question = Question(
+        prompt="Prompt?",
+        choices=(Choice(1, "a" * 1024), Choice(2, "b")),
+        correct_choice=1,
+    )
+    _, fits = trivia_ok_question("Exam", question, [1, 0])
+    assert not fits
@@ -0,0 +1,106 @@
+"""Test answer choice buttons in bot.views module."""
+
+import asyncio
+from typing import Callable, Dict, List, Tuple
+import pytest
+from disnake.http import Route
+from bot.core.pool import QuestionPool
+from bot.views import AnswerCustomId, LiveQuestions, answer_choices
+
+
+class FakeHTTP:
+    """Stand-in for an HTTP client that records the buttons of edited interaction messages."""
+
+    def __init__(self) -> None:
+        """Instantiate a new fake HTTP client."""
+        self.edits: Dict[str, List[Tuple[str, str, bool]]] = {}
+        self.concurrent = 0
+        self.max_concurrent = 0
+
+    async def request(self, route: Route, json: dict) -> None:
+        """Record the custom ID, label and state of each button a message was edited with."""
+        self.concurrent += 1
+        self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        self.edits[route.url.split("/")[-3]] = [
+            (button["custom_id"], button["label"], button["disabled"])
+            for row in json["components"]
+            for button in row["components"]
+        ]
+        await asyncio.sleep(0)
+        self.concurrent -= 1
+
+
+def test_answer_choices_resolve_to_question(question_pool: List[dict]) -> None:
+    """Ensure every answer choice button's custom ID resolves back to its question and choice."""
+    pool = QuestionPool(question_pool)
+    for exam in pool:
+        for index, question in enumerate(exam.get("questions")):
+            order = list(reversed(range(len(question.choices))))
+            buttons = answer_choices(exam.get("command_name"), index, question, order)
+            for button, choice_index in zip(buttons, order):
+                assert len(button.custom_id) <= 100
+                answer = AnswerCustomId.decode(button.custom_id)
+                assert answer.choice_id == question.choices[choice_index].id
+                assert (
+                    pool.question(
+                        answer.command_name, answer.question_index, answer.question_key
+                    )
+                    is question
+                )
+
+
+def test_question_lookup_after_reorder(question_pool: List[dict]) -> None:
+    """Ensure a question moved within its exam by a reload is still found by its key."""
+    pool = QuestionPool(question_pool)
+    question = pool.exam("ccna").get("questions")[5]
+    reordered = [dict(exam) for exam in question_pool]
+    reordered[0]["questions"] = list(reversed(reordered[0]["questions"]))
+    reloaded = QuestionPool(reordered)
+    assert reloaded.question("ccna", 5, question.key) == question
+    assert reloaded.question("ccna", 5, "missing") is None
+    assert reloaded.question("missing", 5, question.key) is None
+
+
+@pytest.mark.parametrize(
+    "custom_id",
+    ["", "answer:ccna:1:abc", "other:ccna:1:abc:1", "answer:ccna:one:abc:1"],
+)
+def test_answer_custom_id_decode_invalid(custom_id: str) -> None:
+    """Ensure custom IDs that don't belong to answer choice buttons are ignored."""
+    assert AnswerCustomId.decode(custom_id) is None
+
+
+async def test_live_questions_evict_oldest(
+    question_pool: List[dict], fake_interaction: Callable
+) -> None:
+    """Ensure the oldest questions have their buttons disabled once over capacity."""
+    question = QuestionPool(question_pool).exam("ccna").get("questions")[0]
+    http = FakeHTTP()
+    live = LiveQuestions(http, timeout=60, max_live=2)
+    buttons = answer_choices("ccna", 0, question, range(len(question.choices)))
+    for id in range(3):
+        live.add(fake_interaction(id), buttons)
+    await asyncio.sleep(0)
+    assert len(live) == 2 and live.evictions == 1
+    assert list(http.edits) == ["token-0"]
+    assert http.edits["token-0"] == [
+        (button.custom_id, button.label, True) for button in buttons
+    ]
+    assert not any(button.disabled for button in buttons)
+
+
+async def test_live_questions_expire(
+    question_pool: List[dict], fake_interaction: Callable
+) -> None:
+    """Ensure questions past their timeout have their buttons disabled, a few at a time."""
+    question = QuestionPool(question_pool).exam("ccna").get("questions")[0]
+    http = FakeHTTP()
+    live = LiveQuestions(http, timeout=0, max_live=10, max_disabling=3)
+    buttons = answer_choices("ccna", 0, question, range(len(question.choices)))
+    for id in range(10):
+        live.add(fake_interaction(id), buttons)
+    assert await live.expire() == 10
+    assert len(live) == 0 and live.expirations == 10
+    assert len(http.edits) == 10 and http.max_concurrent == 3
+    assert all(disabled for edit in http.edits.values() for *_, disabled in edit)
+    assert await LiveQuestions(http, timeout=60, max_live=10).expire() == 0
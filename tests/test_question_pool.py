@@ -1,23 +1,22 @@
 """Test exam question pool."""
 
+from functools import lru_cache
 from typing import List
 import re
 import pytest
-from yaml import SafeLoader, load
+from bot.core.util import question_pool as load_question_pool
 
 
+@lru_cache(maxsize=None)
 def get_exams() -> List[dict]:
     """Return all exam data structures in a list."""
-    with open("./bot/models/question_pool.yaml") as pool_file:
-        return load(pool_file, SafeLoader)
+    return load_question_pool("./bot/models/question_pool.yaml")
 
 
 def get_questions() -> List[dict]:
     """Return all question data structures in all exams as a list."""
     questions = []
-    with open("./bot/models/question_pool.yaml") as pool_file:
-        question_pool = load(pool_file, SafeLoader)
-    for exam in question_pool:
+    for exam in get_exams():
         questions += exam.get("questions", [])
     return questions
 
@@ -0,0 +1,42 @@
+"""Compile the question pool YAML file into a binary artifact for fast loading.
+
+The bot loads the compiled artifact instead of parsing YAML whenever the artifact was compiled
+from the current contents of the YAML file, and falls back to parsing YAML otherwise.
+
+Usage:
+    python tools/compile_question_pool.py [QUESTION_POOL_FILEPATH] [-o ARTIFACT_FILEPATH]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Allow running this tool from anywhere without installing the bot as a package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bot.core.util import compile_question_pool  # noqa: E402
+
+
+def main() -> None:
+    """Parse command line arguments and compile the question pool."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "filepath",
+        nargs="?",
+        default="bot/models/question_pool.yaml",
+        help="Question pool YAML file to compile.",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=None,
+        help="Artifact filepath. Defaults to the YAML filepath with a .marshal suffix.",
+    )
+    args = parser.parse_args()
+    artifact_filepath = compile_question_pool(args.filepath, args.output)
+    print(f"Compiled {args.filepath} to {artifact_filepath}")
+
+
+if __name__ == "__main__":
+    main()